@@ -3,6 +3,10 @@ ASGI config for backend project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+The team event stream (/api/teams/<id>/events/) is an async view; serve the
+project through an ASGI server (e.g. ``uvicorn backend.asgi:application``) so
+idle SSE connections are held as coroutines instead of worker threads.
+
 For more information on this file, see
 https://docs.djangoproject.com/en/6.0/howto/deployment/asgi/
 """
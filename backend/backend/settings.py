@@ -25,7 +25,8 @@ ALLOWED_HOSTS = ["*"]
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # simplejwt 的 JWTAuthentication + 按 (user_id, token_version) 缓存 User
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.AllowAny",
@@ -62,6 +63,8 @@ INSTALLED_APPS = [
     "todos",
     "stats",
     'teams',
+    "notifications",
+    "taskqueue",
 ]
 
 # ======================
@@ -111,6 +114,25 @@ DATABASES = {
     }
 }
 
+# ======================
+# Cache
+# ======================
+
+# 开发期：进程内缓存；多进程部署时换成 Redis/Memcached（接口不变）
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "zmzwhattodo",
+    }
+}
+
+# 团队实时事件（SSE）的发布/订阅：默认进程内；多进程部署时换成共享 broker（实现 teams.broker.Broker）
+TEAM_EVENT_BROKER = "teams.broker.InProcessBroker"
+
+# 后台任务：写入 taskqueue_task 表，由 `manage.py runworker` 执行；
+# 设为 True 时在事务提交后于当前进程内直接执行（无 worker 的本地调试）
+TASK_QUEUE_EAGER = False
+
 # ======================
 # Auth
 # ======================
@@ -10,6 +10,7 @@ urlpatterns = [
     path('api/todos/', include('todos.urls')),
     path("api/stats/", include("stats.urls")),
     path('api/teams/', include('teams.urls')),
+    path("api/notifications/", include("notifications.urls")),
 ]
 if settings.DEBUG:
     urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
\ No newline at end of file
@@ -0,0 +1,43 @@
+# Generated by Django 6.0 on 2026-10-20 10:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """已有通知只知道最近一位 actor：记为一名参与者（actor_count 保持原值，下次合并时按去重人数重算）"""
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationActor = apps.get_model("notifications", "NotificationActor")
+    batch = []
+    rows = Notification.objects.filter(actor__isnull=False).values_list("id", "actor_id")
+    for notification_id, actor_id in rows.iterator(chunk_size=2000):
+        batch.append(NotificationActor(notification_id=notification_id, actor_id=actor_id))
+        if len(batch) >= 1000:
+            NotificationActor.objects.bulk_create(batch, ignore_conflicts=True)
+            batch = []
+    if batch:
+        NotificationActor.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationActor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+                ('notification', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='actors', to='notifications.notification')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('notification', 'actor'), name='uniq_notification_actor')],
+            },
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,82 @@
+from django.db import models
+from django.conf import settings
+
+
+class Notification(models.Model):
+    """
+    站内通知：同一接收者、同一 group_key 的未读通知合并为一行
+    （「5 人赞了你的帖子」只占一行，actor 为最近一位，actor_count 为去重后的参与人数）
+    """
+    VERB_LIKE = "like"
+    VERB_COMMENT = "comment"
+    VERB_TEAM_POST = "team_post"
+    VERB_CHOICES = [
+        (VERB_LIKE, "Like"),
+        (VERB_COMMENT, "Comment"),
+        (VERB_TEAM_POST, "Team post"),
+    ]
+
+    recipient = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="notifications")
+    verb = models.CharField(max_length=20, choices=VERB_CHOICES)
+    group_key = models.CharField(max_length=64)
+    actor = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    actor_count = models.PositiveIntegerField(default=1)
+
+    post = models.ForeignKey("posts.Post", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    team = models.ForeignKey("teams.Team", on_delete=models.CASCADE, null=True, blank=True, related_name="+")
+    team_post = models.ForeignKey(
+        "teams.TeamPost", on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    read_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # 合并时刷新：收件箱按它排序，最新动静的通知排在前面
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # 每组最多一条未读：并发合并时由它兜底
+            models.UniqueConstraint(
+                fields=["recipient", "group_key"],
+                condition=models.Q(read_at__isnull=True),
+                name="uniq_notification_unread_group",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["recipient", "-updated_at", "-id"], name="notification_inbox_idx"),
+            models.Index(fields=["recipient", "read_at"], name="notification_unread_idx"),
+        ]
+
+    def __str__(self):
+        return f"Notification({self.verb}, to={self.recipient_id}, x{self.actor_count})"
+
+
+class NotificationActor(models.Model):
+    """
+    合并通知的参与者（去重）：actor_count 按这里的行数计，同一人反复触发只算一次
+    """
+    notification = models.ForeignKey(Notification, on_delete=models.CASCADE, related_name="actors")
+    actor = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["notification", "actor"], name="uniq_notification_actor"),
+        ]
+
+    def __str__(self):
+        return f"NotificationActor(notification={self.notification_id}, actor={self.actor_id})"
+
+
+class NotificationCounter(models.Model):
+    """
+    每用户未读数（按合并后的行数计）：角标只需一次主键查询
+    """
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="notification_counter"
+    )
+    unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"NotificationCounter(user={self.user_id}, unread={self.unread})"
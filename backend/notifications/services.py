@@ -0,0 +1,145 @@
+# notifications/services.py
+"""
+通知扇出：写接口调用 notify()，按批合并/插入，再重算受影响用户的未读数
+
+- 合并：接收者已有同 group_key 的未读通知时只 UPDATE（actor/人数/时间），不新增行；
+  参与者记在 NotificationActor，actor_count 为去重后的人数（A、B、A 计 2 人）
+- 新增：bulk_create 分批写入；并发下撞上「每组一条未读」的部分唯一约束时逐条重试，撞上的改走合并
+- 未读数：对受影响用户用一条 UPDATE ... = (SELECT COUNT ...) 重算，不做 ±1，避免并发漂移
+"""
+from django.db import IntegrityError, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from teams.models import TeamMember
+from .models import Notification, NotificationActor, NotificationCounter
+
+FANOUT_BATCH_SIZE = 500
+
+
+def refresh_unread(user_ids):
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=uid) for uid in user_ids], ignore_conflicts=True
+    )
+    unread = (
+        Notification.objects.filter(recipient_id=OuterRef("user_id"), read_at__isnull=True)
+        .order_by()
+        .values("recipient_id")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    NotificationCounter.objects.filter(user_id__in=user_ids).update(unread=Coalesce(Subquery(unread), 0))
+
+
+def _insert(recipient_ids, verb, group_key, actor_id, targets):
+    """
+    插入新通知，返回 {recipient_id: notification_id}（只含真正插入的行）
+    并发下对方先插入了同组未读通知时撞上部分唯一约束：退回逐条插入，撞上的接收者交给调用方合并
+    """
+    def build(uid):
+        return Notification(recipient_id=uid, verb=verb, group_key=group_key, actor_id=actor_id, **targets)
+
+    rows = [build(uid) for uid in recipient_ids]
+    try:
+        with transaction.atomic():
+            Notification.objects.bulk_create(rows)
+    except IntegrityError:
+        inserted = {}
+        for uid in recipient_ids:
+            try:
+                n = build(uid)
+                with transaction.atomic():
+                    n.save(force_insert=True)
+                inserted[uid] = n.pk
+            except IntegrityError:
+                pass
+        return inserted
+
+    if any(n.pk is None for n in rows):
+        # 不支持 RETURNING 的数据库：按接收者回查
+        return dict(
+            Notification.objects.filter(recipient_id__in=recipient_ids, group_key=group_key, read_at__isnull=True)
+            .values_list("recipient_id", "id")
+        )
+    return {n.recipient_id: n.pk for n in rows}
+
+
+def notify(recipient_ids, verb, group_key, actor_id, **targets):
+    """
+    targets: post_id / team_id / team_post_id（合并时一并更新为最新一次）
+    返回新增的通知行数（合并进已有未读通知的不计）
+    """
+    ids = sorted({int(r) for r in recipient_ids if r and int(r) != actor_id})
+    created = 0
+    now = timezone.now()
+    distinct_actors = (
+        NotificationActor.objects.filter(notification_id=OuterRef("pk"))
+        .order_by()
+        .values("notification_id")
+        .annotate(c=Count("id"))
+        .values("c")
+    )
+    with transaction.atomic():
+        for i in range(0, len(ids), FANOUT_BATCH_SIZE):
+            chunk = ids[i: i + FANOUT_BATCH_SIZE]
+            hit = dict(
+                Notification.objects.filter(recipient_id__in=chunk, group_key=group_key, read_at__isnull=True)
+                .values_list("recipient_id", "id")
+            )
+            fresh = [uid for uid in chunk if uid not in hit]
+            inserted = _insert(fresh, verb, group_key, actor_id, targets) if fresh else {}
+            lost = [uid for uid in fresh if uid not in inserted]
+            if lost:
+                hit.update(
+                    Notification.objects.filter(recipient_id__in=lost, group_key=group_key, read_at__isnull=True)
+                    .values_list("recipient_id", "id")
+                )
+
+            if inserted:
+                NotificationActor.objects.bulk_create(
+                    [NotificationActor(notification_id=nid, actor_id=actor_id) for nid in inserted.values()]
+                )
+                refresh_unread(inserted)
+                created += len(inserted)
+
+            if hit:
+                # 只处理这位 actor 第一次出现的通知：同一人反复触发（如取消再点赞）不累加人次、不刷新时间
+                seen = set(
+                    NotificationActor.objects.filter(notification_id__in=hit.values(), actor_id=actor_id)
+                    .values_list("notification_id", flat=True)
+                )
+                new_ids = [nid for nid in hit.values() if nid not in seen]
+                if new_ids:
+                    NotificationActor.objects.bulk_create(
+                        [NotificationActor(notification_id=nid, actor_id=actor_id) for nid in new_ids],
+                        ignore_conflicts=True,
+                    )
+                    # 人数按参与者行数重算，并发合并也不会重复累加
+                    Notification.objects.filter(id__in=new_ids).update(
+                        actor_id=actor_id, actor_count=Subquery(distinct_actors), updated_at=now, **targets
+                    )
+    return created
+
+
+def notify_like(post, actor_id):
+    notify([post.author_id], Notification.VERB_LIKE, f"like:post:{post.id}", actor_id, post_id=post.id)
+
+
+def notify_comment(post, actor_id):
+    notify([post.author_id], Notification.VERB_COMMENT, f"comment:post:{post.id}", actor_id, post_id=post.id)
+
+
+def notify_team_post(team_post):
+    member_ids = TeamMember.objects.filter(team_id=team_post.team_id).values_list("user_id", flat=True)
+    notify(
+        member_ids,
+        Notification.VERB_TEAM_POST,
+        f"team_post:team:{team_post.team_id}",
+        team_post.author_id,
+        team_id=team_post.team_id,
+        team_post_id=team_post.id,
+    )
@@ -0,0 +1,12 @@
+# notifications/tasks.py
+from taskqueue.registry import task
+from teams.models import TeamPost
+from .services import notify_team_post
+
+
+@task(max_attempts=5, timeout=300)
+def fan_out_team_post(team_post_id):
+    """新团队帖子通知全体成员：大团队的扇出放到 worker，发帖请求不必等待"""
+    post = TeamPost.objects.filter(id=team_post_id).only("id", "team_id", "author_id").first()
+    if post is not None:
+        notify_team_post(post)
@@ -0,0 +1,53 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from posts.models import Post
+from users.models import User
+from .models import Notification, NotificationCounter
+from .services import notify, notify_like
+
+
+class NotifyTests(TestCase):
+    def setUp(self):
+        self.author = User.objects.create_user(username="author", email="author@example.com")
+        self.a = User.objects.create_user(username="a", email="a@example.com")
+        self.b = User.objects.create_user(username="b", email="b@example.com")
+        self.post = Post.objects.create(author=self.author)
+
+    def unread(self, user):
+        return NotificationCounter.objects.get(user=user).unread
+
+    def test_repeat_actor_is_counted_once(self):
+        for actor in (self.a, self.b, self.a):
+            notify_like(self.post, actor.id)
+        n = Notification.objects.get(recipient=self.author)
+        self.assertEqual(n.actor_count, 2)
+        self.assertEqual(n.actor_id, self.b.id)
+        self.assertEqual(n.actors.count(), 2)
+        self.assertEqual(self.unread(self.author), 1)
+
+    def test_returns_inserted_rows_only(self):
+        key = f"like:post:{self.post.id}"
+        self.assertEqual(notify([self.author.id, self.b.id, self.a.id], Notification.VERB_LIKE, key, self.a.id), 2)
+        # 已有未读通知的接收者只合并，不计入
+        self.assertEqual(notify([self.author.id, self.a.id], Notification.VERB_LIKE, key, self.b.id), 1)
+        self.assertEqual(Notification.objects.filter(group_key=key).count(), 3)
+
+    def test_read_notification_starts_a_new_group(self):
+        notify_like(self.post, self.a.id)
+        Notification.objects.update(read_at=self.post.created_at)
+        notify_like(self.post, self.a.id)
+        self.assertEqual(Notification.objects.filter(recipient=self.author).count(), 2)
+
+    def test_mark_read_updates_counter(self):
+        notify_like(self.post, self.a.id)
+        client = APIClient()
+        client.force_authenticate(self.author)
+        self.assertEqual(client.get("/api/notifications/unread-count/").data["unread"], 1)
+
+        resp = client.post("/api/notifications/read/", {"all": True}, format="json")
+        self.assertEqual(resp.data, {"marked": 1, "unread": 0})
+
+        results = client.get("/api/notifications/").data["results"]
+        self.assertEqual(len(results), 1)
+        self.assertTrue(results[0]["read"])
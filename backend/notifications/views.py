@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from users.utils import build_avatar_url
+from .models import Notification, NotificationCounter
+from .services import refresh_unread
+
+INBOX_PAGE_SIZE = 20
+INBOX_MAX_PAGE_SIZE = 100
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def make_cursor(n) -> str:
+    return f"{(n.updated_at - EPOCH) // timedelta(microseconds=1)}_{n.id}"
+
+
+def parse_cursor(token: str):
+    try:
+        us, pk = token.split("_", 1)
+        us, pk = int(us), int(pk)
+    except (AttributeError, ValueError):
+        return None
+    if us < 0 or pk < 0:
+        return None
+    return EPOCH + timedelta(microseconds=us), pk
+
+
+def unread_count(user_id) -> int:
+    return (
+        NotificationCounter.objects.filter(user_id=user_id).values_list("unread", flat=True).first()
+    ) or 0
+
+
+def render_message(n) -> str:
+    actor = (n.actor.name or n.actor.username) if n.actor else "有人"
+    others = f" 等 {n.actor_count} 人" if n.actor_count > 1 else ""
+    if n.verb == Notification.VERB_LIKE:
+        return f"{actor}{others}赞了你的帖子"
+    if n.verb == Notification.VERB_COMMENT:
+        return f"{actor}{others}评论了你的帖子"
+    if n.verb == Notification.VERB_TEAM_POST:
+        team = n.team.name if n.team else "团队"
+        return f"{actor}{others}在「{team}」发布了新帖子"
+    return ""
+
+
+def notification_to_dict(request, n):
+    return {
+        "id": n.id,
+        "verb": n.verb,
+        "message": render_message(n),
+        "actor": {
+            "id": n.actor.id,
+            "username": n.actor.username,
+            "name": n.actor.name,
+            "avatar_url": build_avatar_url(request, n.actor),
+        } if n.actor else None,
+        "actor_count": n.actor_count,
+        "post_id": n.post_id,
+        "team_id": n.team_id,
+        "team_post_id": n.team_post_id,
+        "read": n.read_at is not None,
+        "created_at": n.created_at,
+        "updated_at": n.updated_at,
+    }
+
+
+class NotificationListView(APIView):
+    """
+    GET /api/notifications/?unread=1&cursor=<token>&page_size=20
+
+    按 (updated_at, id) 倒序键集分页，actor/team 一起 select_related
+    返回 {"results": [...], "next_cursor": token|null, "unread": n}
+    """
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        try:
+            page_size = int(request.query_params.get("page_size") or INBOX_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "分页参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = max(1, min(page_size, INBOX_MAX_PAGE_SIZE))
+
+        cursor = (request.query_params.get("cursor") or "").strip()
+        position = parse_cursor(cursor) if cursor else None
+        if cursor and position is None:
+            return Response({"error": "cursor 参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+
+        qs = Notification.objects.filter(recipient=request.user).select_related("actor", "team")
+        if (request.query_params.get("unread") or "").strip() in ("1", "true"):
+            qs = qs.filter(read_at__isnull=True)
+        if position:
+            updated_at, pk = position
+            qs = qs.filter(Q(updated_at__lt=updated_at) | Q(updated_at=updated_at, id__lt=pk))
+
+        rows = list(qs.order_by("-updated_at", "-id")[: page_size + 1])
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        return Response({
+            "results": [notification_to_dict(request, n) for n in rows],
+            "next_cursor": make_cursor(rows[-1]) if has_more else None,
+            "unread": unread_count(request.user.id),
+        })
+
+
+class NotificationUnreadCountView(APIView):
+    """GET /api/notifications/unread-count/  角标：一次主键查询"""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        return Response({"unread": unread_count(request.user.id)})
+
+
+class NotificationMarkReadView(APIView):
+    """
+    POST /api/notifications/read/
+    body: {"ids": [1, 2, 3]} 或 {"all": true}
+    一条 UPDATE 批量标记，再重算未读数
+    """
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        qs = Notification.objects.filter(recipient=request.user, read_at__isnull=True)
+        if request.data.get("all") is not True:
+            ids = request.data.get("ids")
+            if not isinstance(ids, list) or not ids:
+                return Response({"error": "请提供 ids 或 all"}, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                ids = [int(i) for i in ids]
+            except (TypeError, ValueError):
+                return Response({"error": "ids 非法"}, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(id__in=ids)
+
+        marked = qs.update(read_at=timezone.now())
+        if marked:
+            refresh_unread([request.user.id])
+        return Response({"marked": marked, "unread": unread_count(request.user.id)})
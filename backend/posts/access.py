@@ -0,0 +1,41 @@
+# posts/access.py
+"""
+附件访问控制：
+- 帖子作者可下载；帖子分享到团队时，该团队成员也可下载（成员身份走 teams.membership 缓存）
+- 签名下载链接：把附件的存储路径/文件名/类型签进短时效令牌，校验只需验签，不查库
+  （相册一次渲染几十张缩略图时，每张图不必再做一次权限查询）
+"""
+from django.core import signing
+
+from teams.membership import get_team_role
+
+ATTACHMENT_URL_TTL = 300  # 秒
+_SALT = "posts.attachment"
+
+
+def can_access_post(request, author_id, team_id) -> bool:
+    user = getattr(request, "user", None)
+    if not (user and user.is_authenticated):
+        return False
+    if author_id == user.id:
+        return True
+    return bool(team_id) and get_team_role(team_id, user.id, request) is not None
+
+
+def sign_attachment(att) -> str:
+    return signing.dumps(
+        {"a": att.id, "f": att.file.name, "n": att.original_name, "t": att.content_type},
+        salt=_SALT,
+        compress=True,
+    )
+
+
+def load_attachment_token(token: str, attachment_id: int):
+    """验签并返回 {"f", "n", "t"}；过期/篡改/与 URL 中的附件 id 不符时返回 None"""
+    try:
+        data = signing.loads(token, salt=_SALT, max_age=ATTACHMENT_URL_TTL)
+    except signing.BadSignature:  # SignatureExpired 是其子类
+        return None
+    if not isinstance(data, dict) or data.get("a") != attachment_id:
+        return None
+    return data
@@ -0,0 +1,20 @@
+# Generated by Django 6.0 on 2026-10-19 17:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0007_post_author_created_idx'),
+        ('teams', '0004_team_invite_limits'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='post',
+            name='team',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='shared_posts', to='teams.team'),
+        ),
+    ]
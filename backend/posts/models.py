@@ -23,6 +23,20 @@ class Post(models.Model):
     type = models.CharField(max_length=20, choices=TYPE_CHOICES, default=TYPE_TEXT)
     meta = models.JSONField(blank=True, default=dict)
     checklist_items = models.JSONField(blank=True, default=list)
+    # 分享到团队：该团队成员可查看帖子并下载附件
+    team = models.ForeignKey(
+        "teams.Team",
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="shared_posts",
+    )
+
+    class Meta:
+        indexes = [
+            # 个人时间线 / 日历统计按时间范围查询
+            models.Index(fields=["author", "created_at"], name="post_author_created_idx"),
+        ]
 
     def __str__(self):
         return f"Post({self.id}) by {self.author_id}"
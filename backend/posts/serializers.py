@@ -1,5 +1,6 @@
 from rest_framework import serializers
 from .models import Post, PostComment, PostAttachment
+from .access import can_access_post, sign_attachment
 from users.utils import build_avatar_url
 
 
@@ -16,7 +17,11 @@ class PostAttachmentSerializer(serializers.ModelSerializer):
         if not request:
             return ""
         # 受控下载接口（避免 /media/ 直出）
-        return request.build_absolute_uri(f"/api/posts/attachments/{obj.id}/download/")
+        url = request.build_absolute_uri(f"/api/posts/attachments/{obj.id}/download/")
+        if self.context.get("signed"):
+            # 有权限的查看者直接拿短时效签名链接，下载时免鉴权查询
+            url = f"{url}?sig={sign_attachment(obj)}"
+        return url
 
     def get_is_image(self, obj):
         return obj.is_image
@@ -44,7 +49,9 @@ class PostSerializer(serializers.ModelSerializer):
             "liked_by_me",
             "comment_count",     # ✅ 新增
             "attachments",
+            "team",
         ]
+        read_only_fields = ["team"]
 
     def get_author(self, obj):
         u = obj.author
@@ -60,7 +67,8 @@ class PostSerializer(serializers.ModelSerializer):
     def get_attachments(self, obj):
         request = self.context.get("request")
         qs = obj.attachments.all().order_by("id")
-        return PostAttachmentSerializer(qs, many=True, context={"request": request}).data
+        signed = can_access_post(request, obj.author_id, obj.team_id)
+        return PostAttachmentSerializer(qs, many=True, context={"request": request, "signed": signed}).data
 
     def validate(self, attrs):
         t = (attrs.get("type") or Post.TYPE_TEXT).strip().lower()
@@ -0,0 +1,12 @@
+# posts/tasks.py
+from .models import PostAttachment
+from taskqueue.registry import task
+
+
+@task(max_attempts=5, timeout=120)
+def delete_attachment_files(names):
+    """帖子删除后清理附件文件（级联删除只删数据库行）"""
+    storage = PostAttachment._meta.get_field("file").storage
+    for name in names:
+        if name:
+            storage.delete(name)  # 不存在时为空操作，重试是幂等的
@@ -1,3 +1,82 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time
+from unittest import mock
+from urllib.parse import parse_qs, urlsplit
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from teams.models import Team, TeamMember
+from users.models import User
+from .access import ATTACHMENT_URL_TTL, sign_attachment
+from .models import Post, PostAttachment
+
+
+class AttachmentDownloadTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.author = User.objects.create_user(username="author", email="author@example.com")
+        self.member = User.objects.create_user(username="member", email="member@example.com")
+        self.stranger = User.objects.create_user(username="stranger", email="stranger@example.com")
+        self.team = Team.objects.create(name="T", owner=self.author)
+        TeamMember.objects.create(team=self.team, user=self.author, role=TeamMember.Role.ADMIN)
+        TeamMember.objects.create(team=self.team, user=self.member)
+
+        self.post = Post.objects.create(author=self.author, team=self.team)
+        self.att = PostAttachment.objects.create(
+            post=self.post,
+            file=SimpleUploadedFile("notes.txt", b"hello"),
+            original_name="笔记.txt",
+            content_type="text/plain",
+            size=5,
+        )
+        self.url = f"/api/posts/attachments/{self.att.id}/download/"
+
+    def client_for(self, user=None):
+        client = APIClient()
+        if user:
+            client.force_authenticate(user)
+        return client
+
+    def download(self, client, sig=None):
+        return client.get(self.url, {"sig": sig} if sig is not None else {})
+
+    def test_member_gets_signed_url_that_needs_no_queries(self):
+        posts = self.client_for(self.member).get("/api/posts/", {"team": self.team.id}).data
+        url = posts[0]["attachments"][0]["url"]
+        sig = parse_qs(urlsplit(url).query)["sig"][0]
+
+        # 签名链接不需要登录，也不查库
+        with self.assertNumQueries(0):
+            resp = self.download(self.client_for(), sig)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(b"".join(resp.streaming_content), b"hello")
+        self.assertEqual(resp["Content-Type"], "text/plain")
+        self.assertIn(f"max-age={ATTACHMENT_URL_TTL}", resp["Cache-Control"])
+
+    def test_tampered_or_foreign_signature_is_rejected(self):
+        sig = sign_attachment(self.att)
+        self.assertEqual(self.download(self.client_for(), sig[:-1] + ("A" if sig[-1] != "A" else "B")).status_code, 403)
+
+        other = PostAttachment.objects.create(post=self.post, file=SimpleUploadedFile("b.txt", b"b"))
+        self.assertEqual(self.download(self.client_for(), sign_attachment(other)).status_code, 403)
+
+    def test_expired_signature_is_rejected(self):
+        sig = sign_attachment(self.att)
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + ATTACHMENT_URL_TTL + 1):
+            self.assertEqual(self.download(self.client_for(), sig).status_code, 403)
+
+    def test_unsigned_download_checks_membership(self):
+        self.assertEqual(self.download(self.client_for(self.member)).status_code, 200)
+        self.assertEqual(self.download(self.client_for(self.author)).status_code, 200)
+        self.assertEqual(self.download(self.client_for(self.stranger)).status_code, 403)
+        self.assertEqual(self.download(self.client_for()).status_code, 401)
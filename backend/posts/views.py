@@ -2,18 +2,25 @@ import json
 
 from django.db import IntegrityError
 from django.db.models import Count, Exists, OuterRef, Value, BooleanField
+from django.db.models.functions import TruncDate
 from django.http import FileResponse, Http404
 from django.shortcuts import get_object_or_404
 
 from rest_framework import status
-from rest_framework.exceptions import ValidationError, PermissionDenied
+from rest_framework.exceptions import ValidationError, PermissionDenied, NotAuthenticated
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAuthenticatedOrReadOnly
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from .models import Post, PostComment, PostLike, PostAttachment
+from .access import ATTACHMENT_URL_TTL, can_access_post, load_attachment_token
 from .serializers import PostSerializer, CommentSerializer
+from .tasks import delete_attachment_files
 from .validators import validate_upload
+from notifications.services import notify_comment, notify_like
+from stats.rollup import bump, count_done_items, day_of
+from teams.broker import publish_team_event
+from teams.membership import get_team_role
 
 
 MAX_FILES_PER_POST = 10
@@ -47,10 +54,20 @@ class PostListCreateAPIView(APIView):
         base_qs = (
             Post.objects.select_related("author")
             .prefetch_related("attachments")
-            .filter(author_id=user.id)
             .order_by("-created_at")
         )
 
+        # ?team=<id>：分享到该团队的帖子（仅团队成员）
+        team_id = (request.query_params.get("team") or "").strip()
+        if team_id:
+            if not team_id.isdigit():
+                raise ValidationError({"team": ["team 参数非法"]})
+            if get_team_role(team_id, user.id, request) is None:
+                raise PermissionDenied("你不是该团队成员")
+            base_qs = base_qs.filter(team_id=int(team_id))
+        else:
+            base_qs = base_qs.filter(author_id=user.id)
+
         qs = base_qs.annotate(
             like_count=Count("likes", distinct=True),
             liked_by_me=Exists(PostLike.objects.filter(post_id=OuterRef("pk"), user_id=user.id)),
@@ -92,6 +109,14 @@ class PostListCreateAPIView(APIView):
         ser = PostSerializer(data=data, context={"has_files": has_files})
         ser.is_valid(raise_exception=True)
 
+        # 6) 可选：分享到自己所在的团队
+        team_id = str(data.get("team_id") or "").strip()
+        if team_id:
+            if not team_id.isdigit():
+                raise ValidationError({"team_id": ["team_id 非法"]})
+            if get_team_role(team_id, request.user.id, request) is None:
+                raise PermissionDenied("你不是该团队成员")
+
         post = Post.objects.create(
             author=request.user,
             type=ser.validated_data.get("type", Post.TYPE_TEXT),
@@ -99,9 +124,16 @@ class PostListCreateAPIView(APIView):
             tags=ser.validated_data.get("tags", ""),
             meta=ser.validated_data.get("meta", {}),
             checklist_items=ser.validated_data.get("checklist_items", []),
+            team_id=int(team_id) if team_id else None,
+        )
+        bump(
+            post.author_id,
+            day_of(post.created_at),
+            posts=1,
+            checklist_done=count_done_items(post.checklist_items),
         )
 
-        # 6) 保存附件（已校验，安全落库）
+        # 7) 保存附件（已校验，安全落库）
         if files:
             for f in files:
                 PostAttachment.objects.create(
@@ -112,15 +144,15 @@ class PostListCreateAPIView(APIView):
                     size=getattr(f, "size", 0) or 0,
                 )
 
-        # 7) 返回序列化：让前端无需二次请求也有 like/comment 信息
+        # 8) 返回序列化：让前端无需二次请求也有 like/comment 信息
         post.like_count = 0
         post.liked_by_me = False
         post.comment_count = 0  # ✅ 新增
 
-        return Response(
-            PostSerializer(post, context={"request": request}).data,
-            status=status.HTTP_201_CREATED,
-        )
+        data = PostSerializer(post, context={"request": request}).data
+        if post.team_id:
+            publish_team_event(post.team_id, "post", data)
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 class CommentListAPIView(APIView):
@@ -140,23 +172,26 @@ class CommentCreateAPIView(APIView):
             raise ValidationError({"content": ["评论内容不能为空"]})
 
         try:
-            Post.objects.only("id").get(id=post_id)
+            post = Post.objects.only("id", "author_id", "team_id").get(id=post_id)
         except Post.DoesNotExist:
             raise Http404("帖子不存在")
 
         comment = PostComment.objects.create(post_id=post_id, author=request.user, content=content)
-        return Response(
-            CommentSerializer(comment, context={"request": request}).data,
-            status=status.HTTP_201_CREATED,
-        )
+        bump(request.user.id, day_of(comment.created_at), comments=1)
+        notify_comment(post, request.user.id)
+        data = CommentSerializer(comment, context={"request": request}).data
+        if post.team_id:
+            publish_team_event(post.team_id, "comment", data)
+        return Response(data, status=status.HTTP_201_CREATED)
 
 
 class PostLikeToggleAPIView(APIView):
     permission_classes = [IsAuthenticated]
+    auth_claims_only = True  # 只用到 request.user.id，认证不取 User
 
     def post(self, request, post_id: int):
         try:
-            Post.objects.only("id").get(id=post_id)
+            post = Post.objects.only("id", "author_id", "team_id").get(id=post_id)
         except Post.DoesNotExist:
             raise Http404("帖子不存在")
 
@@ -164,16 +199,22 @@ class PostLikeToggleAPIView(APIView):
 
         if existing_like:
             existing_like.delete()
+            bump(post.author_id, day_of(existing_like.created_at), likes_received=-1)
             liked = False
         else:
             try:
-                PostLike.objects.create(post_id=post_id, user_id=request.user.id)
+                like = PostLike.objects.create(post_id=post_id, user_id=request.user.id)
+                bump(post.author_id, day_of(like.created_at), likes_received=1)
+                notify_like(post, request.user.id)
                 liked = True
             except IntegrityError:
                 liked = True
 
         like_count = PostLike.objects.filter(post_id=post_id).count()
-        return Response({"post_id": post_id, "liked": liked, "like_count": like_count})
+        data = {"post_id": post_id, "liked": liked, "like_count": like_count}
+        if post.team_id:
+            publish_team_event(post.team_id, "like", {**data, "user_id": request.user.id})
+        return Response(data)
 
 
 class ChecklistToggleAPIView(APIView):
@@ -198,9 +239,11 @@ class ChecklistToggleAPIView(APIView):
         if idx < 0 or idx >= len(items):
             raise ValidationError({"index": ["index 越界"]})
 
+        was_done = items[idx].get("done") is True
         items[idx]["done"] = not bool(items[idx].get("done", False))
         post.checklist_items = items
         post.save(update_fields=["checklist_items"])
+        bump(post.author_id, day_of(post.created_at), checklist_done=-1 if was_done else 1)
 
         return Response({"checklist_items": post.checklist_items})
 
@@ -212,32 +255,86 @@ class PostDetailAPIView(APIView):
         post = get_object_or_404(Post, id=post_id)
         if post.author_id != request.user.id:
             raise PermissionDenied("无权限删除")
+
+        # 同步扣减汇总表：帖子本身 + 级联删除的评论（各评论者）和点赞（作者收到的）
+        comment_rows = (
+            PostComment.objects.filter(post=post)
+            .annotate(day=TruncDate("created_at"))
+            .values("author_id", "day")
+            .annotate(n=Count("id"))
+            .values_list("author_id", "day", "n")
+        )
+        like_rows = (
+            PostLike.objects.filter(post=post)
+            .annotate(day=TruncDate("created_at"))
+            .values("day")
+            .annotate(n=Count("id"))
+            .values_list("day", "n")
+        )
+        comment_rows, like_rows = list(comment_rows), list(like_rows)
+        files = list(PostAttachment.objects.filter(post=post).values_list("file", flat=True))
+
         post.delete()
+        if files:
+            delete_attachment_files.delay(files)
+
+        bump(
+            post.author_id,
+            day_of(post.created_at),
+            posts=-1,
+            checklist_done=-count_done_items(post.checklist_items),
+        )
+        for author_id, day, n in comment_rows:
+            bump(author_id, day, comments=-n)
+        for day, n in like_rows:
+            bump(post.author_id, day, likes_received=-n)
         return Response({"message": "已删除"}, status=status.HTTP_200_OK)
 
 
 class AttachmentDownloadAPIView(APIView):
     """
     受控下载接口：避免 /media/ 直出导致隐私泄露。
-    当前策略：仅帖子作者可下载。
-    未来做 Team 权限时，在此扩展“团队成员可下载”。
+    权限：帖子作者；帖子分享到团队时，团队成员也可下载（成员身份走缓存）。
+    带 ?sig= 的签名链接（由序列化器发给有权限的查看者，短时效）只验签，不查库。
     """
-    permission_classes = [IsAuthenticated]
+    permission_classes = [AllowAny]
 
     def get(self, request, attachment_id: int):
+        sig = request.query_params.get("sig")
+        if sig:
+            data = load_attachment_token(sig, attachment_id)
+            if data is None:
+                raise PermissionDenied("下载链接无效或已过期")
+            storage = PostAttachment._meta.get_field("file").storage
+            try:
+                fh = storage.open(data["f"], "rb")
+            except FileNotFoundError:
+                raise Http404("附件不存在")
+            resp = self._file_response(fh, data["n"], data["t"])
+            resp["Cache-Control"] = f"private, max-age={ATTACHMENT_URL_TTL}"
+            return resp
+
+        if not request.user.is_authenticated:
+            raise NotAuthenticated()
+
         att = (
-            PostAttachment.objects.select_related("post", "post__author")
+            PostAttachment.objects.select_related("post")
+            .only("file", "original_name", "content_type", "post__author_id", "post__team_id")
             .filter(id=attachment_id)
             .first()
         )
         if not att:
             raise Http404("附件不存在")
 
-        if att.post.author_id != request.user.id:
+        if not can_access_post(request, att.post.author_id, att.post.team_id):
             raise PermissionDenied("无权下载该附件")
 
-        resp = FileResponse(att.file.open("rb"), as_attachment=True, filename=att.original_name)
+        return self._file_response(att.file.open("rb"), att.original_name, att.content_type)
+
+    @staticmethod
+    def _file_response(fh, filename, content_type):
+        resp = FileResponse(fh, as_attachment=True, filename=filename)
         resp["X-Content-Type-Options"] = "nosniff"
-        if att.content_type:
-            resp["Content-Type"] = att.content_type
+        if content_type:
+            resp["Content-Type"] = content_type
         return resp
@@ -0,0 +1,216 @@
+# stats/analytics.py
+"""
+日历统计分析：把按天的稀疏序列展开为稠密数组后做向量化计算。
+NumPy 为可选依赖；未安装时退回标准库 array，结果一致。
+"""
+from array import array
+from datetime import timedelta
+from itertools import accumulate
+
+try:
+    import numpy as np
+except ImportError:  # NumPy 可选
+    np = None
+
+ENGINE = "numpy" if np is not None else "array"
+
+
+def dense_series(pairs, d1, n_days):
+    """[(date, value), ...] -> 长度为 n_days 的稠密计数数组（下标 0 对应 d1）"""
+    if np is not None:
+        arr = np.zeros(n_days, dtype=np.int64)
+        if pairs:
+            idx = np.fromiter(((d - d1).days for d, _ in pairs), dtype=np.int64, count=len(pairs))
+            val = np.fromiter((v for _, v in pairs), dtype=np.int64, count=len(pairs))
+            ok = (idx >= 0) & (idx < n_days)
+            np.add.at(arr, idx[ok], val[ok])
+        return arr
+
+    arr = array("q", bytes(8 * n_days))
+    for d, v in pairs:
+        i = (d - d1).days
+        if 0 <= i < n_days:
+            arr[i] += v
+    return arr
+
+
+def streaks(arr):
+    """
+    返回 (current, longest, longest_start_index)：
+    current 为截止最后一天（若最后一天尚无活动则截止前一天）的连续活跃天数
+    """
+    n = len(arr)
+    if n == 0:
+        return 0, 0, None
+
+    if np is not None:
+        active = (np.asarray(arr) > 0).astype(np.int8)
+        edges = np.diff(np.concatenate(([0], active, [0])))
+        starts = np.flatnonzero(edges == 1)
+        ends = np.flatnonzero(edges == -1)
+        if starts.size == 0:
+            return 0, 0, None
+        lengths = ends - starts
+        best = int(lengths.argmax())
+        current = int(lengths[-1]) if ends[-1] >= n - 1 else 0
+        return current, int(lengths[best]), int(starts[best])
+
+    longest, longest_start, run = 0, None, 0
+    for i, v in enumerate(arr):
+        run = run + 1 if v > 0 else 0
+        if run > longest:
+            longest, longest_start = run, i - run + 1
+    current = run
+    if current == 0 and n >= 2 and arr[n - 2] > 0:
+        current = 1
+        i = n - 3
+        while i >= 0 and arr[i] > 0:
+            current += 1
+            i -= 1
+    return current, longest, longest_start
+
+
+def rolling_mean(arr, window: int):
+    """滑动平均（前 window-1 天按已有天数求平均），基于前缀和 O(n)"""
+    n = len(arr)
+    if np is not None:
+        cs = np.concatenate(([0], np.cumsum(arr, dtype=np.int64)))
+        idx = np.arange(1, n + 1)
+        lo = np.maximum(idx - window, 0)
+        return (cs[idx] - cs[lo]) / np.minimum(idx, window)
+
+    cs = array("q", [0])
+    cs.extend(accumulate(arr))
+    return array("d", ((cs[i] - cs[max(i - window, 0)]) / min(i, window) for i in range(1, n + 1)))
+
+
+def percentile_rank(arr, x) -> float:
+    """x 在 arr 中的百分位（并列值各算一半）"""
+    n = len(arr)
+    if n == 0:
+        return 0.0
+    if np is not None:
+        a = np.asarray(arr)
+        below = int(np.count_nonzero(a < x))
+        equal = int(np.count_nonzero(a == x))
+    else:
+        below = sum(1 for v in arr if v < x)
+        equal = sum(1 for v in arr if v == x)
+    return round((below + 0.5 * equal) * 100.0 / n, 2)
+
+
+def weekday_histogram(arr, d1):
+    """按星期（周一=0）汇总"""
+    w0 = d1.weekday()
+    if np is not None:
+        weekdays = (np.arange(len(arr)) + w0) % 7
+        return [int(v) for v in np.bincount(weekdays, weights=arr, minlength=7)]
+
+    hist = [0] * 7
+    for i, v in enumerate(arr):
+        hist[(i + w0) % 7] += v
+    return hist
+
+
+def window_sums(arr, window: int):
+    """所有完整窗口的和（用于「最近 7 天」与历史同长度窗口比较）"""
+    n = len(arr)
+    if n < window:
+        return [sum(arr)]
+    if np is not None:
+        cs = np.concatenate(([0], np.cumsum(arr, dtype=np.int64)))
+        return cs[window:] - cs[:-window]
+    cs = array("q", [0])
+    cs.extend(accumulate(arr))
+    return array("q", (cs[i] - cs[i - window] for i in range(window, n + 1)))
+
+
+def _rounded(arr, ndigits: int = 3):
+    if np is not None:
+        return np.round(arr, ndigits).tolist()
+    return [round(v, ndigits) for v in arr]
+
+
+def summarize(total, d1):
+    """对每日总活动数组做汇总分析"""
+    n = len(total)
+    current, longest, longest_start = streaks(total)
+    avg7 = rolling_mean(total, 7)
+    avg30 = rolling_mean(total, 30)
+    last = total[-1] if n else 0
+    sums7 = window_sums(total, 7)
+
+    return {
+        "streak": {
+            "current": current,
+            "longest": longest,
+            "longest_start": (d1 + timedelta(days=longest_start)).isoformat() if longest_start is not None else None,
+            "longest_end": (d1 + timedelta(days=longest_start + longest - 1)).isoformat() if longest_start is not None else None,
+        },
+        "active_days": int(np.count_nonzero(total)) if np is not None else sum(1 for v in total if v > 0),
+        "weekday_histogram": weekday_histogram(total, d1),
+        "rolling": {
+            "avg7": _rounded(avg7),
+            "avg30": _rounded(avg30),
+        },
+        "percentile": {
+            "last_day": percentile_rank(total, last),
+            "last_7_days": percentile_rank(sums7, sums7[-1]),
+        },
+    }
+
+
+def summarize_loop(total, d1):
+    """纯 Python 逐日遍历的参考实现（与 summarize 结果一致，用于基准对比）"""
+    total = list(total)
+    n = len(total)
+
+    longest, longest_start, run = 0, None, 0
+    for i, v in enumerate(total):
+        run = run + 1 if v > 0 else 0
+        if run > longest:
+            longest, longest_start = run, i - run + 1
+    current = 0
+    end = n - 1 if n and total[-1] > 0 else n - 2
+    while end >= 0 and total[end] > 0:
+        current += 1
+        end -= 1
+
+    def rolling(window):
+        out = []
+        for i in range(n):
+            chunk = total[max(i - window + 1, 0): i + 1]
+            out.append(round(sum(chunk) / len(chunk), 3))
+        return out
+
+    def rank(values, x):
+        if not values:
+            return 0.0
+        below = equal = 0
+        for v in values:
+            if v < x:
+                below += 1
+            elif v == x:
+                equal += 1
+        return round((below + 0.5 * equal) * 100.0 / len(values), 2)
+
+    sums7 = [sum(total[i - 7:i]) for i in range(7, n + 1)] if n >= 7 else [sum(total)]
+    hist = [0] * 7
+    for i, v in enumerate(total):
+        hist[(d1 + timedelta(days=i)).weekday()] += v
+
+    return {
+        "streak": {
+            "current": current,
+            "longest": longest,
+            "longest_start": (d1 + timedelta(days=longest_start)).isoformat() if longest_start is not None else None,
+            "longest_end": (d1 + timedelta(days=longest_start + longest - 1)).isoformat() if longest_start is not None else None,
+        },
+        "active_days": sum(1 for v in total if v > 0),
+        "weekday_histogram": hist,
+        "rolling": {"avg7": rolling(7), "avg30": rolling(30)},
+        "percentile": {
+            "last_day": rank(total, total[-1] if n else 0),
+            "last_7_days": rank(sums7, sums7[-1]),
+        },
+    }
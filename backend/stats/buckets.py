@@ -0,0 +1,158 @@
+# stats/buckets.py
+"""
+日历统计的按月缓存：
+- 每个 (用户, 自然月) 一个桶，任意 from/to 由若干月桶拼接后裁剪
+- 过去的月份基本不变，长 TTL；当前月短 TTL
+- 写入路径（stats.rollup.bump 等）只失效受影响的那个月，并递增该月的版本号：
+  读取方计算前后各取一次版本号，变了就不回填，避免基于提交前数据算出的结果在失效之后才写进缓存
+"""
+from datetime import date, datetime, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from todos.models import Todo
+from .models import DailyActivity
+
+PAST_MONTH_TTL = 30 * 24 * 3600
+CURRENT_MONTH_TTL = 60
+
+# 每天的记录：[发帖数, 清单完成项数, 完成待办数, 按时完成, 逾期完成]
+POSTS, CHECKLIST_DONE, TODO_COMPLETED, TODO_ON_TIME, TODO_OVERDUE = range(5)
+
+_GENERATION_KEY = "stats:cal:gen"
+
+
+def day_range(d1: date, d2: date):
+    """inclusive [d1, d2] -> 半开区间 [d1 00:00, d2+1 00:00)，让索引可用"""
+    start = make_aware(datetime(d1.year, d1.month, d1.day))
+    end = make_aware(datetime(d2.year, d2.month, d2.day)) + timedelta(days=1)
+    return start, end
+
+
+def todo_completion_by_day(user_id, d1: date, d2: date):
+    """
+    按完成日分组的 todo 完成数 / 按时完成数 / 逾期完成数：
+    走 (owner, completed_at) 索引，一条 GROUP BY 查询
+    """
+    start, end = day_range(d1, d2)
+    return (
+        Todo.objects.filter(owner_id=user_id, completed_at__gte=start, completed_at__lt=end)
+        .annotate(day=TruncDate("completed_at"))
+        .values("day")
+        .order_by("day")
+        .annotate(
+            completed=Count("id"),
+            on_time=Count("id", filter=Q(due_at__isnull=False, completed_at__lte=F("due_at"))),
+            overdue=Count("id", filter=Q(due_at__isnull=False, completed_at__gt=F("due_at"))),
+        )
+        .values_list("day", "completed", "on_time", "overdue")
+    )
+
+
+def _month_start(d: date) -> date:
+    return d.replace(day=1)
+
+
+def _month_end(d: date) -> date:
+    nxt = (d.replace(day=28) + timedelta(days=4)).replace(day=1)
+    return nxt - timedelta(days=1)
+
+
+def _months(d1: date, d2: date):
+    m = _month_start(d1)
+    while m <= d2:
+        yield m
+        m = _month_end(m) + timedelta(days=1)
+
+
+def _generation() -> int:
+    return cache.get_or_set(_GENERATION_KEY, 1, timeout=None)
+
+
+def _key(user_id, month: date, gen: int) -> str:
+    return f"stats:cal:g{gen}:{user_id}:{month:%Y-%m}"
+
+
+def _version_key(user_id, month: date) -> str:
+    return f"stats:cal:ver:{user_id}:{month:%Y-%m}"
+
+
+def invalidate_month(user_id, day: date):
+    """失效 (user, day 所在月) 的桶，并递增该月版本号"""
+    month = _month_start(day)
+    try:
+        cache.incr(_version_key(user_id, month))
+    except ValueError:
+        cache.set(_version_key(user_id, month), 1, PAST_MONTH_TTL)
+    cache.delete(_key(user_id, month, _generation()))
+
+
+def invalidate_all():
+    """全部桶失效（重建汇总表之后调用）"""
+    try:
+        cache.incr(_GENERATION_KEY)
+    except ValueError:
+        cache.set(_GENERATION_KEY, 2, timeout=None)
+
+
+def _compute(user_id, d1: date, d2: date):
+    """对 [d1, d2] 做一次计算（两条分组查询），按月拆成桶"""
+    buckets = {m: {} for m in _months(d1, d2)}
+
+    def slot(day):
+        return buckets[_month_start(day)].setdefault(day.isoformat(), [0, 0, 0, 0, 0])
+
+    rows = (
+        DailyActivity.objects.filter(user_id=user_id, day__gte=d1, day__lte=d2)
+        .values_list("day", "posts", "checklist_done")
+    )
+    for day, posts, checklist_done in rows:
+        if posts > 0 or checklist_done > 0:
+            rec = slot(day)
+            rec[POSTS] = max(posts, 0)
+            rec[CHECKLIST_DONE] = max(checklist_done, 0)
+
+    for day, completed, on_time, overdue in todo_completion_by_day(user_id, d1, d2):
+        rec = slot(day)
+        rec[TODO_COMPLETED], rec[TODO_ON_TIME], rec[TODO_OVERDUE] = completed, on_time, overdue
+
+    return buckets
+
+
+def calendar_days(user_id, d1: date, d2: date):
+    """
+    返回 [d1, d2] 内有数据的天：{"YYYY-MM-DD": [posts, checklist_done, completed, on_time, overdue]}
+    命中的月份直接取缓存；缺失的月份合并成一个区间一次算完再回填（计算期间被失效的月份不回填）
+    """
+    gen = _generation()
+    months = list(_months(d1, d2))
+    keys = {m: _key(user_id, m, gen) for m in months}
+    cached = cache.get_many(list(keys.values()))
+
+    buckets = {m: cached[k] for m, k in keys.items() if k in cached}
+    missing = [m for m in months if m not in buckets]
+    if missing:
+        version_keys = [_version_key(user_id, m) for m in missing]
+        before = cache.get_many(version_keys)
+        computed = _compute(user_id, missing[0], _month_end(missing[-1]))
+        after = cache.get_many(version_keys)
+        this_month = _month_start(timezone.localdate())
+        for m, vkey in zip(missing, version_keys):
+            buckets[m] = computed[m]
+            if after.get(vkey) != before.get(vkey):
+                continue
+            # 未来月份也可能被写入（如截止日在未来），与当前月一样用短 TTL
+            ttl = PAST_MONTH_TTL if m < this_month else CURRENT_MONTH_TTL
+            cache.set(keys[m], computed[m], ttl)
+
+    lo, hi = d1.isoformat(), d2.isoformat()
+    days = {}
+    for m in months:
+        for day, rec in buckets[m].items():
+            if lo <= day <= hi:
+                days[day] = rec
+    return days
@@ -0,0 +1,43 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from stats.analytics import ENGINE, dense_series, summarize, summarize_loop
+
+
+class Command(BaseCommand):
+    help = "基准：向量化 summarize 与纯 Python 逐日循环的耗时对比（随机数据，不访问数据库）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--years", type=int, default=5)
+        parser.add_argument("--repeat", type=int, default=20)
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        n_days = 365 * options["years"]
+        d1 = date(2020, 1, 1)
+        data = [rng.choice((0, 0, 0, 1, 2, 3, 5, 8)) for _ in range(n_days)]
+
+        total = dense_series([(d1 + timedelta(days=i), v) for i, v in enumerate(data) if v], d1, n_days)
+
+        if summarize(total, d1) != summarize_loop(data, d1):
+            self.stderr.write("结果不一致！")
+            return
+
+        def timeit(fn, arg):
+            best = float("inf")
+            for _ in range(options["repeat"]):
+                t0 = time.perf_counter()
+                fn(arg, d1)
+                best = min(best, time.perf_counter() - t0)
+            return best * 1000
+
+        vec_ms = timeit(summarize, total)
+        loop_ms = timeit(summarize_loop, data)
+        self.stdout.write(f"days={n_days} engine={ENGINE}")
+        self.stdout.write(f"vectorized: {vec_ms:.2f} ms")
+        self.stdout.write(f"python loop: {loop_ms:.2f} ms")
+        self.stdout.write(f"speedup: {loop_ms / vec_ms:.1f}x")
@@ -0,0 +1,82 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+from django.utils.timezone import make_aware
+
+from posts.models import Post, PostComment, PostLike
+from todos.models import Todo
+from stats.models import DailyActivity
+from stats.buckets import invalidate_all
+from stats.rollup import ROLLUP_FIELDS, posts_by_day
+
+
+class Command(BaseCommand):
+    help = "按日期区间从原始数据重算 DailyActivity 汇总表"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--from", dest="date_from", required=True, help="YYYY-MM-DD（含）")
+        parser.add_argument("--to", dest="date_to", required=True, help="YYYY-MM-DD（含）")
+        parser.add_argument("--user", type=int, default=None, help="只重算指定用户 id")
+
+    def handle(self, *args, **options):
+        try:
+            d1 = datetime.strptime(options["date_from"], "%Y-%m-%d").date()
+            d2 = datetime.strptime(options["date_to"], "%Y-%m-%d").date()
+        except ValueError:
+            raise CommandError("--from/--to 格式应为 YYYY-MM-DD")
+        if d2 < d1:
+            raise CommandError("--to 不能早于 --from")
+
+        start = make_aware(datetime(d1.year, d1.month, d1.day))
+        end = make_aware(datetime(d2.year, d2.month, d2.day)) + timedelta(days=1)
+        user_id = options["user"]
+
+        def scoped(qs, field):
+            return qs.filter(**{field: user_id}) if user_id else qs
+
+        totals = {}
+
+        def add(uid, day, field, n):
+            if n:
+                row = totals.setdefault((uid, day), dict.fromkeys(ROLLUP_FIELDS, 0))
+                row[field] += n
+
+        # 每个来源一条 GROUP BY 查询
+        posts = scoped(Post.objects.filter(created_at__gte=start, created_at__lt=end), "author_id")
+        for r in posts_by_day(posts, group_by_author=True):
+            add(r["author_id"], r["day"], "posts", r["posts"])
+            add(r["author_id"], r["day"], "checklist_done", r["done"] or 0)
+
+        todos = scoped(Todo.objects.filter(completed_at__gte=start, completed_at__lt=end), "owner_id")
+        for uid, day, n in (
+            todos.annotate(day=TruncDate("completed_at"))
+            .values("owner_id", "day").annotate(n=Count("id")).values_list("owner_id", "day", "n")
+        ):
+            add(uid, day, "todos_completed", n)
+
+        comments = scoped(PostComment.objects.filter(created_at__gte=start, created_at__lt=end), "author_id")
+        for uid, day, n in (
+            comments.annotate(day=TruncDate("created_at"))
+            .values("author_id", "day").annotate(n=Count("id")).values_list("author_id", "day", "n")
+        ):
+            add(uid, day, "comments", n)
+
+        likes = scoped(PostLike.objects.filter(created_at__gte=start, created_at__lt=end), "post__author_id")
+        for uid, day, n in (
+            likes.annotate(day=TruncDate("created_at"))
+            .values("post__author_id", "day").annotate(n=Count("id")).values_list("post__author_id", "day", "n")
+        ):
+            add(uid, day, "likes_received", n)
+
+        with transaction.atomic():
+            scoped(DailyActivity.objects.filter(day__gte=d1, day__lte=d2), "user_id").delete()
+            DailyActivity.objects.bulk_create(
+                [DailyActivity(user_id=uid, day=day, **counts) for (uid, day), counts in totals.items()],
+                batch_size=1000,
+            )
+        invalidate_all()
+
+        self.stdout.write(f"已重算 {d1} ~ {d2}：{len(totals)} 行")
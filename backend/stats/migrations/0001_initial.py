@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-19 14:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyActivity',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('posts', models.IntegerField(default=0)),
+                ('checklist_done', models.IntegerField(default=0)),
+                ('todos_completed', models.IntegerField(default=0)),
+                ('comments', models.IntegerField(default=0)),
+                ('likes_received', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_activity', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('user', 'day'), name='uniq_daily_activity_user_day')],
+            },
+        ),
+    ]
@@ -1,3 +1,25 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+
+class DailyActivity(models.Model):
+    """
+    每用户每天的活动汇总：由各写入路径用 F() 增量维护，日历统计只读这张小表
+    （出现偏差时用 manage.py rebuild_daily_activity 按区间重算）
+    """
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="daily_activity")
+    day = models.DateField()
+
+    posts = models.IntegerField(default=0)            # 发帖数
+    checklist_done = models.IntegerField(default=0)   # 清单完成项数（按帖子发布日）
+    todos_completed = models.IntegerField(default=0)  # 完成的 todo 数（按完成日）
+    comments = models.IntegerField(default=0)         # 发出的评论数
+    likes_received = models.IntegerField(default=0)   # 收到的点赞数（按点赞日）
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "day"], name="uniq_daily_activity_user_day"),
+        ]
+
+    def __str__(self):
+        return f"DailyActivity(user={self.user_id}, day={self.day})"
@@ -0,0 +1,84 @@
+# stats/rollup.py
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, F, IntegerField, Sum
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import DailyActivity
+from .buckets import invalidate_month
+
+ROLLUP_FIELDS = ("posts", "checklist_done", "todos_completed", "comments", "likes_received")
+
+# 单个清单帖子中 done=true 的项数（按数据库方言下推到 SQL；非清单帖子为 0）
+_CHECKLIST_DONE_SQL = {
+    "sqlite": (
+        "CASE WHEN posts_post.type = 'checklist' AND json_type(posts_post.checklist_items) = 'array' "
+        "THEN (SELECT COUNT(*) FROM json_each(posts_post.checklist_items) "
+        "WHERE type = 'object' AND json_type(value, '$.done') = 'true') ELSE 0 END"
+    ),
+    "postgresql": (
+        "CASE WHEN posts_post.type = 'checklist' AND jsonb_typeof(posts_post.checklist_items) = 'array' "
+        "THEN (SELECT COUNT(*) FROM jsonb_array_elements(posts_post.checklist_items) AS it "
+        "WHERE it -> 'done' = 'true'::jsonb) ELSE 0 END"
+    ),
+}
+
+
+def day_of(dt):
+    """与 TruncDate 一致：按当前时区取日期"""
+    return timezone.localtime(dt).date() if timezone.is_aware(dt) else dt.date()
+
+
+def count_done_items(items) -> int:
+    return sum(1 for it in (items or []) if isinstance(it, dict) and it.get("done") is True)
+
+
+def bump(user_id, day, **deltas):
+    """
+    对 (user, day) 的计数做原子增减：先 UPDATE ... SET x = x + n，
+    行不存在时再插入（并发插入冲突则回退为 UPDATE）
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas or user_id is None:
+        return
+
+    exprs = {k: F(k) + v for k, v in deltas.items()}
+    qs = DailyActivity.objects.filter(user_id=user_id, day=day)
+    if not qs.update(**exprs):
+        try:
+            with transaction.atomic():
+                DailyActivity.objects.create(user_id=user_id, day=day, **deltas)
+        except IntegrityError:
+            qs.update(**exprs)
+
+    # 日历统计的月缓存：只失效这一天所在的月；等事务提交后再失效，
+    # 否则并发读可能在提交前把旧数据重新写回缓存
+    transaction.on_commit(lambda: invalidate_month(user_id, day))
+
+
+def posts_by_day(qs, group_by_author=False):
+    """
+    帖子按天分组：返回 [{"day", "posts", "done"[, "author_id"]}]，
+    清单完成项数能下推到 SQL 时只需一条 GROUP BY 查询
+    """
+    keys = ["author_id", "day"] if group_by_author else ["day"]
+    grouped = qs.annotate(day=TruncDate("created_at")).values(*keys).order_by(*keys)
+
+    done_sql = _CHECKLIST_DONE_SQL.get(connection.vendor)
+    if done_sql:
+        return list(grouped.annotate(
+            posts=Count("id"),
+            done=Sum(RawSQL(done_sql, [], output_field=IntegerField())),
+        ))
+
+    # 退路：只取清单帖子的 checklist_items 在 Python 里计数
+    rows = {tuple(r[k] for k in keys): {**r, "done": 0} for r in grouped.annotate(posts=Count("id"))}
+    checklist = (
+        qs.filter(type="checklist")
+        .annotate(day=TruncDate("created_at"))
+        .values_list(*keys, "checklist_items")
+    )
+    for *key, items in checklist:
+        rows[tuple(key)]["done"] += count_done_items(items)
+    return list(rows.values())
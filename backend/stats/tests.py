@@ -1,3 +1,118 @@
+from datetime import date, timedelta
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from users.models import User
+from . import buckets
+from .analytics import dense_series, summarize, summarize_loop
+from .buckets import POSTS, calendar_days, invalidate_month
+from .models import DailyActivity
+from .rollup import bump
+
+
+class StatsTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", email="alice@example.com")
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def activity(self, day, **counts):
+        DailyActivity.objects.create(user=self.user, day=day, **counts)
+
+
+class StatsSummaryTests(StatsTestCase):
+    def test_summary_payload(self):
+        d1 = date(2026, 3, 1)
+        # 3/2~3/4 连续三天，3/9 一天
+        for offset, posts in ((1, 2), (2, 1), (3, 4), (8, 1)):
+            self.activity(d1 + timedelta(days=offset), posts=posts)
+        self.activity(d1 + timedelta(days=9), todos_completed=2, comments=1)
+
+        resp = self.client.get("/api/stats/summary/", {"from": "2026-03-01", "to": "2026-03-10"})
+        self.assertEqual(resp.status_code, 200)
+        data = resp.data
+        self.assertEqual(data["range"], {"from": "2026-03-01", "to": "2026-03-10", "days": 10})
+        self.assertEqual(data["totals"], {"posts": 8, "checklist_done": 0, "todos_completed": 2, "comments": 1})
+        self.assertEqual(data["streak"]["current"], 2)
+        self.assertEqual(data["streak"]["longest"], 3)
+        self.assertEqual((data["streak"]["longest_start"], data["streak"]["longest_end"]), ("2026-03-02", "2026-03-04"))
+        self.assertEqual(data["active_days"], 5)
+        self.assertEqual(sum(data["weekday_histogram"]), 11)
+        self.assertEqual(len(data["rolling"]["avg7"]), 10)
+        self.assertEqual(data["hour_histogram"], [0] * 24)
+
+    def test_other_users_activity_is_excluded(self):
+        other = User.objects.create_user(username="bob", email="bob@example.com")
+        DailyActivity.objects.create(user=other, day=date(2026, 3, 1), posts=5)
+        resp = self.client.get("/api/stats/summary/", {"from": "2026-03-01", "to": "2026-03-01"})
+        self.assertEqual(resp.data["totals"]["posts"], 0)
+
+    def test_invalid_range(self):
+        self.assertEqual(self.client.get("/api/stats/summary/", {"from": "2026-03-02", "to": "2026-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/stats/summary/", {"from": "2010-01-01", "to": "2026-03-01"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/stats/summary/", {"from": "03/01"}).status_code, 400)
+
+    def test_vectorized_matches_loop(self):
+        d1 = date(2026, 1, 1)
+        pairs = [(d1 + timedelta(days=i), (i * 7) % 5) for i in range(0, 90, 2)]
+        total = dense_series(pairs, d1, 90)
+        self.assertEqual(summarize(total, d1), summarize_loop(total, d1))
+
+
+class CalendarBucketTests(StatsTestCase):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.activity(date(2026, 1, 10), posts=1)
+        self.activity(date(2026, 2, 20), posts=2)
+        self.activity(date(2026, 3, 5), posts=3)
+
+    def days(self, d1=date(2026, 1, 15), d2=date(2026, 3, 10)):
+        with CaptureQueriesContext(connection) as ctx:
+            result = calendar_days(self.user.id, d1, d2)
+        return result, len(ctx.captured_queries)
+
+    def test_months_are_stitched_and_trimmed(self):
+        days, queries = self.days()
+        self.assertEqual({k: v[POSTS] for k, v in days.items()}, {"2026-02-20": 2, "2026-03-05": 3})
+        self.assertEqual(queries, 2)
+
+        # 三个月桶都已缓存：换一个落在其中的区间不再查库
+        days, queries = self.days(date(2026, 1, 1), date(2026, 2, 28))
+        self.assertEqual(queries, 0)
+        self.assertEqual(sorted(days), ["2026-01-10", "2026-02-20"])
+
+    def test_write_invalidates_only_its_month_after_commit(self):
+        self.days()
+        with self.captureOnCommitCallbacks(execute=True):
+            bump(self.user.id, date(2026, 2, 21), posts=1)
+        days, queries = self.days()
+        self.assertEqual(days["2026-02-21"][POSTS], 1)
+        self.assertEqual(queries, 2)
+        # 只有二月被重算，一、三月仍命中
+        self.assertEqual(self.days()[1], 0)
+
+    def test_invalidation_during_compute_skips_backfill(self):
+        compute = buckets._compute
+
+        def racing_compute(user_id, d1, d2):
+            # 读取方已经算完（基于旧数据），写入方此时提交并失效二月
+            result = compute(user_id, d1, d2)
+            DailyActivity.objects.filter(user=self.user, day=date(2026, 2, 20)).update(posts=9)
+            invalidate_month(user_id, date(2026, 2, 20))
+            return result
+
+        with mock.patch.object(buckets, "_compute", racing_compute):
+            stale, _ = self.days()
+        self.assertEqual(stale["2026-02-20"][POSTS], 2)
 
-# Create your tests here.
+        # 二月没有被旧结果回填，下次读到新值；一、三月照常缓存
+        days, queries = self.days(date(2026, 2, 1), date(2026, 2, 28))
+        self.assertEqual(days["2026-02-20"][POSTS], 9)
+        self.assertEqual(queries, 2)
+        self.assertEqual(self.days(date(2026, 3, 1), date(2026, 3, 31))[1], 0)
@@ -1,6 +1,7 @@
 from django.urls import path
-from .views import CalendarStatsAPIView
+from .views import CalendarStatsAPIView, StatsSummaryAPIView
 
 urlpatterns = [
     path("calendar/", CalendarStatsAPIView.as_view(), name="calendar-stats"),
+    path("summary/", StatsSummaryAPIView.as_view(), name="stats-summary"),
 ]
@@ -1,10 +1,20 @@
-from datetime import datetime, date
-from django.utils.timezone import make_aware
+from datetime import datetime, date, timedelta
+from django.db.models import Count
+from django.db.models.functions import ExtractHour
+from django.utils import timezone
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 
 from posts.models import Post
+from .models import DailyActivity
+from .analytics import ENGINE, dense_series, summarize
+from .buckets import (
+    POSTS, CHECKLIST_DONE, TODO_COMPLETED, TODO_ON_TIME, TODO_OVERDUE,
+    calendar_days, day_range,
+)
+
+SUMMARY_MAX_DAYS = 366 * 10
 
 
 def _parse_date(s: str) -> date:
@@ -22,6 +32,10 @@ class CalendarStatsAPIView(APIView):
         {
           "activity": [["2026-01-01", 3], ...],     # 发帖数
           "completion": [["2026-01-01", 5], ...],   # 完成项数（checklist done）
+          "todo_completion": [["2026-01-01", 2], ...],  # 完成的 todo 数
+          "todo_on_time": [["2026-01-01", 1], ...],     # 截止前完成
+          "todo_overdue": [["2026-01-01", 1], ...],     # 逾期完成
+          "todo_summary": {"completed": 2, "on_time": 1, "overdue": 1, "no_due": 0},
           "meta": {...}
         }
         """
@@ -34,48 +48,120 @@ class CalendarStatsAPIView(APIView):
                 status=400,
             )
 
-        d1 = _parse_date(qs_from)
-        d2 = _parse_date(qs_to)
-
-        # inclusive -> [d1 00:00, d2+1 00:00)
-        start = make_aware(datetime(d1.year, d1.month, d1.day, 0, 0, 0))
-        end = make_aware(datetime(d2.year, d2.month, d2.day, 0, 0, 0))  # midnight of d2
-        # end should be next day
-        end = end.replace(day=end.day)  # no-op, clarity
-
-        # 用 ORM 拉出范围内帖子（只算本人，避免隐私争议；你以后做团队再扩展）
-        posts = (
-            Post.objects.filter(author=request.user, created_at__date__gte=d1, created_at__date__lte=d2)
-            .only("id", "type", "checklist_items", "created_at")
-            .order_by("created_at")
-        )
-
-        activity_map = {}
-        completion_map = {}
+        try:
+            d1 = _parse_date(qs_from)
+            d2 = _parse_date(qs_to)
+        except ValueError:
+            return Response(
+                {"message": "from/to 格式应为 YYYY-MM-DD", "details": {"from": qs_from, "to": qs_to}},
+                status=400,
+            )
 
-        for p in posts:
-          day = p.created_at.date().isoformat()
+        # 按月缓存桶拼接：过去的月份几乎总是命中，只有当前月/被写入过的月份需要重算
+        days = calendar_days(request.user.id, d1, d2)
+        keys = sorted(days.keys())
 
-          # 活动：发帖数
-          activity_map[day] = activity_map.get(day, 0) + 1
+        def series(idx):
+            return [[k, days[k][idx]] for k in keys if days[k][idx]]
 
-          # 完成：仅清单 done 项数（目前系统里唯一“完成语义”）
-          if (p.type or "").lower() == "checklist":
-              items = p.checklist_items or []
-              done_cnt = sum(1 for it in items if isinstance(it, dict) and it.get("done") is True)
-              if done_cnt:
-                  completion_map[day] = completion_map.get(day, 0) + done_cnt
+        activity = series(POSTS)
+        completion = [
+            [k, days[k][CHECKLIST_DONE]] for k in keys if days[k][POSTS] or days[k][CHECKLIST_DONE]
+        ]
 
-        activity = [[k, activity_map[k]] for k in sorted(activity_map.keys())]
-        completion = [[k, completion_map.get(k, 0)] for k in sorted(set(activity_map.keys()) | set(completion_map.keys()))]
+        todo_completion = series(TODO_COMPLETED)
+        todo_on_time = [[k, days[k][TODO_ON_TIME]] for k in keys if days[k][TODO_COMPLETED]]
+        todo_overdue = [[k, days[k][TODO_OVERDUE]] for k in keys if days[k][TODO_COMPLETED]]
+        completed_total = sum(days[k][TODO_COMPLETED] for k in keys)
+        on_time_total = sum(days[k][TODO_ON_TIME] for k in keys)
+        overdue_total = sum(days[k][TODO_OVERDUE] for k in keys)
 
         return Response(
             {
                 "activity": activity,
                 "completion": completion,
+                "todo_completion": todo_completion,
+                "todo_on_time": todo_on_time,
+                "todo_overdue": todo_overdue,
+                "todo_summary": {
+                    "completed": completed_total,
+                    "on_time": on_time_total,
+                    "overdue": overdue_total,
+                    "no_due": completed_total - on_time_total - overdue_total,
+                },
                 "meta": {
                     "activity_label": "发帖数",
                     "completion_label": "完成项数（清单勾选）",
+                    "todo_completion_label": "完成待办数",
+                    "scope": "me",
+                },
+            }
+        )
+
+
+class StatsSummaryAPIView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        """
+        GET /api/stats/summary/?from=YYYY-MM-DD&to=YYYY-MM-DD（缺省为截至今天的最近 365 天）
+
+        基于 DailyActivity 的稠密数组计算：当前/最长连续活跃天数、星期分布、
+        7/30 日滑动平均、百分位；小时分布来自发帖时间的 GROUP BY
+        """
+        qs_from = (request.query_params.get("from") or "").strip()
+        qs_to = (request.query_params.get("to") or "").strip()
+
+        try:
+            d2 = _parse_date(qs_to) if qs_to else timezone.localdate()
+            d1 = _parse_date(qs_from) if qs_from else d2 - timedelta(days=364)
+        except ValueError:
+            return Response(
+                {"message": "from/to 格式应为 YYYY-MM-DD", "details": {"from": qs_from, "to": qs_to}},
+                status=400,
+            )
+
+        n_days = (d2 - d1).days + 1
+        if n_days <= 0 or n_days > SUMMARY_MAX_DAYS:
+            return Response(
+                {"message": "时间范围非法", "details": {"from": d1.isoformat(), "to": d2.isoformat()}},
+                status=400,
+            )
+
+        rows = list(
+            DailyActivity.objects.filter(user=request.user, day__gte=d1, day__lte=d2)
+            .values_list("day", "posts", "checklist_done", "todos_completed", "comments")
+        )
+        totals = {
+            "posts": sum(r[1] for r in rows),
+            "checklist_done": sum(r[2] for r in rows),
+            "todos_completed": sum(r[3] for r in rows),
+            "comments": sum(r[4] for r in rows),
+        }
+        total = dense_series([(r[0], r[1] + r[2] + r[3] + r[4]) for r in rows], d1, n_days)
+
+        start, end = day_range(d1, d2)
+        hours = (
+            Post.objects.filter(author=request.user, created_at__gte=start, created_at__lt=end)
+            .annotate(hour=ExtractHour("created_at"))
+            .values("hour")
+            .annotate(n=Count("id"))
+            .values_list("hour", "n")
+        )
+        hour_histogram = [0] * 24
+        for hour, n in hours:
+            hour_histogram[hour] = n
+
+        return Response(
+            {
+                "range": {"from": d1.isoformat(), "to": d2.isoformat(), "days": n_days},
+                "totals": totals,
+                **summarize(total, d1),
+                "hour_histogram": hour_histogram,
+                "meta": {
+                    "activity_label": "发帖 + 清单完成 + 待办完成 + 评论",
+                    "hour_histogram_label": "发帖时段",
+                    "engine": ENGINE,
                     "scope": "me",
                 },
             }
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class TaskqueueConfig(AppConfig):
+    name = 'taskqueue'
+
+    def ready(self):
+        # 各 app 的 tasks.py 在此注册任务（worker 子进程按名字查找）
+        autodiscover_modules("tasks")
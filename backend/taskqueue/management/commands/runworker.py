@@ -0,0 +1,39 @@
+import signal
+import threading
+
+from django.core.management.base import BaseCommand
+
+from taskqueue.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "运行数据库任务队列的 worker（常驻进程）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=4, help="并发执行的任务数")
+        parser.add_argument("--processes", action="store_true", help="用进程池代替线程池（CPU 密集型任务）")
+        parser.add_argument("--interval", type=float, default=1.0, help="队列为空时的轮询间隔（秒）")
+        parser.add_argument("--once", action="store_true", help="只领取并执行一批后退出")
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=max(1, options["concurrency"]), use_processes=options["processes"])
+
+        if options["once"]:
+            n = worker.run_once()
+            self.stdout.write(f"processed={n}")
+            return
+
+        stop = threading.Event()
+
+        def request_stop(signum, frame):
+            stop.set()
+
+        signal.signal(signal.SIGTERM, request_stop)
+        self.stdout.write(
+            f"任务 worker 已启动（{'进程' if options['processes'] else '线程'}池 x{worker.concurrency}）"
+        )
+        try:
+            worker.run(poll_interval=options["interval"], stop=stop)
+        except KeyboardInterrupt:
+            stop.set()
+        self.stdout.write("任务 worker 已停止")
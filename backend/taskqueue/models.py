@@ -0,0 +1,49 @@
+from django.db import models
+
+
+class Task(models.Model):
+    """
+    数据库任务队列中的一条任务
+
+    - queued：等待执行（run_at 之后可被领取；重试时 run_at 按退避推后）
+    - running：已被某个 worker 领取；locked_until 为可见性超时，
+      超时仍未完成（worker 崩溃/卡死）会被重新领取
+    - done / failed：终态，定期清理
+    """
+    STATUS_QUEUED = "queued"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, "Queued"),
+        (STATUS_RUNNING, "Running"),
+        (STATUS_DONE, "Done"),
+        (STATUS_FAILED, "Failed"),
+    ]
+
+    name = models.CharField(max_length=200)
+    args = models.JSONField(blank=True, default=list)
+    kwargs = models.JSONField(blank=True, default=dict)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField()
+
+    locked_by = models.CharField(max_length=64, blank=True, default="")
+    locked_until = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # 领取：status + 到期时间
+            models.Index(fields=["status", "run_at"], name="task_status_run_at_idx"),
+            models.Index(fields=["status", "locked_until"], name="task_status_locked_idx"),
+            models.Index(fields=["locked_by"], name="task_locked_by_idx"),
+        ]
+
+    def __str__(self):
+        return f"Task({self.id}) {self.name} [{self.status}]"
@@ -0,0 +1,88 @@
+# taskqueue/registry.py
+"""
+任务注册与入队
+
+    from taskqueue.registry import task
+
+    @task(max_attempts=3, timeout=60)
+    def delete_files(names): ...
+
+    delete_files.delay(["posts/1/a.png"])   # 当前事务提交后写入队列，由 runworker 执行
+
+参数会存进 JSONField，只能传可 JSON 序列化的值（id、字符串等），不要传模型实例
+"""
+import json
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_TIMEOUT = 300  # 秒：可见性超时
+
+_registry = {}
+
+
+class TaskFunction:
+    def __init__(self, func, name, max_attempts, timeout):
+        self.func = func
+        self.name = name
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        enqueue(self.name, args, kwargs)
+
+    def delay_in(self, seconds, *args, **kwargs):
+        enqueue(self.name, args, kwargs, countdown=seconds)
+
+
+def task(name=None, max_attempts=DEFAULT_MAX_ATTEMPTS, timeout=DEFAULT_TIMEOUT):
+    def decorator(func):
+        task_name = name or f"{func.__module__}.{func.__name__}"
+        tf = TaskFunction(func, task_name, max_attempts, timeout)
+        _registry[task_name] = tf
+        return tf
+    return decorator
+
+
+def get_task(name):
+    return _registry.get(name)
+
+
+def enqueue(name, args=(), kwargs=None, countdown=0):
+    """在当前事务提交后入队（事务回滚则不入队；不在事务中时立即入队）"""
+    tf = _registry.get(name)
+    if tf is None:
+        raise KeyError(f"未注册的任务: {name}")
+    args, kwargs = list(args), dict(kwargs or {})
+    json.dumps([args, kwargs])  # 尽早在调用处暴露不可序列化的参数
+
+    if getattr(settings, "TASK_QUEUE_EAGER", False):
+        def run():
+            try:
+                tf.func(*args, **kwargs)
+            except Exception:
+                logger.exception("Eager task %s failed", name)
+        transaction.on_commit(run)
+        return
+
+    def insert():
+        Task.objects.create(
+            name=name,
+            args=args,
+            kwargs=kwargs,
+            max_attempts=tf.max_attempts,
+            run_at=timezone.now() + timedelta(seconds=countdown),
+        )
+
+    transaction.on_commit(insert)
@@ -0,0 +1,131 @@
+from concurrent.futures import Future
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from .models import Task
+from .registry import enqueue, task
+from .worker import TIMED_OUT_ERROR, Worker
+
+calls = []
+
+
+@task(name="taskqueue.tests.record")
+def record(value):
+    calls.append(value)
+
+
+@task(name="taskqueue.tests.boom", max_attempts=2)
+def boom():
+    raise RuntimeError("boom")
+
+
+class InlinePool:
+    """在调用线程里直接执行，结果装进已完成的 Future"""
+
+    def submit(self, fn, *args):
+        fut = Future()
+        fut.set_result(fn(*args))
+        return fut
+
+
+class EnqueueTests(TestCase):
+    def test_enqueue_waits_for_commit(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            record.delay(1)
+            self.assertFalse(Task.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+        t = Task.objects.get()
+        self.assertEqual((t.name, t.args, t.status), ("taskqueue.tests.record", [1], Task.STATUS_QUEUED))
+
+    def test_rolled_back_transaction_enqueues_nothing(self):
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            try:
+                with transaction.atomic():
+                    record.delay(1)
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(callbacks, [])
+        self.assertFalse(Task.objects.exists())
+
+    def test_unknown_task_and_unserializable_args(self):
+        with self.assertRaises(KeyError):
+            enqueue("taskqueue.tests.missing")
+        with self.assertRaises(TypeError):
+            record.delay(object())
+
+
+class WorkerTests(TransactionTestCase):
+    # execute() 会调用 close_old_connections()，不能放在 TestCase 的外层事务里跑
+    def setUp(self):
+        calls.clear()
+        self.worker = Worker(concurrency=2)
+
+    def make(self, name="taskqueue.tests.record", args=(), run_in=0, **fields):
+        return Task.objects.create(
+            name=name, args=list(args), run_at=timezone.now() + timedelta(seconds=run_in), **fields
+        )
+
+    def run_once(self):
+        return self.worker.run_once(pool=InlinePool())
+
+    def test_claims_due_tasks_oldest_first(self):
+        late = self.make(args=[3], run_in=-10)
+        early = self.make(args=[1], run_in=-60)
+        self.make(args=[9], run_in=3600)
+
+        self.assertEqual([t.id for t in self.worker.claim(1)], [early.id])
+        self.assertEqual([t.id for t in self.worker.claim(5)], [late.id])
+        self.assertEqual(self.worker.claim(5), [])
+
+    def test_runs_and_finishes(self):
+        t = self.make(args=[7])
+        self.assertEqual(self.run_once(), 1)
+        t.refresh_from_db()
+        self.assertEqual(calls, [7])
+        self.assertEqual((t.status, t.attempts, t.locked_until), (Task.STATUS_DONE, 1, None))
+
+    def test_failure_backs_off_then_fails(self):
+        t = self.make(name="taskqueue.tests.boom", max_attempts=2)
+        before = timezone.now()
+        with self.assertLogs("taskqueue.worker", "WARNING"):
+            self.run_once()
+        t.refresh_from_db()
+        self.assertEqual((t.status, t.attempts), (Task.STATUS_QUEUED, 1))
+        self.assertGreater(t.run_at, before)
+        self.assertIn("boom", t.last_error)
+        # 退避期内不会被领取
+        self.assertEqual(self.run_once(), 0)
+
+        Task.objects.filter(pk=t.pk).update(run_at=timezone.now())
+        with self.assertLogs("taskqueue.worker", "ERROR"):
+            self.run_once()
+        t.refresh_from_db()
+        self.assertEqual((t.status, t.attempts), (Task.STATUS_FAILED, 2))
+
+    def test_exhausted_timed_out_task_is_not_claimed(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        self.make(status=Task.STATUS_RUNNING, attempts=5, locked_by="dead", locked_until=expired)
+        self.assertEqual(self.worker.claim(5), [])
+
+    def test_visibility_timeout_reclaims_until_attempts_run_out(self):
+        expired = timezone.now() - timedelta(seconds=1)
+        stuck = self.make(args=[1], status=Task.STATUS_RUNNING, attempts=1, locked_by="dead", locked_until=expired)
+        exhausted = self.make(status=Task.STATUS_RUNNING, attempts=5, locked_by="dead", locked_until=expired)
+        alive = self.make(
+            status=Task.STATUS_RUNNING, attempts=1, locked_by="busy",
+            locked_until=timezone.now() + timedelta(minutes=5),
+        )
+
+        with self.assertLogs("taskqueue.worker", "ERROR"):
+            self.assertEqual(self.run_once(), 1)
+        stuck.refresh_from_db()
+        self.assertEqual((stuck.status, stuck.attempts), (Task.STATUS_DONE, 2))
+
+        exhausted.refresh_from_db()
+        self.assertEqual((exhausted.status, exhausted.last_error), (Task.STATUS_FAILED, TIMED_OUT_ERROR))
+        alive.refresh_from_db()
+        self.assertEqual(alive.status, Task.STATUS_RUNNING)
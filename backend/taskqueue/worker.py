@@ -0,0 +1,190 @@
+# taskqueue/worker.py
+"""
+runworker 的执行循环：
+
+- 领取：一条条件 UPDATE 把到期的 queued 任务（或可见性超时的 running 任务）
+  标记为本次领取令牌；WHERE 在 UPDATE 时重新求值，多个 worker 并发领取不会拿到同一条
+  （PostgreSQL 下候选子查询带 FOR UPDATE SKIP LOCKED，减少互相等待）
+- 执行：线程池或进程池；超时的任务无法强行中断，只会在可见性超时后被别的 worker 重新领取
+  （同样受 max_attempts 限制；次数用完仍超时的由 sweep 标记为 failed，卡死或拖垮 worker 的任务不会无限重跑）
+- 失败：按指数退避（带抖动）重新排队，超过 max_attempts 标记为 failed
+"""
+import logging
+import multiprocessing
+import os
+import random
+import socket
+import threading
+import traceback
+import uuid
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import timedelta
+
+from django.db import close_old_connections, connection, connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .registry import DEFAULT_TIMEOUT, get_task
+
+logger = logging.getLogger(__name__)
+
+BACKOFF_BASE = 5  # 秒
+BACKOFF_MAX = 60 * 60
+DONE_RETENTION = timedelta(days=7)
+SWEEP_INTERVAL = timedelta(minutes=1)
+TIMED_OUT_ERROR = "执行超时（worker 崩溃或卡死），重试次数已用完"
+
+
+def backoff(attempts: int) -> float:
+    """第 n 次失败后的等待秒数：base * 2^(n-1)，封顶，±25% 抖动"""
+    delay = min(BACKOFF_BASE * 2 ** max(attempts - 1, 0), BACKOFF_MAX)
+    return delay * random.uniform(0.75, 1.25)
+
+
+def execute(name, args, kwargs):
+    """在工作线程/子进程中执行；异常转成字符串返回，便于跨进程传递"""
+    close_old_connections()
+    try:
+        tf = get_task(name)
+        if tf is None:
+            return f"未注册的任务: {name}"
+        tf.func(*args, **kwargs)
+        return None
+    except Exception:
+        return traceback.format_exc()
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    def __init__(self, concurrency=4, use_processes=False, batch_size=None):
+        self.concurrency = concurrency
+        self.use_processes = use_processes
+        self.batch_size = batch_size or concurrency
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+    def _eligible(self, now):
+        return Q(status=Task.STATUS_QUEUED, run_at__lte=now) | Q(
+            status=Task.STATUS_RUNNING, locked_until__lt=now, attempts__lt=F("max_attempts")
+        )
+
+    def claim(self, limit):
+        now = timezone.now()
+        token = f"{self.worker_id}:{uuid.uuid4().hex[:12]}"
+        # 单条 UPDATE ... WHERE id IN (SELECT ... LIMIT n)：SQLite 上不会出现「先读后写」的锁升级冲突
+        candidates = Task.objects.filter(self._eligible(now)).order_by("run_at").values("id")
+        if connection.features.has_select_for_update_skip_locked:
+            candidates = candidates.select_for_update(skip_locked=True)
+        with transaction.atomic():
+            claimed = Task.objects.filter(self._eligible(now), id__in=candidates[:limit]).update(
+                status=Task.STATUS_RUNNING,
+                locked_by=token,
+                locked_until=now + timedelta(seconds=DEFAULT_TIMEOUT),
+                attempts=F("attempts") + 1,
+                updated_at=now,
+            )
+        if not claimed:
+            return []
+        tasks = list(Task.objects.filter(locked_by=token, status=Task.STATUS_RUNNING))
+        # 按任务自身的超时修正可见性期限
+        for t in tasks:
+            tf = get_task(t.name)
+            timeout = tf.timeout if tf else DEFAULT_TIMEOUT
+            if timeout != DEFAULT_TIMEOUT:
+                Task.objects.filter(id=t.id, locked_by=token).update(locked_until=now + timedelta(seconds=timeout))
+        return tasks
+
+    def finish(self, t, error):
+        now = timezone.now()
+        qs = Task.objects.filter(id=t.id, locked_by=t.locked_by, status=Task.STATUS_RUNNING)
+        if error is None:
+            qs.update(status=Task.STATUS_DONE, locked_until=None, last_error="", updated_at=now)
+            return
+        if t.attempts >= t.max_attempts:
+            qs.update(status=Task.STATUS_FAILED, locked_until=None, last_error=error, updated_at=now)
+            logger.error("Task %s (%s) failed permanently after %s attempts", t.id, t.name, t.attempts)
+            return
+        qs.update(
+            status=Task.STATUS_QUEUED,
+            locked_by="",
+            locked_until=None,
+            run_at=now + timedelta(seconds=backoff(t.attempts)),
+            last_error=error,
+            updated_at=now,
+        )
+        logger.warning("Task %s (%s) failed, attempt %s/%s", t.id, t.name, t.attempts, t.max_attempts)
+
+    def sweep(self):
+        """可见性超时且重试次数已用完的 running 任务不会再被领取，标记为 failed"""
+        now = timezone.now()
+        n = Task.objects.filter(
+            status=Task.STATUS_RUNNING, locked_until__lt=now, attempts__gte=F("max_attempts")
+        ).update(status=Task.STATUS_FAILED, locked_until=None, last_error=TIMED_OUT_ERROR, updated_at=now)
+        if n:
+            logger.error("%s timed-out tasks failed permanently", n)
+        return n
+
+    def prune(self):
+        cutoff = timezone.now() - DONE_RETENTION
+        return Task.objects.filter(status=Task.STATUS_DONE, updated_at__lt=cutoff).delete()[0]
+
+    def make_pool(self):
+        if self.use_processes:
+            # fork 前关闭连接，子进程各自重连
+            connections.close_all()
+            return ProcessPoolExecutor(self.concurrency, mp_context=multiprocessing.get_context("fork"))
+        return ThreadPoolExecutor(self.concurrency, thread_name_prefix="taskqueue")
+
+    def run_once(self, pool=None):
+        """领取一批并等待全部完成，返回处理条数（--once / 测试用）"""
+        own = pool is None
+        pool = pool or self.make_pool()
+        try:
+            self.sweep()
+            tasks = self.claim(self.batch_size)
+            futures = {pool.submit(execute, t.name, t.args, t.kwargs): t for t in tasks}
+            for fut, t in futures.items():
+                self.finish(t, self._result(fut))
+            return len(tasks)
+        finally:
+            if own:
+                pool.shutdown()
+
+    def run(self, poll_interval=1.0, stop=None):
+        """常驻：池内有空位就领取新任务，队列为空时按 poll_interval 轮询"""
+        stop = stop or threading.Event()
+        pool = self.make_pool()
+        running = {}
+        last_prune = last_sweep = timezone.now()
+        self.sweep()
+        try:
+            while not stop.is_set():
+                free = self.concurrency - len(running)
+                if free > 0:
+                    for t in self.claim(free):
+                        running[pool.submit(execute, t.name, t.args, t.kwargs)] = t
+                if running:
+                    done, _ = wait(list(running), timeout=poll_interval, return_when=FIRST_COMPLETED)
+                    for fut in done:
+                        self.finish(running.pop(fut), self._result(fut))
+                else:
+                    stop.wait(poll_interval)
+                if timezone.now() - last_sweep > SWEEP_INTERVAL:
+                    self.sweep()
+                    last_sweep = timezone.now()
+                if timezone.now() - last_prune > timedelta(hours=1):
+                    self.prune()
+                    last_prune = timezone.now()
+        finally:
+            # 等待进行中的任务结束再退出；来不及的由可见性超时兜底
+            for fut in wait(list(running)).done:
+                self.finish(running[fut], self._result(fut))
+            pool.shutdown()
+
+    @staticmethod
+    def _result(fut):
+        try:
+            return fut.result()
+        except Exception:  # 子进程崩溃等
+            return traceback.format_exc()
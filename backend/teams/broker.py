@@ -0,0 +1,133 @@
+# teams/broker.py
+"""
+团队实时事件的发布/订阅：
+
+- Broker 是接口：publish(channel, event) 由写接口（同步视图线程）调用，
+  subscribe(channel) 返回在事件循环里消费的 Subscription
+- 默认 InProcessBroker：单进程内存实现，每个订阅者一个有界 asyncio.Queue，
+  空闲连接只占一个队列和一个挂起的协程，不占线程
+- 多进程部署时实现同样接口的共享 broker（如 Redis pub/sub），
+  通过 settings.TEAM_EVENT_BROKER 指定类路径即可替换
+"""
+import asyncio
+import json
+import logging
+import threading
+
+from django.conf import settings
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+def team_channel(team_id) -> str:
+    return f"team:{int(team_id)}"
+
+
+class Subscription:
+    """单个订阅者：在自己的事件循环里 await get()，慢消费者满队列时丢最旧事件"""
+
+    def __init__(self, broker, channel, maxsize=SUBSCRIBER_QUEUE_SIZE):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def _deliver(self, event):
+        # 只在 self.loop 线程内调用
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        """可从任意线程调用"""
+        try:
+            self.loop.call_soon_threadsafe(self._deliver, event)
+        except RuntimeError:  # 事件循环已关闭，连接随之结束
+            pass
+
+    async def get(self):
+        return await self.queue.get()
+
+    def close(self):
+        self.broker.unsubscribe(self)
+
+
+class Broker:
+    """broker 接口"""
+
+    def publish(self, channel: str, event: dict):
+        raise NotImplementedError
+
+    def subscribe(self, channel: str) -> Subscription:
+        raise NotImplementedError
+
+    def unsubscribe(self, subscription: Subscription):
+        raise NotImplementedError
+
+
+class InProcessBroker(Broker):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs = {}
+
+    def publish(self, channel, event):
+        with self._lock:
+            subs = list(self._subs.get(channel, ()))
+        for sub in subs:
+            sub.deliver(event)
+        return len(subs)
+
+    def subscribe(self, channel):
+        sub = Subscription(self, channel)
+        with self._lock:
+            self._subs.setdefault(channel, set()).add(sub)
+        return sub
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subs = self._subs.get(subscription.channel)
+            if subs is not None:
+                subs.discard(subscription)
+                if not subs:
+                    del self._subs[subscription.channel]
+
+    def subscriber_count(self, channel) -> int:
+        with self._lock:
+            return len(self._subs.get(channel, ()))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker() -> Broker:
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, "TEAM_EVENT_BROKER", "teams.broker.InProcessBroker")
+                _broker = import_string(path)()
+    return _broker
+
+
+def publish_team_event(team_id, event_type: str, data: dict):
+    """写接口调用：事务提交后再推送，回滚的写入不会被看到"""
+    event = {"type": event_type, "data": data}
+
+    def send():
+        try:
+            get_broker().publish(team_channel(team_id), event)
+        except Exception:  # 推送失败不影响写入本身，客户端可用 ?since= 补齐
+            logger.exception("Failed to publish team event %s for team %s", event_type, team_id)
+
+    transaction.on_commit(send)
+
+
+def format_sse(event: dict) -> str:
+    return f"event: {event['type']}\ndata: {json.dumps(event['data'], ensure_ascii=False, default=str)}\n\n"
@@ -0,0 +1,65 @@
+# teams/cache.py
+"""
+团队相关缓存：
+- 统计：用「版本号」做失效——写入时只递增版本，旧 key 自然过期，无需逐个删除
+- 邀请码 -> 团队：加入高峰期同一个码被反复查询，团队保存/删除时显式失效
+"""
+from django.core.cache import cache
+
+from .models import Team
+
+TEAM_STATS_TTL = 300  # 成员的个人动态不触发失效，靠 TTL 兜底
+INVITE_CODE_TTL = 300
+INVITE_CODE_MISS_TTL = 30  # 无效码也短暂缓存，挡住重复的错误输入
+
+
+def _version_key(team_id) -> str:
+    return f"team:{team_id}:stats_ver"
+
+
+def team_stats_version(team_id) -> int:
+    return cache.get_or_set(_version_key(team_id), 1, timeout=None)
+
+
+def invalidate_team_stats(team_id):
+    try:
+        cache.incr(_version_key(team_id))
+    except ValueError:
+        cache.set(_version_key(team_id), 2, timeout=None)
+
+
+def team_stats_key(team_id, d1, d2) -> str:
+    return f"team:{team_id}:stats:v{team_stats_version(team_id)}:{d1.isoformat()}:{d2.isoformat()}"
+
+
+def _invite_key(code) -> str:
+    return f"team:invite:{code}"
+
+
+def get_team_by_code(code):
+    """
+    邀请码 -> {"id", "name", "expires_at", "max_members"}，无效码返回 None
+    """
+    key = _invite_key(code)
+    info = cache.get(key)
+    if info is None:
+        row = (
+            Team.objects.filter(invite_code=code)
+            .values("id", "name", "invite_expires_at", "max_members")
+            .first()
+        )
+        if row is None:
+            cache.set(key, {}, INVITE_CODE_MISS_TTL)
+            return None
+        info = {
+            "id": row["id"],
+            "name": row["name"],
+            "expires_at": row["invite_expires_at"],
+            "max_members": row["max_members"],
+        }
+        cache.set(key, info, INVITE_CODE_TTL)
+    return info or None
+
+
+def invalidate_invite_code(*codes):
+    cache.delete_many([_invite_key(c) for c in codes if c])
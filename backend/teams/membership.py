@@ -0,0 +1,84 @@
+# teams/membership.py
+"""
+团队成员身份解析：(team_id, user_id) -> 角色（非成员为 None）
+
+两级缓存：
+- 请求内：同一请求多次检查只解析一次
+- 进程/共享缓存（Django cache）：带 TTL，非成员也缓存（空串），
+  成员关系变化（加入/退出/改角色/团队删除）时由 teams.signals 显式失效
+- 显式失效只作用于处理写入的进程（默认 LocMemCache 不跨进程），TTL 就是其他进程看到变化的最长延迟：
+  成员 MEMBERSHIP_TTL；非成员更短，刚加入团队的用户在其他进程上也很快不再 403
+"""
+from django.core.cache import cache
+from rest_framework.permissions import BasePermission
+
+from .models import TeamMember
+
+MEMBERSHIP_TTL = 60
+NOT_MEMBER_TTL = 10
+_NOT_MEMBER = ""
+
+
+def _key(team_id, user_id) -> str:
+    return f"team:{team_id}:member:{user_id}"
+
+
+def _request_cache(request):
+    if request is None:
+        return None
+    roles = getattr(request, "_team_roles", None)
+    if roles is None:
+        roles = {}
+        setattr(request, "_team_roles", roles)
+    return roles
+
+
+def get_team_role(team_id, user_id, request=None):
+    """返回 "admin" / "member"，不是成员返回 None"""
+    if not team_id or not user_id:
+        return None
+    team_id, user_id = int(team_id), int(user_id)
+
+    local = _request_cache(request)
+    if local is not None and (team_id, user_id) in local:
+        return local[(team_id, user_id)]
+
+    role = cache.get(_key(team_id, user_id))
+    if role is None:
+        role = (
+            TeamMember.objects.filter(team_id=team_id, user_id=user_id)
+            .values_list("role", flat=True)
+            .first()
+        ) or _NOT_MEMBER
+        cache.set(_key(team_id, user_id), role, MEMBERSHIP_TTL if role else NOT_MEMBER_TTL)
+
+    role = role or None
+    if local is not None:
+        local[(team_id, user_id)] = role
+    return role
+
+
+def invalidate_membership(team_id, user_id):
+    cache.delete(_key(team_id, user_id))
+
+
+class IsTeamMember(BasePermission):
+    """URL 中带 team_id 的接口：仅团队成员可访问"""
+    message = "你不是该团队成员"
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return get_team_role(view.kwargs.get("team_id"), user.id, request) is not None
+
+
+class IsTeamAdmin(IsTeamMember):
+    """仅团队管理员可访问"""
+    message = "仅团队管理员可执行该操作"
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not (user and user.is_authenticated):
+            return False
+        return get_team_role(view.kwargs.get("team_id"), user.id, request) == TeamMember.Role.ADMIN
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 16:05
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teampost',
+            index=models.Index(fields=['team', '-created_at', '-id'], name='teampost_team_created_idx'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0002_teampost_team_created_idx'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='teammember',
+            index=models.Index(fields=['team', 'role', 'joined_at', 'id'], name='teammember_team_role_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.0 on 2026-10-19 17:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('teams', '0003_teammember_team_role_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='team',
+            name='invite_expires_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='邀请码过期时间'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='max_members',
+            field=models.PositiveIntegerField(blank=True, null=True, verbose_name='人数上限'),
+        ),
+    ]
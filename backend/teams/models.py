@@ -1,14 +1,17 @@
 import uuid
-import random
+import secrets
 import string
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
 from django.utils.translation import gettext_lazy as _
 
+INVITE_CODE_ALPHABET = string.ascii_uppercase + string.digits
+INVITE_CODE_RETRIES = 5
+
 
 def generate_invite_code():
     """生成 8 位随机大写字母加数字的邀请码"""
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=8))
+    return ''.join(secrets.choice(INVITE_CODE_ALPHABET) for _ in range(8))
 
 
 class Team(models.Model):
@@ -33,6 +36,10 @@ class Team(models.Model):
         verbose_name="创建者"
     )
 
+    # 邀请码有效期 / 人数上限（为空表示不限制），加入时在事务内校验
+    invite_expires_at = models.DateTimeField(null=True, blank=True, verbose_name="邀请码过期时间")
+    max_members = models.PositiveIntegerField(null=True, blank=True, verbose_name="人数上限")
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="创建时间")
 
     class Meta:
@@ -42,6 +49,20 @@ class Team(models.Model):
     def __str__(self):
         return f"{self.name} ({self.invite_code})"
 
+    def save(self, *args, **kwargs):
+        """新建时邀请码撞车（唯一约束冲突）则换一个重试"""
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+        for attempt in range(INVITE_CODE_RETRIES):
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                collided = Team.objects.filter(invite_code=self.invite_code).exists()
+                if not collided or attempt == INVITE_CODE_RETRIES - 1:
+                    raise
+                self.invite_code = generate_invite_code()
+
     @property
     def join_url(self):
         """生成分享链接（前端地址需根据实际部署环境配置）"""
@@ -67,6 +88,10 @@ class TeamMember(models.Model):
         unique_together = ('team', 'user')
         verbose_name = "团队成员"
         verbose_name_plural = "团队成员"
+        indexes = [
+            # 成员目录：按 (role, joined_at, id) 游标分页
+            models.Index(fields=["team", "role", "joined_at", "id"], name="teammember_team_role_idx"),
+        ]
 
 
 class TeamPost(models.Model):
@@ -89,6 +114,10 @@ class TeamPost(models.Model):
         ordering = ['-created_at']
         verbose_name = "团队帖子"
         verbose_name_plural = "团队帖子"
+        indexes = [
+            # 帖子流游标分页 / ?since= 增量：按 (team, created_at, id) 有序扫描
+            models.Index(fields=["team", "-created_at", "-id"], name="teampost_team_created_idx"),
+        ]
 
     def __str__(self):
         return f"[{self.team.name}] {self.title}"
\ No newline at end of file
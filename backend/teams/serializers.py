@@ -24,7 +24,9 @@ class TeamSerializer(serializers.ModelSerializer):
     """团队详情序列化"""
     owner_name = serializers.CharField(source='owner.username', read_only=True)
     owner_avatar_url = serializers.SerializerMethodField()
-    member_count = serializers.IntegerField(source='memberships.count', read_only=True)
+    # 列表接口会预先注解 member_count / my_role，避免每个团队各查一次
+    member_count = serializers.SerializerMethodField()
+    my_role = serializers.SerializerMethodField()
     # 自动计算分享链接返回给前端
     share_url = serializers.ReadOnlyField(source='join_url')
 
@@ -39,7 +41,10 @@ class TeamSerializer(serializers.ModelSerializer):
             'owner_name',
             'owner_avatar_url',
             'member_count',
+            'my_role',
             'share_url',
+            'invite_expires_at',
+            'max_members',
             'created_at',
         ]
         read_only_fields = ['invite_code', 'owner', 'created_at']
@@ -48,6 +53,15 @@ class TeamSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         return build_avatar_url(request, obj.owner)
 
+    def get_member_count(self, obj):
+        count = getattr(obj, "member_count", None)
+        if count is None:
+            count = obj.memberships.count()
+        return count
+
+    def get_my_role(self, obj):
+        return getattr(obj, "my_role", None)
+
 class TeamPostSerializer(serializers.ModelSerializer):
     """团队帖子序列化"""
     author_name = serializers.CharField(source='author.username', read_only=True)
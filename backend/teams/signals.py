@@ -0,0 +1,52 @@
+# teams/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .cache import invalidate_invite_code, invalidate_team_stats
+from .membership import invalidate_membership
+from .models import Team, TeamMember
+
+
+@receiver(pre_save, sender=Team)
+def team_pre_save(sender, instance, **kwargs):
+    # 记下旧邀请码：换码后旧码的缓存也要失效
+    instance._old_invite_code = None
+    if instance.pk:
+        instance._old_invite_code = (
+            Team.objects.filter(pk=instance.pk).values_list("invite_code", flat=True).first()
+        )
+
+
+@receiver(post_save, sender=Team)
+def team_saved(sender, instance, **kwargs):
+    # 改名 / 换码 / 调整有效期或人数上限
+    codes = (instance.invite_code, getattr(instance, "_old_invite_code", None))
+    transaction.on_commit(lambda: invalidate_invite_code(*codes))
+
+
+@receiver(post_delete, sender=Team)
+def team_deleted(sender, instance, **kwargs):
+    code = instance.invite_code
+    transaction.on_commit(lambda: invalidate_invite_code(code))
+
+
+def _invalidate_member_on_commit(team_id, user_id):
+    # 信号在事务提交前触发：此时失效，并发请求可能把旧的成员身份（含「非成员」）重新写回缓存
+    def invalidate():
+        invalidate_membership(team_id, user_id)
+        invalidate_team_stats(team_id)
+
+    transaction.on_commit(invalidate)
+
+
+@receiver(post_save, sender=TeamMember)
+def team_member_saved(sender, instance, **kwargs):
+    # 加入 / 角色变更
+    _invalidate_member_on_commit(instance.team_id, instance.user_id)
+
+
+@receiver(post_delete, sender=TeamMember)
+def team_member_deleted(sender, instance, **kwargs):
+    # 退出 / 被移除 / 团队删除（级联删除逐条触发）
+    _invalidate_member_on_commit(instance.team_id, instance.user_id)
@@ -1,3 +1,240 @@
+import time
+from unittest import mock
+
+from django.core import signing
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from stats.models import DailyActivity
+from users.models import User
+from users.views import issue_tokens
+from .membership import MEMBERSHIP_TTL, NOT_MEMBER_TTL, get_team_role
+from .models import Team, TeamMember, TeamPost
+from .views import TEAM_EVENT_POLL_INTERVAL, TEAM_EVENT_TICKET_TTL
+
+
+class TeamTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.owner = User.objects.create_user(username="owner", email="owner@example.com")
+        self.team = Team.objects.create(name="T", owner=self.owner)
+        TeamMember.objects.create(team=self.team, user=self.owner, role=TeamMember.Role.ADMIN)
+
+    def client_for(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client
+
+    def join(self, user, code=None):
+        return self.client_for(user).post("/api/teams/join/", {"invite_code": code or self.team.invite_code})
+
+
+class JoinTeamTests(TeamTestCase):
+    def test_join_and_duplicate_join(self):
+        user = User.objects.create_user(username="u1", email="u1@example.com")
+        self.assertEqual(self.join(user).status_code, 200)
+        resp = self.join(user)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(TeamMember.objects.filter(team=self.team, user=user).count(), 1)
+
+    def test_invite_code_is_case_insensitive(self):
+        user = User.objects.create_user(username="u1", email="u1@example.com")
+        self.assertEqual(self.join(user, self.team.invite_code.lower()).status_code, 200)
+
+    def test_join_over_cap_rolls_back(self):
+        self.team.max_members = 2
+        self.team.save()
+        first = User.objects.create_user(username="u1", email="u1@example.com")
+        second = User.objects.create_user(username="u2", email="u2@example.com")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.join(first).status_code, 200)
+        resp = self.join(second)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data["error"], "团队人数已满")
+        # 超员的那次插入随事务回滚，人数不会超过上限
+        self.assertEqual(TeamMember.objects.filter(team=self.team).count(), 2)
+        self.assertFalse(TeamMember.objects.filter(team=self.team, user=second).exists())
+
+    def test_cap_change_reaches_cached_code(self):
+        user = User.objects.create_user(username="u1", email="u1@example.com")
+        # 先让邀请码进缓存，再把上限调到已满
+        with self.captureOnCommitCallbacks(execute=True):
+            self.join(self.owner)
+            self.team.max_members = 1
+            self.team.save()
+        self.assertEqual(self.join(user).status_code, 400)
+
+
+class MembershipCacheTests(TeamTestCase):
+    def patch_clock(self, seconds):
+        return mock.patch("django.core.cache.backends.locmem.time.time", return_value=time.time() + seconds)
+
+    def test_membership_cache_invalidated_after_commit(self):
+        user = User.objects.create_user(username="u1", email="u1@example.com")
+        self.assertIsNone(get_team_role(self.team.id, user.id))  # 缓存「非成员」
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamMember.objects.create(team=self.team, user=user)
+        self.assertEqual(get_team_role(self.team.id, user.id), TeamMember.Role.MEMBER)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            TeamMember.objects.filter(team=self.team, user=user).delete()
+        self.assertIsNone(get_team_role(self.team.id, user.id))
+
+    def test_change_from_another_process_applies_within_ttl(self):
+        user = User.objects.create_user(username="u1", email="u1@example.com")
+        self.assertIsNone(get_team_role(self.team.id, user.id))
+        # 另一个进程处理了加入：本进程的「非成员」缓存没有被失效
+        TeamMember.objects.bulk_create([TeamMember(team=self.team, user=user)])
+        with self.patch_clock(NOT_MEMBER_TTL + 1):
+            self.assertEqual(get_team_role(self.team.id, user.id), TeamMember.Role.MEMBER)
+
+        TeamMember.objects.filter(team=self.team, user=user).update(role=TeamMember.Role.ADMIN)
+        with self.patch_clock(MEMBERSHIP_TTL + NOT_MEMBER_TTL + 2):
+            self.assertEqual(get_team_role(self.team.id, user.id), TeamMember.Role.ADMIN)
+
+
+class TeamPostListTests(TeamTestCase):
+    def setUp(self):
+        super().setUp()
+        for i in range(5):
+            TeamPost.objects.create(team=self.team, author=self.owner, content=f"p{i}")
+        self.url = f"/api/teams/{self.team.id}/posts/"
+
+    def test_cursor_pages_backwards_without_overlap(self):
+        client = self.client_for(self.owner)
+        first = client.get(self.url, {"page_size": 3}).data
+        second = client.get(self.url, {"page_size": 3, "cursor": first["next_cursor"]}).data
+        ids = [p["id"] for p in first["results"] + second["results"]]
+        self.assertEqual(len(ids), 5)
+        self.assertEqual(len(set(ids)), 5)
+        self.assertIsNone(second["next_cursor"])
+
+    def test_since_returns_only_newer_posts(self):
+        client = self.client_for(self.owner)
+        latest = client.get(self.url).data["latest"]
+        new = TeamPost.objects.create(team=self.team, author=self.owner, content="new")
+        data = client.get(self.url, {"since": latest}).data
+        self.assertEqual([p["id"] for p in data["results"]], [new.id])
+
+    def test_cursor_and_since_are_exclusive(self):
+        client = self.client_for(self.owner)
+        token = client.get(self.url).data["latest"]
+        resp = client.get(self.url, {"cursor": token, "since": token})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_non_member_is_rejected(self):
+        stranger = User.objects.create_user(username="x", email="x@example.com")
+        self.assertEqual(self.client_for(stranger).get(self.url).status_code, 403)
+
+
+class TeamMemberSearchTests(TeamTestCase):
+    def test_prefix_search_is_case_insensitive(self):
+        alice = User.objects.create_user(username="Alice", email="ALICE@example.com", name="Zed")
+        bob = User.objects.create_user(username="bob", email="b@example.com", name="AlBert")
+        for u in (alice, bob):
+            TeamMember.objects.create(team=self.team, user=u)
+        client = self.client_for(self.owner)
+        url = f"/api/teams/{self.team.id}/members/"
+
+        def usernames(q):
+            return sorted(m["username"] for m in client.get(url, {"q": q, "compact": 1}).data["results"])
+
+        self.assertEqual(usernames("al"), ["Alice", "bob"])
+        self.assertEqual(usernames("ZE"), ["Alice"])
+        self.assertEqual(usernames("b@"), ["bob"])
+
+
+class TeamEventStreamTests(TeamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.events_url = f"/api/teams/{self.team.id}/events/"
+
+    def ticket(self, team_id=None):
+        return signing.dumps({"t": team_id or self.team.id, "u": self.owner.id}, salt="teams.events")
+
+    def open_stream(self, ticket):
+        return self.async_client.get(self.events_url, {"ticket": ticket})
+
+    async def test_ticket_opens_stream_under_asgi(self):
+        auth = {"Authorization": "Bearer " + issue_tokens(self.owner)["access"]}
+        data = (await self.async_client.get(f"{self.events_url}ticket/", headers=auth)).json()
+        self.assertEqual(data["expires_in"], TEAM_EVENT_TICKET_TTL)
+        self.assertEqual(signing.loads(data["ticket"], salt="teams.events"), {"t": self.team.id, "u": self.owner.id})
+
+        resp = await self.open_stream(data["ticket"])
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp["Content-Type"].startswith("text/event-stream"))
+        first = await anext(aiter(resp.streaming_content))
+        self.assertIn(b"connected", first)
+        await resp.streaming_content.aclose()
+
+    async def test_tampered_expired_or_foreign_ticket_is_rejected(self):
+        self.assertEqual((await self.open_stream(self.ticket() + "x")).status_code, 403)
+        self.assertEqual((await self.open_stream("")).status_code, 403)
+        self.assertEqual((await self.open_stream(self.ticket(team_id=self.team.id + 1))).status_code, 403)
+
+        ticket = self.ticket()
+        with mock.patch("django.core.signing.time.time", return_value=time.time() + TEAM_EVENT_TICKET_TTL + 1):
+            self.assertEqual((await self.open_stream(ticket)).status_code, 403)
+
+    def test_wsgi_falls_back_to_polling(self):
+        resp = self.client_for(self.owner).get(f"{self.events_url}ticket/")
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual((resp.data["url"], resp.data["poll_interval"]), (None, TEAM_EVENT_POLL_INTERVAL))
+        # WSGI 下不占用工作线程挂长连接
+        self.assertEqual(self.client.get(self.events_url, {"ticket": self.ticket()}).status_code, 503)
+
+    def test_non_member_gets_no_ticket(self):
+        stranger = User.objects.create_user(username="x", email="x@example.com")
+        self.assertEqual(self.client_for(stranger).get(f"{self.events_url}ticket/").status_code, 403)
+
+
+class TeamStatsTests(TeamTestCase):
+    def setUp(self):
+        super().setUp()
+        self.url = f"/api/teams/{self.team.id}/stats/"
+        self.client = self.client_for(self.owner)
+
+    def stats_queries(self):
+        cache.clear()
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.client.get(self.url)
+        self.assertEqual(resp.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def test_query_count_does_not_grow_with_members(self):
+        few = self.stats_queries()
+        for i in range(8):
+            user = User.objects.create_user(username=f"m{i}", email=f"m{i}@example.com")
+            TeamMember.objects.create(team=self.team, user=user)
+            DailyActivity.objects.create(user=user, day=timezone.localdate(), posts=1)
+            TeamPost.objects.create(team=self.team, author=user, content="x")
+        self.assertEqual(self.stats_queries(), few)
+
+    def test_payload_and_cache_invalidation(self):
+        DailyActivity.objects.create(user=self.owner, day=timezone.localdate(), posts=2, todos_completed=1)
+        data = self.client.get(self.url).data
+        self.assertEqual(data["leaderboard"][0]["posts"], 2)
+        self.assertEqual(data["leaderboard"][0]["completions"], 1)
+        self.assertEqual(data["activity"]["team_posts"], [])
+
+        # 命中缓存：不再重算
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertFalse(any("teams_teampost" in q["sql"] for q in ctx.captured_queries))
+
+        # 团队发帖使统计版本号失效
+        with self.captureOnCommitCallbacks(execute=True):
+            resp = self.client.post(f"/api/teams/{self.team.id}/posts/", {"title": "t", "content": "x"})
+        self.assertEqual(resp.status_code, 201)
+        data = self.client.get(self.url).data
+        self.assertEqual(data["leaderboard"][0]["team_posts"], 1)
 
-# Create your tests here.
+    def test_invalid_range(self):
+        self.assertEqual(self.client.get(self.url, {"from": "2026-01-01", "to": "2027-06-01"}).status_code, 400)
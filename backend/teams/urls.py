@@ -1,8 +1,15 @@
 from django.urls import path
-from .views import TeamListCreateView, JoinTeamByCodeView, TeamPostView
+from .views import (
+    TeamListCreateView, JoinTeamByCodeView, TeamPostView, TeamMemberListView, TeamStatsView,
+    TeamEventTicketView, team_event_stream,
+)
 
 urlpatterns = [
     path('', TeamListCreateView.as_view(), name='team-list'),
     path('join/', JoinTeamByCodeView.as_view(), name='team-join'),
     path('<int:team_id>/posts/', TeamPostView.as_view(), name='team-posts'),
+    path('<int:team_id>/members/', TeamMemberListView.as_view(), name='team-members'),
+    path('<int:team_id>/stats/', TeamStatsView.as_view(), name='team-stats'),
+    path('<int:team_id>/events/ticket/', TeamEventTicketView.as_view(), name='team-events-ticket'),
+    path('<int:team_id>/events/', team_event_stream, name='team-events'),
 ]
\ No newline at end of file
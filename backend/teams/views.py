@@ -1,9 +1,60 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from django.shortcuts import get_object_or_404
+from django.core import signing
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Sum, F, Q, OuterRef, Subquery, IntegerField
+from django.db.models.functions import TruncDate
+from django.http import HttpResponse, HttpResponseForbidden, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.timezone import make_aware
+
+from notifications.tasks import fan_out_team_post
+from stats.models import DailyActivity
+from users.utils import image_url, user_prefix_q
 from .models import Team, TeamMember, TeamPost
 from .serializers import TeamSerializer, TeamMemberSerializer, TeamPostSerializer
+from .cache import TEAM_STATS_TTL, get_team_by_code, invalidate_team_stats, team_stats_key
+from .membership import IsTeamMember
+from .broker import format_sse, get_broker, publish_team_event, team_channel
+
+TEAM_STATS_MAX_DAYS = 366
+TEAM_LIST_PAGE_SIZE = 50
+TEAM_LIST_MAX_PAGE_SIZE = 200
+TEAM_POST_PAGE_SIZE = 20
+TEAM_POST_MAX_PAGE_SIZE = 100
+TEAM_MEMBER_PAGE_SIZE = 50
+TEAM_MEMBER_COMPACT_PAGE_SIZE = 10
+TEAM_MEMBER_MAX_PAGE_SIZE = 200
+AVATAR_MENTION_SIZE = 48
+TEAM_EVENT_TICKET_TTL = 60
+TEAM_EVENT_KEEPALIVE = 25  # 秒：低于常见代理的空闲超时
+TEAM_EVENT_MAX_SECONDS = 30 * 60  # 连接到时由客户端换新票据重连，顺带重新校验成员身份
+TEAM_EVENT_POLL_INTERVAL = 30  # 秒：不支持推送时客户端轮询帖子流的间隔
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def make_post_cursor(post) -> str:
+    """帖子游标：UTC 微秒时间戳 + id（客户端视为不透明字符串）"""
+    return f"{(post.created_at - EPOCH) // timedelta(microseconds=1)}_{post.id}"
+
+
+def parse_post_cursor(token: str):
+    try:
+        us, pk = token.split("_", 1)
+        us, pk = int(us), int(pk)
+    except (AttributeError, ValueError):
+        return None
+    if us < 0 or pk < 0:
+        return None
+    return EPOCH + timedelta(microseconds=us), pk
 
 
 class TeamListCreateView(APIView):
@@ -13,11 +64,57 @@ class TeamListCreateView(APIView):
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        # 获取用户创建或加入的所有团队
-        memberships = TeamMember.objects.filter(user=request.user)
-        teams = [m.team for m in memberships]
+        """
+        GET /api/teams/?role=admin&cursor=<id>&page_size=50
+
+        一条查询：成员关系 + 团队 + 创建者（select_related），成员数用子查询注解；
+        按成员关系 id 做游标分页，返回 {"results": [...], "next_cursor": id|null}
+        """
+        try:
+            page_size = int(request.query_params.get("page_size") or TEAM_LIST_PAGE_SIZE)
+            cursor = int(request.query_params.get("cursor") or 0)
+        except ValueError:
+            return Response({"error": "分页参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = max(1, min(page_size, TEAM_LIST_MAX_PAGE_SIZE))
+
+        member_count = (
+            TeamMember.objects.filter(team_id=OuterRef("team_id"))
+            .order_by()
+            .values("team_id")
+            .annotate(c=Count("id"))
+            .values("c")
+        )
+        qs = (
+            TeamMember.objects.filter(user=request.user)
+            .select_related("team__owner")
+            .annotate(member_count=Subquery(member_count, output_field=IntegerField()))
+            .order_by("id")
+        )
+
+        role = (request.query_params.get("role") or "").strip().lower()
+        if role:
+            if role not in TeamMember.Role.values:
+                return Response({"error": "role 参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+            qs = qs.filter(role=role)
+        if cursor:
+            qs = qs.filter(id__gt=cursor)
+
+        memberships = list(qs[: page_size + 1])
+        has_more = len(memberships) > page_size
+        memberships = memberships[:page_size]
+
+        teams = []
+        for m in memberships:
+            team = m.team
+            team.member_count = m.member_count or 0
+            team.my_role = m.role
+            teams.append(team)
+
         serializer = TeamSerializer(teams, many=True, context={"request": request})
-        return Response(serializer.data)
+        return Response({
+            "results": serializer.data,
+            "next_cursor": memberships[-1].id if has_more else None,
+        })
 
     def post(self, request):
         try:
@@ -31,6 +128,8 @@ class TeamListCreateView(APIView):
                     user=request.user,
                     role=TeamMember.Role.ADMIN
                 )
+                team.member_count = 1
+                team.my_role = TeamMember.Role.ADMIN
                 return Response(
                     TeamSerializer(team, context={"request": request}).data,
                     status=status.HTTP_201_CREATED,
@@ -40,9 +139,16 @@ class TeamListCreateView(APIView):
             return Response({"error": f"创建失败: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+class TeamFull(Exception):
+    pass
+
+
 class JoinTeamByCodeView(APIView):
     """
     通过邀请码加入团队
+
+    邀请码 -> 团队走缓存；加入只是一条 INSERT，由 (team, user) 唯一约束挡住重复加入
+    （并发重复请求也只会成功一次）；设置了人数上限时先锁团队行再计数，上限在事务内严格生效
     """
     permission_classes = [permissions.IsAuthenticated]
 
@@ -51,48 +157,359 @@ class JoinTeamByCodeView(APIView):
         if not code:
             return Response({"error": "请输入邀请码"}, status=status.HTTP_400_BAD_REQUEST)
 
-        try:
-            team = get_object_or_404(Team, invite_code=code)
-
-            # 检查是否已经在团队中
-            if TeamMember.objects.filter(team=team, user=request.user).exists():
-                return Response({"error": "你已经是该团队成员了"}, status=status.HTTP_400_BAD_REQUEST)
+        team = get_team_by_code(code)
+        if team is None:
+            return Response({"error": "邀请码无效或系统错误"}, status=status.HTTP_400_BAD_REQUEST)
+        if team["expires_at"] is not None and team["expires_at"] <= timezone.now():
+            return Response({"error": "邀请码已过期"}, status=status.HTTP_400_BAD_REQUEST)
 
-            # 加入团队
-            TeamMember.objects.create(team=team, user=request.user, role=TeamMember.Role.MEMBER)
-            return Response({"message": f"成功加入团队: {team.name}"}, status=status.HTTP_200_OK)
+        try:
+            with transaction.atomic():
+                if team["max_members"] is not None:
+                    # 同一团队的加入请求在此排队，计数与插入之间不会被插队
+                    Team.objects.select_for_update().filter(pk=team["id"]).values_list("id", flat=True).first()
+                TeamMember.objects.create(team_id=team["id"], user=request.user, role=TeamMember.Role.MEMBER)
+                if team["max_members"] is not None:
+                    if TeamMember.objects.filter(team_id=team["id"]).count() > team["max_members"]:
+                        raise TeamFull
+        except IntegrityError:
+            return Response({"error": "你已经是该团队成员了"}, status=status.HTTP_400_BAD_REQUEST)
+        except TeamFull:
+            return Response({"error": "团队人数已满"}, status=status.HTTP_400_BAD_REQUEST)
 
-        except Exception as e:
-            return Response({"error": "邀请码无效或系统错误"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({"message": f"成功加入团队: {team['name']}"}, status=status.HTTP_200_OK)
 
 
 class TeamPostView(APIView):
     """
     团队帖子：获取某个团队的所有帖子 / 在团队内发布帖子
     """
-    permission_classes = [permissions.IsAuthenticated]
+    # 安全检查：只有成员能看帖/发帖（成员身份走缓存，不必每次查库）
+    permission_classes = [permissions.IsAuthenticated, IsTeamMember]
 
     def get(self, request, team_id):
-        # 安全检查：只有成员能看帖
-        if not TeamMember.objects.filter(team_id=team_id, user=request.user).exists():
-            return Response({"error": "你不是该团队成员，无权查看"}, status=status.HTTP_403_FORBIDDEN)
+        """
+        GET /api/teams/<team_id>/posts/?cursor=<token>&page_size=20   向更早翻页
+        GET /api/teams/<team_id>/posts/?since=<token>                 轮询：只取比 since 更新的帖子
+        （cursor 与 since 互斥，同时传入返回 400）
 
-        posts = TeamPost.objects.filter(team_id=team_id)
-        serializer = TeamPostSerializer(posts, many=True, context={"request": request})
-        return Response(serializer.data)
+        按 (team, -created_at, -id) 索引做键集分页，作者 select_related 一起取出；
+        返回 {"results": [...新在前], "next_cursor": token|null, "latest": token|null, "has_more": bool}
+        since 模式下 has_more 为真表示还有更新的帖子，客户端以 latest 继续拉取
+        """
+        try:
+            page_size = int(request.query_params.get("page_size") or TEAM_POST_PAGE_SIZE)
+        except ValueError:
+            return Response({"error": "分页参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = max(1, min(page_size, TEAM_POST_MAX_PAGE_SIZE))
 
-    def post(self, request, team_id):
-        team = get_object_or_404(Team, id=team_id)
+        cursor = (request.query_params.get("cursor") or "").strip()
+        since = (request.query_params.get("since") or "").strip()
+        if cursor and since:
+            # 两种模式方向相反，同时给出时无法判断客户端意图
+            return Response({"error": "cursor 与 since 不能同时使用"}, status=status.HTTP_400_BAD_REQUEST)
+        position = parse_post_cursor(cursor or since) if (cursor or since) else None
+        if (cursor or since) and position is None:
+            return Response({"error": "cursor/since 参数非法"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # 安全检查：只有成员能发帖
-        if not TeamMember.objects.filter(team=team, user=request.user).exists():
-            return Response({"error": "你不是该团队成员，无权发帖"}, status=status.HTTP_403_FORBIDDEN)
+        qs = TeamPost.objects.filter(team_id=team_id).select_related("author")
 
+        if since:
+            created_at, pk = position
+            qs = qs.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+            posts = list(qs.order_by("created_at", "id")[: page_size + 1])
+            has_more = len(posts) > page_size
+            posts = posts[:page_size][::-1]
+            next_cursor = None
+            latest = make_post_cursor(posts[0]) if posts else since
+        else:
+            if cursor:
+                created_at, pk = position
+                qs = qs.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=pk))
+            posts = list(qs.order_by("-created_at", "-id")[: page_size + 1])
+            has_more = len(posts) > page_size
+            posts = posts[:page_size]
+            next_cursor = make_post_cursor(posts[-1]) if has_more else None
+            latest = make_post_cursor(posts[0]) if posts and not cursor else None
+
+        serializer = TeamPostSerializer(posts, many=True, context={"request": request})
+        return Response({
+            "results": serializer.data,
+            "next_cursor": next_cursor,
+            "latest": latest,
+            "has_more": has_more,
+        })
+
+    def post(self, request, team_id):
         serializer = TeamPostSerializer(data=request.data, context={"request": request})
         if serializer.is_valid():
-            post = serializer.save(author=request.user, team=team)
-            return Response(
-                TeamPostSerializer(post, context={"request": request}).data,
-                status=status.HTTP_201_CREATED,
-            )
+            post = serializer.save(author=request.user, team_id=team_id)
+            invalidate_team_stats(team_id)
+            fan_out_team_post.delay(post.id)
+            data = TeamPostSerializer(post, context={"request": request}).data
+            publish_team_event(team_id, "team_post", {**data, "cursor": make_post_cursor(post)})
+            return Response(data, status=status.HTTP_201_CREATED)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+
+def make_member_cursor(role, joined_at, pk) -> str:
+    """成员游标：角色 + UTC 微秒时间戳 + id"""
+    return f"{role}_{(joined_at - EPOCH) // timedelta(microseconds=1)}_{pk}"
+
+
+def parse_member_cursor(token: str):
+    try:
+        role, us, pk = token.split("_", 2)
+        us, pk = int(us), int(pk)
+    except (AttributeError, ValueError):
+        return None
+    if role not in TeamMember.Role.values or us < 0 or pk < 0:
+        return None
+    return role, EPOCH + timedelta(microseconds=us), pk
+
+
+class TeamMemberListView(APIView):
+    """
+    团队成员目录
+    GET /api/teams/<team_id>/members/?q=前缀&cursor=<token>&page_size=50
+    GET /api/teams/<team_id>/members/?compact=1&q=前缀      @提及自动补全：只返回 id / 用户名 / 头像
+
+    按 (role, joined_at, id) 游标分页（管理员在前），q 对用户名/昵称/邮箱做不区分大小写的前缀匹配（走 users 表的前缀索引）；
+    只扫描本团队的成员行（team 前缀索引），用户信息 select_related 一起取出
+    返回 {"results": [...], "next_cursor": token|null}
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeamMember]
+
+    def get(self, request, team_id):
+        compact = (request.query_params.get("compact") or "").strip().lower() in ("1", "true", "yes")
+        default_size = TEAM_MEMBER_COMPACT_PAGE_SIZE if compact else TEAM_MEMBER_PAGE_SIZE
+        try:
+            page_size = int(request.query_params.get("page_size") or default_size)
+        except ValueError:
+            return Response({"error": "分页参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+        page_size = max(1, min(page_size, TEAM_MEMBER_MAX_PAGE_SIZE))
+
+        cursor = (request.query_params.get("cursor") or "").strip()
+        position = parse_member_cursor(cursor) if cursor else None
+        if cursor and position is None:
+            return Response({"error": "cursor 参数非法"}, status=status.HTTP_400_BAD_REQUEST)
+
+        qs = TeamMember.objects.filter(team_id=team_id)
+        q = (request.query_params.get("q") or "").strip().lstrip("@")
+        if q:
+            qs = qs.filter(user_prefix_q(q, prefix="user__"))
+        if position:
+            role, joined_at, pk = position
+            qs = qs.filter(
+                Q(role__gt=role)
+                | Q(role=role, joined_at__gt=joined_at)
+                | Q(role=role, joined_at=joined_at, id__gt=pk)
+            )
+        qs = qs.order_by("role", "joined_at", "id")
+
+        if compact:
+            # 自动补全每次按键都会调用：不实例化模型、不走序列化器
+            rows = list(
+                qs.values_list(
+                    "id", "role", "joined_at", "user_id", "user__username", "user__avatar", "user__avatar_variants"
+                )[: page_size + 1]
+            )
+            has_more = len(rows) > page_size
+            rows = rows[:page_size]
+            results = [
+                {
+                    "user_id": user_id,
+                    "username": username,
+                    "avatar_url": image_url(request, avatar, variants, AVATAR_MENTION_SIZE),
+                }
+                for _, _, _, user_id, username, avatar, variants in rows
+            ]
+            last = rows[-1] if has_more else None
+            next_cursor = make_member_cursor(last[1], last[2], last[0]) if last else None
+            return Response({"results": results, "next_cursor": next_cursor})
+
+        members = list(qs.select_related("user")[: page_size + 1])
+        has_more = len(members) > page_size
+        members = members[:page_size]
+        last = members[-1] if has_more else None
+        serializer = TeamMemberSerializer(members, many=True, context={"request": request})
+        return Response({
+            "results": serializer.data,
+            "next_cursor": make_member_cursor(last.role, last.joined_at, last.id) if last else None,
+        })
+
+
+def event_stream_supported(request) -> bool:
+    """
+    SSE 只在 ASGI 下提供：WSGI 会让一个工作线程同步消费异步迭代器，
+    每个空闲连接都长期占住一个线程，几十个打开的页面就能耗尽 worker
+    """
+    return isinstance(getattr(request, "_request", request), ASGIRequest)
+
+
+class TeamEventTicketView(APIView):
+    """
+    GET /api/teams/<team_id>/events/ticket/
+    EventSource 不能带 Authorization 头：先用 JWT 换一张短时效的签名票据，
+    再连接 /api/teams/<team_id>/events/?ticket=...（建连时只验签，不查库）
+
+    未以 ASGI 运行时不发票据：返回 url=null 和 poll_interval，客户端改为轮询帖子流
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeamMember]
+
+    def get(self, request, team_id):
+        if not event_stream_supported(request):
+            return Response({"ticket": None, "url": None, "poll_interval": TEAM_EVENT_POLL_INTERVAL})
+        ticket = signing.dumps({"t": team_id, "u": request.user.id}, salt="teams.events")
+        return Response({
+            "ticket": ticket,
+            "url": request.build_absolute_uri(f"/api/teams/{team_id}/events/?ticket={ticket}"),
+            "expires_in": TEAM_EVENT_TICKET_TTL,
+        })
+
+
+async def team_event_stream(request, team_id):
+    """
+    GET /api/teams/<team_id>/events/?ticket=...   Server-Sent Events
+
+    事件：team_post（新团队帖子，data 含 cursor）/ post / comment / like（分享到团队的个人帖子）
+    断线重连后客户端用 TeamPostView 的 ?since=<latest> 补齐期间错过的帖子
+    需以 ASGI 运行（uvicorn / daphne）：每个空闲连接只是一个挂起的协程；WSGI 下直接返回 503
+    """
+    if not event_stream_supported(request):
+        return HttpResponse("实时推送需要以 ASGI 方式运行服务", status=503, content_type="text/plain; charset=utf-8")
+    try:
+        claims = signing.loads(request.GET.get("ticket") or "", salt="teams.events", max_age=TEAM_EVENT_TICKET_TTL)
+    except signing.BadSignature:
+        return HttpResponseForbidden("票据无效或已过期")
+    if claims.get("t") != team_id:
+        return HttpResponseForbidden("票据与团队不符")
+
+    async def stream():
+        sub = get_broker().subscribe(team_channel(team_id))
+        deadline = time.monotonic() + TEAM_EVENT_MAX_SECONDS
+        try:
+            yield f"retry: 3000\n: connected team={team_id}\n\n"
+            while time.monotonic() < deadline:
+                try:
+                    event = await asyncio.wait_for(sub.get(), timeout=TEAM_EVENT_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield format_sse(event)
+        finally:
+            sub.close()
+
+    resp = StreamingHttpResponse(stream(), content_type="text/event-stream; charset=utf-8")
+    resp["Cache-Control"] = "no-cache"
+    resp["X-Accel-Buffering"] = "no"  # 关闭 nginx 缓冲
+    return resp
+
+
+class TeamStatsView(APIView):
+    """
+    团队统计：按天的团队帖子数 / 成员个人发帖数 / 成员完成数，以及成员排行榜
+    GET /api/teams/<team_id>/stats/?from=YYYY-MM-DD&to=YYYY-MM-DD（缺省最近 30 天）
+
+    固定 4 条查询（与团队人数无关），结果按团队版本号缓存，团队写入时失效
+    """
+    permission_classes = [permissions.IsAuthenticated, IsTeamMember]
+
+    def get(self, request, team_id):
+        qs_from = (request.query_params.get("from") or "").strip()
+        qs_to = (request.query_params.get("to") or "").strip()
+        try:
+            d2 = datetime.strptime(qs_to, "%Y-%m-%d").date() if qs_to else timezone.localdate()
+            d1 = datetime.strptime(qs_from, "%Y-%m-%d").date() if qs_from else d2 - timedelta(days=29)
+        except ValueError:
+            return Response({"error": "from/to 格式应为 YYYY-MM-DD"}, status=status.HTTP_400_BAD_REQUEST)
+        if d2 < d1 or (d2 - d1).days >= TEAM_STATS_MAX_DAYS:
+            return Response({"error": "时间范围非法"}, status=status.HTTP_400_BAD_REQUEST)
+
+        key = team_stats_key(team_id, d1, d2)
+        data = cache.get(key)
+        if data is None:
+            data = self._compute(team_id, d1, d2)
+            cache.set(key, data, TEAM_STATS_TTL)
+        return Response(data)
+
+    def _compute(self, team_id, d1, d2):
+        # 1) 成员列表
+        members = list(
+            TeamMember.objects.filter(team_id=team_id)
+            .values_list("user_id", "role", "user__username", "user__name")
+        )
+
+        start = make_aware(datetime(d1.year, d1.month, d1.day))
+        end = make_aware(datetime(d2.year, d2.month, d2.day)) + timedelta(days=1)
+
+        # 2) 团队帖子：按 (天, 作者) 分组，一次得到每日曲线与每人计数
+        team_posts = (
+            TeamPost.objects.filter(team_id=team_id, created_at__gte=start, created_at__lt=end)
+            .annotate(day=TruncDate("created_at"))
+            .values("day", "author_id")
+            .annotate(n=Count("id"))
+            .values_list("day", "author_id", "n")
+        )
+        team_posts_by_day = {}
+        team_posts_by_user = {}
+        for day, author_id, n in team_posts:
+            team_posts_by_day[day] = team_posts_by_day.get(day, 0) + n
+            team_posts_by_user[author_id] = team_posts_by_user.get(author_id, 0) + n
+
+        # 3)/4) 成员个人动态：读汇总表，经 TeamMember 关联按天、按人分别分组
+        member_rows = DailyActivity.objects.filter(
+            user__team_joins__team_id=team_id, day__gte=d1, day__lte=d2
+        )
+        by_day = (
+            member_rows.values("day")
+            .annotate(posts=Sum("posts"), done=Sum(F("checklist_done") + F("todos_completed")))
+            .values_list("day", "posts", "done")
+        )
+        by_user = {
+            uid: (posts, done)
+            for uid, posts, done in member_rows.values("user_id")
+            .annotate(posts=Sum("posts"), done=Sum(F("checklist_done") + F("todos_completed")))
+            .values_list("user_id", "posts", "done")
+        }
+
+        member_posts, completions = {}, {}
+        for day, posts, done in by_day:
+            member_posts[day] = posts or 0
+            completions[day] = done or 0
+
+        leaderboard = []
+        for uid, role, username, name in members:
+            posts, done = by_user.get(uid, (0, 0))
+            tp = team_posts_by_user.get(uid, 0)
+            leaderboard.append({
+                "user_id": uid,
+                "username": username,
+                "name": name or "",
+                "role": role,
+                "team_posts": tp,
+                "posts": posts or 0,
+                "completions": done or 0,
+                "score": tp + (posts or 0) + (done or 0),
+            })
+        leaderboard.sort(key=lambda r: (-r["score"], r["user_id"]))
+
+        def series(m):
+            return [[k.isoformat(), m[k]] for k in sorted(m) if m[k]]
+
+        return {
+            "team_id": team_id,
+            "range": {"from": d1.isoformat(), "to": d2.isoformat()},
+            "activity": {
+                "team_posts": series(team_posts_by_day),
+                "member_posts": series(member_posts),
+                "completions": series(completions),
+            },
+            "leaderboard": leaderboard,
+            "meta": {
+                "team_posts_label": "团队帖子数",
+                "member_posts_label": "成员个人发帖数",
+                "completions_label": "成员完成数（清单勾选 + 待办）",
+                "scope": "team",
+            },
+        }
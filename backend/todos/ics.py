@@ -0,0 +1,85 @@
+# todos/ics.py
+"""
+iCalendar (RFC 5545) 输出：逐行生成，便于流式返回
+"""
+from datetime import timezone as dt_timezone
+
+CRLF = "\r\n"
+PRODID = "-//zmzwhatToDo//Todos//CN"
+
+
+def escape_text(s: str) -> str:
+    return (
+        (s or "")
+        .replace("\\", "\\\\")
+        .replace(";", "\\;")
+        .replace(",", "\\,")
+        .replace("\r\n", "\\n")
+        .replace("\n", "\\n")
+    )
+
+
+def fold(line: str) -> str:
+    """超过 75 字节的行按规范折行（续行以空格开头），不拆开多字节字符"""
+    out = []
+    buf = ""
+    size = 0
+    for ch in line:
+        n = len(ch.encode("utf-8"))
+        if size + n > 75:
+            out.append(buf)
+            buf, size = " ", 1
+        buf += ch
+        size += n
+    out.append(buf)
+    return CRLF.join(out) + CRLF
+
+
+def format_dt(dt) -> str:
+    return dt.astimezone(dt_timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+def iter_calendar(rows, name: str, stamp):
+    """
+    rows: 可迭代的 (id, title, done, due_at, completed_at, updated_at)
+    有 due_at 的放在到期时间，否则放在完成时间
+    """
+    yield fold("BEGIN:VCALENDAR")
+    yield fold("VERSION:2.0")
+    yield fold(f"PRODID:{PRODID}")
+    yield fold("CALSCALE:GREGORIAN")
+    yield fold(f"X-WR-CALNAME:{escape_text(name)}")
+
+    dtstamp = format_dt(stamp)
+    for todo_id, title, done, due_at, completed_at, updated_at in rows:
+        at = due_at or completed_at
+        if at is None:
+            continue
+        summary = f"✅ {title}" if done else title
+        yield fold("BEGIN:VEVENT")
+        yield fold(f"UID:todo-{todo_id}@zmzwhattodo")
+        yield fold(f"DTSTAMP:{dtstamp}")
+        yield fold(f"DTSTART:{format_dt(at)}")
+        yield fold(f"DTEND:{format_dt(at)}")
+        yield fold(f"SUMMARY:{escape_text(summary)}")
+        yield fold(f"LAST-MODIFIED:{format_dt(updated_at)}")
+        if completed_at:
+            yield fold(f"DESCRIPTION:{escape_text('完成于 ' + format_dt(completed_at))}")
+        yield fold("END:VEVENT")
+
+    yield fold("END:VCALENDAR")
+
+
+def iter_chunks(lines, size: int = 64 * 1024):
+    """把逐行输出合并为约 size 字节的块，减少流式响应的写次数"""
+    buf = []
+    n = 0
+    for line in lines:
+        data = line.encode("utf-8")
+        buf.append(data)
+        n += len(data)
+        if n >= size:
+            yield b"".join(buf)
+            buf, n = [], 0
+    if buf:
+        yield b"".join(buf)
@@ -0,0 +1,37 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from todos.scheduler import DueReminderScheduler
+
+
+class Command(BaseCommand):
+    help = "运行 Todo 到期提醒调度器（常驻进程）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--interval", type=float, default=5.0, help="轮询变更的最长间隔（秒）")
+        parser.add_argument("--horizon", type=int, default=600, help="每次预加载未来多少秒内到期的 todo")
+        parser.add_argument("--catchup", type=int, default=3600, help="启动时补发多少秒内错过的提醒")
+        parser.add_argument("--once", action="store_true", help="只执行一次 tick 后退出")
+
+    def handle(self, *args, **options):
+        scheduler = DueReminderScheduler(
+            horizon=timedelta(seconds=options["horizon"]),
+            catchup=timedelta(seconds=options["catchup"]),
+        )
+        interval = options["interval"]
+
+        if options["once"]:
+            fired = scheduler.tick()
+            self.stdout.write(f"fired={fired}")
+            return
+
+        self.stdout.write("提醒调度器已启动")
+        try:
+            while True:
+                scheduler.tick()
+                wait = scheduler.next_wakeup()
+                time.sleep(interval if wait is None else min(wait, interval))
+        except KeyboardInterrupt:
+            self.stdout.write("提醒调度器已停止")
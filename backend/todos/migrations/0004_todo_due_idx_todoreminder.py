@@ -0,0 +1,40 @@
+# Generated by Django 6.0 on 2026-10-19 11:03
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0003_todo_updated_at_todotombstone'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['due_at'], name='todo_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['updated_at'], name='todo_updated_idx'),
+        ),
+        migrations.CreateModel(
+            name='TodoReminder',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('due_at', models.DateTimeField()),
+                ('fired_at', models.DateTimeField(auto_now_add=True)),
+                ('read_at', models.DateTimeField(blank=True, null=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_reminders', to=settings.AUTH_USER_MODEL)),
+                ('todo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='reminders', to='todos.todo')),
+            ],
+            options={
+                'ordering': ['-fired_at'],
+                'indexes': [models.Index(fields=['owner', 'read_at'], name='todo_reminder_owner_read_idx')],
+                'constraints': [models.UniqueConstraint(fields=('todo', 'due_at'), name='uniq_todo_reminder_due')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0 on 2026-10-19 11:40
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0004_todo_due_idx_todoreminder'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='todo',
+            name='occurrence_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.CreateModel(
+            name='TodoRecurrence',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('title', models.CharField(max_length=120)),
+                ('freq', models.CharField(choices=[('daily', 'Daily'), ('weekly', 'Weekly'), ('monthly', 'Monthly')], default='daily', max_length=10)),
+                ('interval', models.PositiveIntegerField(default=1)),
+                ('starts_at', models.DateTimeField()),
+                ('until', models.DateTimeField(blank=True, null=True)),
+                ('skipped', models.JSONField(blank=True, default=list)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='todo_recurrences', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='todo',
+            name='recurrence',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='occurrences', to='todos.todorecurrence'),
+        ),
+        migrations.AddConstraint(
+            model_name='todo',
+            constraint=models.UniqueConstraint(fields=('recurrence', 'occurrence_at'), name='uniq_todo_recurrence_occurrence'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 6.0 on 2026-10-19 15:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('todos', '0006_todocalendarfeed'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='todo',
+            index=models.Index(fields=['owner', 'completed_at'], name='todo_owner_completed_idx'),
+        ),
+    ]
@@ -1,6 +1,85 @@
+import calendar
+import secrets
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
 
+# updated_at / deleted_at 在事务提交前就按应用时钟打上：提交晚于读取、时间戳却早于读取的写入
+# 会被 updated_at__gte=上次读取时间 漏掉。按这两列增量扫描的地方都往回多看这么久（覆盖最长事务时长），
+# 重叠部分会重复返回，消费方按 id 幂等合并
+CHANGE_SCAN_OVERLAP = timedelta(minutes=1)
+
+
+def add_months(dt, months: int):
+    """按月偏移，日期越界时取当月最后一天（1/31 + 1 月 -> 2/28 或 2/29）"""
+    total = dt.month - 1 + months
+    year, month = dt.year + total // 12, total % 12 + 1
+    day = min(dt.day, calendar.monthrange(year, month)[1])
+    return dt.replace(year=year, month=month, day=day)
+
+
+class TodoRecurrence(models.Model):
+    """
+    重复待办模板：只保存规则，具体的 Todo 实例按需（请求的时间窗口内）惰性生成
+    """
+    FREQ_DAILY = "daily"
+    FREQ_WEEKLY = "weekly"
+    FREQ_MONTHLY = "monthly"
+    FREQ_CHOICES = [
+        (FREQ_DAILY, "Daily"),
+        (FREQ_WEEKLY, "Weekly"),
+        (FREQ_MONTHLY, "Monthly"),
+    ]
+
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todo_recurrences")
+    title = models.CharField(max_length=120)
+    freq = models.CharField(max_length=10, choices=FREQ_CHOICES, default=FREQ_DAILY)
+    interval = models.PositiveIntegerField(default=1)  # 每 N 天/周/月
+    starts_at = models.DateTimeField()  # 第一次发生的时间
+    until = models.DateTimeField(null=True, blank=True)  # 含当天；为空表示不结束
+    # 被用户删除的单次实例（ISO 时间串），避免再次生成
+    skipped = models.JSONField(blank=True, default=list)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Recurrence({self.id}) {self.freq}/{self.interval} by {self.owner_id}"
+
+    def _nth(self, n: int):
+        if self.freq == self.FREQ_MONTHLY:
+            # 始终从 starts_at 推算，避免 1/31 -> 2/28 -> 3/28 的漂移
+            return add_months(self.starts_at, n * self.interval)
+        step = timedelta(days=self.interval * (7 if self.freq == self.FREQ_WEEKLY else 1))
+        return self.starts_at + step * n
+
+    def expand(self, start, end, limit: int = 1000):
+        """返回 [start, end) 内的发生时间（已排除 skipped）"""
+        if self.until is not None and self.until < end:
+            end = self.until + timedelta(microseconds=1)
+        if end <= self.starts_at or start >= end:
+            return []
+
+        # 直接定位到窗口内的第一个序号，不从头迭代
+        n = 0
+        if start > self.starts_at:
+            if self.freq == self.FREQ_MONTHLY:
+                months = (start.year - self.starts_at.year) * 12 + start.month - self.starts_at.month
+                n = max(months // self.interval - 1, 0)
+            else:
+                n = (start - self.starts_at) // (self._nth(1) - self.starts_at)
+
+        skipped = set(self.skipped or [])
+        result = []
+        while len(result) < limit:
+            at = self._nth(n)
+            if at >= end:
+                break
+            if at >= start and at.isoformat() not in skipped:
+                result.append(at)
+            n += 1
+        return result
+
+
 class Todo(models.Model):
     owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todos")
     title = models.CharField(max_length=120)
@@ -8,6 +87,81 @@ class Todo(models.Model):
     due_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)  # ✅新增：完成时间
     created_at = models.DateTimeField(auto_now_add=True)
+    # 增量同步：任何写入都要刷新（queryset.update 不会自动触发 auto_now，需手动赋值）
+    updated_at = models.DateTimeField(auto_now=True)
+    # 重复待办生成的实例：模板被删除时保留已完成的历史
+    recurrence = models.ForeignKey(
+        TodoRecurrence, on_delete=models.SET_NULL, null=True, blank=True, related_name="occurrences"
+    )
+    occurrence_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["done", "-created_at"]
+        constraints = [
+            models.UniqueConstraint(fields=["recurrence", "occurrence_at"], name="uniq_todo_recurrence_occurrence"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "updated_at"], name="todo_owner_updated_idx"),
+            # 提醒调度器：按到期时间分段加载 / 按修改时间增量发现变更
+            models.Index(fields=["due_at"], name="todo_due_idx"),
+            models.Index(fields=["updated_at"], name="todo_updated_idx"),
+            # 日历统计：按完成时间范围分组
+            models.Index(fields=["owner", "completed_at"], name="todo_owner_completed_idx"),
+        ]
+
+
+class TodoTombstone(models.Model):
+    """
+    已删除 Todo 的墓碑：供 ?since= 增量同步告知客户端删除了哪些条目
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todo_tombstones")
+    todo_id = models.BigIntegerField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["owner", "deleted_at"], name="todo_tomb_owner_deleted_idx"),
+        ]
+
+    def __str__(self):
+        return f"Tombstone(todo={self.todo_id}, owner={self.owner_id})"
+
+
+class TodoReminder(models.Model):
+    """
+    到期提醒：由提醒调度器写入，作为每个用户的通知队列
+    """
+    owner = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todo_reminders")
+    todo = models.ForeignKey(Todo, on_delete=models.CASCADE, related_name="reminders")
+    due_at = models.DateTimeField()
+    fired_at = models.DateTimeField(auto_now_add=True)
+    read_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-fired_at"]
+        constraints = [
+            # 同一 todo 的同一到期时间只提醒一次（调度器重启/重复入堆都不会重复写）
+            models.UniqueConstraint(fields=["todo", "due_at"], name="uniq_todo_reminder_due"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "read_at"], name="todo_reminder_owner_read_idx"),
+        ]
+
+    def __str__(self):
+        return f"Reminder(todo={self.todo_id}, owner={self.owner_id})"
+
+
+def generate_feed_token():
+    return secrets.token_urlsafe(24)
+
+
+class TodoCalendarFeed(models.Model):
+    """
+    日历订阅令牌：日历客户端无法携带 Authorization 头，凭 URL 中的令牌访问 .ics
+    """
+    owner = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="todo_calendar_feed")
+    token = models.CharField(max_length=64, unique=True, default=generate_feed_token)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"CalendarFeed(owner={self.owner_id})"
@@ -0,0 +1,105 @@
+# todos/scheduler.py
+import heapq
+import logging
+from datetime import timedelta
+
+from django.utils import timezone
+
+from .models import CHANGE_SCAN_OVERLAP, Todo, TodoReminder
+
+logger = logging.getLogger(__name__)
+
+
+class DueReminderScheduler:
+    """
+    到期提醒调度器（进程内）：
+    - 用最小堆保存「即将到期」的 (due_at, todo_id)，只按 due_at 索引分段加载 [已加载上界, now + horizon]
+    - 每次 tick 通过 updated_at 索引拉取上次以来新建/修改的 todo 入堆，无需重新扫描全表；
+      起点往回多看 CHANGE_SCAN_OVERLAP，避免漏掉提交晚于上次扫描、时间戳却更早的修改（重复入堆的条目会被跳过）
+    - 堆顶到期时批量回查一次数据库（过滤已完成/已改期的旧条目），写入 TodoReminder
+    """
+
+    def __init__(self, horizon=timedelta(minutes=10), catchup=timedelta(hours=1)):
+        self.horizon = horizon
+        self.catchup = catchup
+        self._heap = []
+        self._queued = set()
+        self._loaded_until = None
+        self._changes_since = None
+
+    def _push_rows(self, rows):
+        for todo_id, due_at in rows:
+            if (due_at, todo_id) not in self._queued:
+                self._queued.add((due_at, todo_id))
+                heapq.heappush(self._heap, (due_at, todo_id))
+
+    def _load_window(self, now):
+        upper = now + self.horizon
+        qs = Todo.objects.filter(done=False, due_at__isnull=False, due_at__lte=upper)
+        if self._loaded_until is None:
+            # 首次启动：补发停机期间错过的提醒（已提醒过的会被唯一约束挡掉）
+            qs = qs.filter(due_at__gt=now - self.catchup)
+        else:
+            qs = qs.filter(due_at__gt=self._loaded_until)
+        self._push_rows(qs.values_list("id", "due_at"))
+        self._loaded_until = upper
+
+    def _load_changes(self, now):
+        if self._changes_since is None:
+            self._changes_since = now
+            return
+        # 只关心落在已加载窗口内的变更；窗口外的由后续分段加载负责
+        qs = Todo.objects.filter(
+            updated_at__gte=self._changes_since - CHANGE_SCAN_OVERLAP,
+            done=False,
+            due_at__gt=now - self.catchup,
+            due_at__lte=self._loaded_until,
+        )
+        self._push_rows(qs.values_list("id", "due_at"))
+        self._changes_since = now
+
+    def _pop_due(self, now):
+        due = {}
+        while self._heap and self._heap[0][0] <= now:
+            due_at, todo_id = heapq.heappop(self._heap)
+            self._queued.discard((due_at, todo_id))
+            due.setdefault(todo_id, set()).add(due_at)
+        return due
+
+    def _fire(self, due):
+        if not due:
+            return 0
+
+        # 一次回查：todo 仍未完成且 due_at 与入堆时一致才提醒
+        rows = Todo.objects.filter(id__in=list(due.keys()), done=False).values_list("id", "owner_id", "due_at")
+        reminders = [
+            TodoReminder(owner_id=owner_id, todo_id=todo_id, due_at=due_at)
+            for todo_id, owner_id, due_at in rows
+            if due_at in due[todo_id]
+        ]
+        if reminders:
+            # 重叠扫描 / 启动补发可能让已提醒过的条目再次到期，不计入本次提醒数
+            sent = set(
+                TodoReminder.objects.filter(todo_id__in=[r.todo_id for r in reminders])
+                .values_list("todo_id", "due_at")
+            )
+            reminders = [r for r in reminders if (r.todo_id, r.due_at) not in sent]
+        if reminders:
+            TodoReminder.objects.bulk_create(reminders, ignore_conflicts=True)
+        return len(reminders)
+
+    def tick(self, now=None):
+        now = now or timezone.now()
+        self._load_changes(now)
+        self._load_window(now)
+        fired = self._fire(self._pop_due(now))
+        if fired:
+            logger.info("Fired %s todo reminders", fired)
+        return fired
+
+    def next_wakeup(self, now=None):
+        """距离下一次需要处理的时间（秒），用于休眠"""
+        now = now or timezone.now()
+        if not self._heap:
+            return None
+        return max((self._heap[0][0] - now).total_seconds(), 0.0)
@@ -1,3 +1,254 @@
+import json
+from datetime import timedelta
+
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from stats.models import DailyActivity
+from users.models import User
+from .ics import fold
+from .models import Todo, TodoCalendarFeed, TodoRecurrence, TodoReminder, TodoTombstone
+from .scheduler import DueReminderScheduler
+from .views import make_sync_token
+
+
+class TodoTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", email="alice@example.com", password="secret1")
+        self.client.force_login(self.user)
+
+    def patch(self, todo_id, data):
+        return self.client.patch(f"/api/todos/{todo_id}/", json.dumps(data), content_type="application/json")
+
+    def completed_total(self):
+        return sum(DailyActivity.objects.filter(user=self.user).values_list("todos_completed", flat=True))
+
+
+class TodoPatchTests(TodoTestCase):
+    def todo_queries(self, ctx):
+        return [q["sql"] for q in ctx.captured_queries if "todos_todo" in q["sql"]]
+
+    def test_title_only_is_a_single_update(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.patch(todo.id, {"title": "b"})
+        self.assertEqual(resp.status_code, 200)
+        todo_queries = self.todo_queries(ctx)
+        self.assertEqual(len(todo_queries), 1)
+        self.assertTrue(todo_queries[0].startswith("UPDATE"))
+
+    def test_done_flip_uses_one_update_and_counts_once(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as ctx:
+                resp = self.patch(todo.id, {"done": True})
+        self.assertEqual(resp.status_code, 200)
+        # 不先读也不加锁：只有一条 UPDATE ... WHERE done = false
+        todo_queries = self.todo_queries(ctx)
+        self.assertEqual(len(todo_queries), 1)
+        self.assertTrue(todo_queries[0].startswith("UPDATE"))
+
+        todo.refresh_from_db()
+        self.assertTrue(todo.done)
+        self.assertIsNotNone(todo.completed_at)
+        self.assertEqual(self.completed_total(), 1)
+
+        # 重复标记完成：完成时间不变，统计不重复累加
+        completed_at = todo.completed_at
+        self.patch(todo.id, {"done": True})
+        todo.refresh_from_db()
+        self.assertEqual(todo.completed_at, completed_at)
+        self.assertEqual(self.completed_total(), 1)
+
+    def test_undo_clears_completion_and_stats(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        self.patch(todo.id, {"done": True})
+        self.patch(todo.id, {"done": False})
+        todo.refresh_from_db()
+        self.assertFalse(todo.done)
+        self.assertIsNone(todo.completed_at)
+        self.assertEqual(self.completed_total(), 0)
+
+    def test_due_at_edit_of_open_todo_is_a_single_update(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        with CaptureQueriesContext(connection) as ctx:
+            resp = self.patch(todo.id, {"due_at": "2026-10-20T08:00:00Z"})
+        self.assertEqual(resp.status_code, 200)
+        todo_queries = self.todo_queries(ctx)
+        self.assertEqual(len(todo_queries), 1)
+        self.assertNotIn("FOR UPDATE", todo_queries[0])
+
+    def test_undo_with_title_change(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        self.patch(todo.id, {"done": True})
+        with CaptureQueriesContext(connection) as ctx:
+            self.patch(todo.id, {"done": False, "title": "b"})
+        self.assertTrue(all("FOR UPDATE" not in q for q in self.todo_queries(ctx)))
+        todo.refresh_from_db()
+        self.assertEqual((todo.done, todo.title), (False, "b"))
+        self.assertEqual(self.completed_total(), 0)
+
+        # 本来就未完成：不翻转，其余字段照常写入
+        self.patch(todo.id, {"done": False, "title": "c"})
+        todo.refresh_from_db()
+        self.assertEqual(todo.title, "c")
+        self.assertEqual(self.completed_total(), 0)
+
+    def test_other_users_todo_is_not_found(self):
+        other = User.objects.create_user(username="bob", email="bob@example.com")
+        todo = Todo.objects.create(owner=other, title="a")
+        self.assertEqual(self.patch(todo.id, {"done": True}).status_code, 404)
+        todo.refresh_from_db()
+        self.assertFalse(todo.done)
+
+
+class TodoSyncTests(TodoTestCase):
+    def sync(self, token):
+        resp = self.client.get(f"/api/todos/?since={token}")
+        self.assertEqual(resp.status_code, 200)
+        return resp.json()
+
+    def test_delete_leaves_tombstone(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        token = make_sync_token(timezone.now())
+        self.client.delete(f"/api/todos/{todo.id}/")
+        data = self.sync(token)
+        self.assertEqual(data["deleted"], [todo.id])
+        self.assertFalse(data["full"])
+
+    def test_changed_since_token(self):
+        old = Todo.objects.create(owner=self.user, title="old")
+        token = make_sync_token(timezone.now())
+        self.patch(old.id, {"title": "renamed"})
+        data = self.sync(token)
+        self.assertEqual([t["id"] for t in data["data"]], [old.id])
+
+    def test_write_committed_after_read_is_not_skipped(self):
+        todo = Todo.objects.create(owner=self.user, title="a")
+        read_at = timezone.now()
+        token = self.client.get("/api/todos/").json()["sync_token"]
+        # 时间戳早于上次读取、提交晚于上次读取的写入
+        Todo.objects.filter(pk=todo.pk).update(title="late", updated_at=read_at - timedelta(seconds=5))
+        data = self.sync(token)
+        self.assertEqual([t["title"] for t in data["data"]], ["late"])
+
+    def test_recurrence_delete_tombstones_pending_occurrences(self):
+        start = timezone.now() - timedelta(days=1)
+        r = TodoRecurrence.objects.create(owner=self.user, title="daily", starts_at=start)
+        pending = [
+            Todo.objects.create(owner=self.user, title="daily", recurrence=r, occurrence_at=start + timedelta(days=i))
+            for i in range(3)
+        ]
+        done = Todo.objects.create(
+            owner=self.user, title="daily", recurrence=r, occurrence_at=start + timedelta(days=5),
+            done=True, completed_at=timezone.now(),
+        )
+        token = make_sync_token(timezone.now())
+
+        resp = self.client.delete(f"/api/todos/recurrences/{r.id}/")
+        self.assertEqual(resp.status_code, 200)
+
+        data = self.sync(token)
+        self.assertCountEqual(data["deleted"], [t.id for t in pending])
+        # 保留的已完成实例外键被置空，也要出现在增量里
+        self.assertEqual([(t["id"], t["recurrence_id"]) for t in data["data"]], [(done.id, None)])
+        self.assertEqual(TodoTombstone.objects.filter(owner=self.user).count(), 3)
+
+    def test_stale_token_forces_full_sync(self):
+        Todo.objects.create(owner=self.user, title="a")
+        data = self.sync(make_sync_token(timezone.now() - timedelta(days=31)))
+        self.assertTrue(data["full"])
+        self.assertEqual(len(data["data"]), 1)
+
+
+class DueReminderSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="alice", email="alice@example.com")
+        self.t0 = timezone.now()
+        self.scheduler = DueReminderScheduler(horizon=timedelta(minutes=10))
+
+    def todo(self, minutes, **kwargs):
+        return Todo.objects.create(owner=self.user, title="a", due_at=self.t0 + timedelta(minutes=minutes), **kwargs)
+
+    def tick(self, minutes):
+        return self.scheduler.tick(now=self.t0 + timedelta(minutes=minutes))
+
+    def test_fires_once_when_due(self):
+        todo = self.todo(5)
+        self.todo(5, done=True)
+        self.assertEqual(self.tick(0), 0)
+        self.assertEqual(self.tick(4), 0)
+        self.assertEqual(self.tick(6), 1)
+        self.assertEqual(self.tick(7), 0)
+        self.assertEqual(list(TodoReminder.objects.values_list("todo_id", flat=True)), [todo.id])
+
+    def test_todo_created_after_window_load(self):
+        self.tick(0)
+        todo = self.todo(3)
+        self.assertEqual(self.tick(4), 1)
+        self.assertTrue(TodoReminder.objects.filter(todo=todo).exists())
+
+    def test_rescheduled_todo_fires_at_new_time(self):
+        todo = self.todo(5)
+        self.tick(0)
+        new_due = self.t0 + timedelta(minutes=8)
+        Todo.objects.filter(pk=todo.pk).update(due_at=new_due, updated_at=timezone.now())
+
+        self.assertEqual(self.tick(6), 0)
+        self.assertEqual(self.tick(9), 1)
+        self.assertEqual(list(TodoReminder.objects.values_list("due_at", flat=True)), [new_due])
+
+    def test_change_committed_after_scan_is_not_missed(self):
+        self.tick(0)
+        todo = self.todo(3)
+        # 时间戳早于上次扫描、提交晚于上次扫描的修改
+        Todo.objects.filter(pk=todo.pk).update(updated_at=self.t0 - timedelta(seconds=5))
+        self.assertEqual(self.tick(4), 1)
+
+
+class CalendarFeedTests(TodoTestCase):
+    def setUp(self):
+        super().setUp()
+        self.feed = TodoCalendarFeed.objects.create(owner=self.user)
+        self.url = f"/api/todos/calendar.ics?token={self.feed.token}"
+
+    def fetch(self, **headers):
+        resp = self.client.get(self.url, **headers)
+        body = b"".join(resp.streaming_content).decode("utf-8") if resp.streaming else resp.content.decode()
+        return resp, body
+
+    def test_feed_lists_dated_todos(self):
+        Todo.objects.create(owner=self.user, title="exam, room 101", due_at=timezone.now())
+        Todo.objects.create(owner=self.user, title="undated")
+        resp, body = self.fetch()
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(body.startswith("BEGIN:VCALENDAR\r\n"))
+        self.assertIn("SUMMARY:exam\\, room 101\r\n", body)
+        self.assertNotIn("undated", body)
+
+    def test_etag_304_until_a_todo_changes(self):
+        todo = Todo.objects.create(owner=self.user, title="a", due_at=timezone.now())
+        resp, _ = self.fetch()
+        etag = resp["ETag"]
+        resp, _ = self.fetch(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+
+        self.patch(todo.id, {"title": "b"})
+        resp, body = self.fetch(HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertNotEqual(resp["ETag"], etag)
+        self.assertIn("SUMMARY:b", body)
+
+    def test_unknown_token(self):
+        self.assertEqual(self.client.get("/api/todos/calendar.ics?token=nope").status_code, 404)
 
-# Create your tests here.
+    def test_fold_limits_octets_without_splitting_characters(self):
+        line = "SUMMARY:" + "复习" * 40
+        folded = fold(line)
+        parts = folded[:-2].split("\r\n")
+        self.assertTrue(all(len(p.encode("utf-8")) <= 75 for p in parts))
+        self.assertTrue(all(p.startswith(" ") for p in parts[1:]))
+        self.assertEqual("".join(p[1:] if i else p for i, p in enumerate(parts)), line)
+        self.assertEqual(fold("SHORT"), "SHORT\r\n")
@@ -1,7 +1,22 @@
 from django.urls import path
-from .views import TodoListCreateView, TodoDetailView
+from .views import (
+    TodoListCreateView,
+    TodoDetailView,
+    TodoReminderListView,
+    TodoRecurrenceListCreateView,
+    TodoRecurrenceDetailView,
+    TodoOccurrenceListView,
+    TodoCalendarFeedTokenView,
+    TodoCalendarICSView,
+)
 
 urlpatterns = [
     path("", TodoListCreateView.as_view()),
     path("<int:todo_id>/", TodoDetailView.as_view()),
+    path("reminders/", TodoReminderListView.as_view()),
+    path("recurrences/", TodoRecurrenceListCreateView.as_view()),
+    path("recurrences/<int:recurrence_id>/", TodoRecurrenceDetailView.as_view()),
+    path("occurrences/", TodoOccurrenceListView.as_view()),
+    path("calendar/token/", TodoCalendarFeedTokenView.as_view()),
+    path("calendar.ics", TodoCalendarICSView.as_view()),
 ]
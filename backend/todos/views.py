@@ -1,12 +1,32 @@
 import json
-from django.http import JsonResponse
+from django.http import JsonResponse, StreamingHttpResponse
 from django.views import View
+from django.db.models import Q, OuterRef, Subquery
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 from django.utils.dateparse import parse_datetime
 from django.utils import timezone
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from .models import (
+    CHANGE_SCAN_OVERLAP, Todo, TodoTombstone, TodoReminder, TodoRecurrence, TodoCalendarFeed, generate_feed_token,
+)
+from .ics import iter_calendar, iter_chunks
+from stats.buckets import invalidate_month
+from stats.rollup import bump, day_of
+
+TODO_FIELDS = (
+    "id", "title", "done", "due_at", "completed_at", "created_at", "updated_at",
+    "recurrence_id", "occurrence_at",
+)
+# 重复待办：单次请求最多展开的时间窗口
+MAX_OCCURRENCE_WINDOW = timedelta(days=366)
+# 墓碑保留时长：比它更旧的 since 令牌无法得知期间的删除，只能全量重新同步
+TOMBSTONE_RETENTION = timedelta(days=30)
 
-from .models import Todo
 
 def require_login(request):
     if not request.user.is_authenticated:
@@ -14,16 +34,111 @@ def require_login(request):
     return None
 
 
+def _parse_date(s: str):
+    try:
+        d = datetime.strptime(s, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+    return timezone.make_aware(d)
+
+
+def materialize_occurrences(owner, start, end):
+    """
+    把 [start, end) 内尚未落库的重复实例补齐为 Todo 行（两次查询 + 一次批量插入），
+    返回窗口内涉及的模板列表
+    """
+    templates = list(
+        TodoRecurrence.objects.filter(owner=owner, starts_at__lt=end).exclude(until__lt=start)
+    )
+    if not templates:
+        return []
+
+    wanted = {}
+    for r in templates:
+        for at in r.expand(start, end):
+            wanted[(r.id, at)] = r
+
+    existing = set(
+        Todo.objects.filter(recurrence__in=templates, occurrence_at__gte=start, occurrence_at__lt=end)
+        .values_list("recurrence_id", "occurrence_at")
+    )
+    new_rows = [
+        Todo(owner=owner, title=r.title, due_at=at, recurrence=r, occurrence_at=at)
+        for (rid, at), r in wanted.items()
+        if (rid, at) not in existing
+    ]
+    if new_rows:
+        Todo.objects.bulk_create(new_rows, ignore_conflicts=True)
+    return templates
+
+
+def recurrence_to_dict(r):
+    return {
+        "id": r.id,
+        "title": r.title,
+        "freq": r.freq,
+        "interval": r.interval,
+        "starts_at": r.starts_at,
+        "until": r.until,
+        "created_at": r.created_at,
+    }
+
+
+def make_sync_token(dt) -> str:
+    """同步令牌：UTC 微秒时间戳（客户端视为不透明字符串）"""
+    delta = dt - datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+    return str(delta // timedelta(microseconds=1))
+
+
+def parse_sync_token(token: str):
+    try:
+        us = int(token)
+    except (TypeError, ValueError):
+        return None
+    if us < 0:
+        return None
+    return datetime(1970, 1, 1, tzinfo=dt_timezone.utc) + timedelta(microseconds=us)
+
+
 @method_decorator(csrf_exempt, name="dispatch")
 class TodoListCreateView(View):
     def get(self, request):
         err = require_login(request)
         if err: return err
 
-        qs = Todo.objects.filter(owner=request.user).values(
-            "id", "title", "done", "due_at", "completed_at", "created_at"
+        # 令牌取「读取前的时间 - CHANGE_SCAN_OVERLAP」：时间戳早于读取、提交晚于读取的写入
+        # 下次同步仍会返回；重叠窗口内的条目会重复下发，客户端按 id 覆盖 / 删除即可
+        now = timezone.now()
+        token = make_sync_token(now - CHANGE_SCAN_OVERLAP)
+        qs = Todo.objects.filter(owner=request.user)
+
+        since_raw = (request.GET.get("since") or "").strip()
+        if not since_raw:
+            data = list(qs.values(*TODO_FIELDS))
+            return JsonResponse({"data": data, "sync_token": token}, status=200)
+
+        since = parse_sync_token(since_raw)
+        if since is None:
+            return JsonResponse({"message": "since 参数非法"}, status=400)
+
+        # 令牌早于墓碑保留期：删除信息可能已被清理，要求客户端全量替换
+        if since < now - TOMBSTONE_RETENTION:
+            data = list(qs.values(*TODO_FIELDS))
+            return JsonResponse(
+                {"data": data, "deleted": [], "full": True, "sync_token": token},
+                status=200,
+            )
+
+        # 增量：仅返回 since 之后新建/修改/删除的条目（走 (owner, updated_at) 索引）
+        changed = list(qs.filter(updated_at__gte=since).values(*TODO_FIELDS))
+        deleted = list(
+            TodoTombstone.objects.filter(owner=request.user, deleted_at__gte=since)
+            .values_list("todo_id", flat=True)
+        )
+        return JsonResponse(
+            {"data": changed, "deleted": deleted, "full": False, "sync_token": token},
+            status=200,
         )
-        return JsonResponse({"data": list(qs)}, status=200)
 
     def post(self, request):
         err = require_login(request)
@@ -56,41 +171,347 @@ class TodoDetailView(View):
         except json.JSONDecodeError:
             return JsonResponse({"message": "JSON格式错误"}, status=400)
 
-        try:
-            t = Todo.objects.get(id=todo_id, owner=request.user)
-        except Todo.DoesNotExist:
-            return JsonResponse({"message": "不存在"}, status=404)
+        # 只更新请求中出现的字段（update_fields 语义），一条 UPDATE 完成，不预先读取整行
+        now = timezone.now()
+        updates = {}
 
         # title
         if "title" in data:
-            t.title = (data.get("title") or "").strip()
+            updates["title"] = (data.get("title") or "").strip()
 
         # due_at
         if "due_at" in data:
             due_at = data.get("due_at")
-            t.due_at = parse_datetime(due_at) if due_at else None
-
-        # ✅ done + completed_at
-        if "done" in data:
-            new_done = bool(data.get("done"))
-            if new_done and not t.done:
-                # False -> True：记录完成时间
-                t.done = True
-                t.completed_at = timezone.now()
-            elif (not new_done) and t.done:
-                # True -> False：清空完成时间
-                t.done = False
-                t.completed_at = None
-            # 如果 done 没变化，不改 completed_at
-
-        t.save()
+            updates["due_at"] = parse_datetime(due_at) if due_at else None
+
+        # ✅ done + completed_at：由条件 UPDATE 的影响行数判断状态是否翻转（见 _update_tracked）
+        done = bool(data.get("done")) if "done" in data else None
+
+        qs = Todo.objects.filter(id=todo_id, owner=request.user)
+
+        if not updates and done is None:
+            found = qs.exists()
+        else:
+            # queryset.update 不触发 auto_now，需手动刷新以便增量同步
+            updates["updated_at"] = now
+            if done is None and "due_at" not in data:
+                found = qs.update(**updates)
+            else:
+                with transaction.atomic():
+                    found = self._update_tracked(request.user.id, qs, updates, done, "due_at" in data, now)
+
+        if not found:
+            return JsonResponse({"message": "不存在"}, status=404)
         return JsonResponse({"message": "已更新"}, status=200)
 
+    @staticmethod
+    def _update_tracked(user_id, qs, fields, done, due_changed, now) -> bool:
+        """
+        完成状态翻转、已完成的 todo 改截止时间会影响统计。不加行锁，也不在写之前读整行：
+        - 标记完成：UPDATE ... WHERE done = false，影响 1 行即发生翻转，完成时间记为 now
+        - 取消完成：扣减要落在原完成日，先读旧完成时间，再按读到的值做条件 UPDATE；期间被并发改过则不算翻转
+        - 只改截止时间：UPDATE ... WHERE done = false；落空（已完成或不存在）时才读完成时间
+        没有翻转时照常写入其余字段；返回 todo 是否存在
+        """
+        completed, known = None, False
+        if done is True:
+            if qs.filter(done=False).update(done=True, completed_at=now, **fields):
+                bump(user_id, day_of(now), todos_completed=1)
+                return True
+        elif done is False:
+            completed, known = qs.filter(done=True).values_list("completed_at").first(), True
+            if completed is not None and qs.filter(done=True, completed_at=completed[0]).update(
+                done=False, completed_at=None, **fields
+            ):
+                if completed[0]:
+                    bump(user_id, day_of(completed[0]), todos_completed=-1)
+                return True
+        elif qs.filter(done=False).update(**fields):
+            return True
+
+        if due_changed and not known:
+            completed = qs.filter(done=True).values_list("completed_at").first()
+        if not qs.update(**fields):
+            return False
+        # 已完成的 todo 改了截止时间：按时/逾期归类变化，提交后失效那个月的统计缓存
+        if due_changed and completed and completed[0]:
+            month_day = day_of(completed[0])
+            transaction.on_commit(lambda: invalidate_month(user_id, month_day))
+        return True
+
     def delete(self, request, todo_id: int):
         err = require_login(request)
         if err: return err
 
-        deleted, _ = Todo.objects.filter(id=todo_id, owner=request.user).delete()
-        if not deleted:
-            return JsonResponse({"message": "不存在"}, status=404)
+        with transaction.atomic():
+            row = (
+                Todo.objects.filter(id=todo_id, owner=request.user)
+                .values_list("recurrence_id", "occurrence_at", "completed_at")
+                .first()
+            )
+            deleted, _ = Todo.objects.filter(id=todo_id, owner=request.user).delete()
+            if not deleted or not row:
+                return JsonResponse({"message": "不存在"}, status=404)
+            recurrence_id, occurrence_at, completed_at = row
+
+            # 重复实例被删除：记入模板的 skipped，之后不再生成
+            if recurrence_id:
+                r = TodoRecurrence.objects.select_for_update().filter(id=recurrence_id).first()
+                if r:
+                    r.skipped = list(r.skipped or []) + [occurrence_at.isoformat()]
+                    r.save(update_fields=["skipped"])
+
+            if completed_at:
+                bump(request.user.id, day_of(completed_at), todos_completed=-1)
+
+            # 留下墓碑供增量同步；顺带清理该用户过期的墓碑
+            now = timezone.now()
+            TodoTombstone.objects.filter(owner=request.user, deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+            TodoTombstone.objects.create(owner=request.user, todo_id=todo_id)
         return JsonResponse({"message": "已删除"}, status=200)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TodoRecurrenceListCreateView(View):
+    """
+    重复待办模板：GET 列表 / POST 创建（只存规则，不预先生成未来实例）
+    """
+    def get(self, request):
+        err = require_login(request)
+        if err: return err
+
+        qs = TodoRecurrence.objects.filter(owner=request.user).order_by("-created_at")
+        return JsonResponse({"data": [recurrence_to_dict(r) for r in qs]}, status=200)
+
+    def post(self, request):
+        err = require_login(request)
+        if err: return err
+
+        try:
+            data = json.loads(request.body)
+        except json.JSONDecodeError:
+            return JsonResponse({"message": "JSON格式错误"}, status=400)
+
+        title = (data.get("title") or "").strip()
+        if not title:
+            return JsonResponse({"message": "title 不能为空"}, status=400)
+
+        freq = (data.get("freq") or TodoRecurrence.FREQ_DAILY).strip().lower()
+        if freq not in dict(TodoRecurrence.FREQ_CHOICES):
+            return JsonResponse({"message": "freq 非法"}, status=400)
+
+        try:
+            interval = int(data.get("interval") or 1)
+        except (TypeError, ValueError):
+            return JsonResponse({"message": "interval 非法"}, status=400)
+        if interval < 1:
+            return JsonResponse({"message": "interval 非法"}, status=400)
+
+        starts_at = parse_datetime(data.get("starts_at") or "")
+        if not starts_at:
+            return JsonResponse({"message": "starts_at 不能为空"}, status=400)
+        if timezone.is_naive(starts_at):
+            starts_at = timezone.make_aware(starts_at)
+
+        until = data.get("until")
+        until_dt = parse_datetime(until) if until else None
+        if until_dt and timezone.is_naive(until_dt):
+            until_dt = timezone.make_aware(until_dt)
+
+        r = TodoRecurrence.objects.create(
+            owner=request.user,
+            title=title,
+            freq=freq,
+            interval=interval,
+            starts_at=starts_at,
+            until=until_dt,
+        )
+        return JsonResponse({"message": "创建成功", "id": r.id}, status=201)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TodoRecurrenceDetailView(View):
+    def delete(self, request, recurrence_id: int):
+        err = require_login(request)
+        if err: return err
+
+        with transaction.atomic():
+            r = TodoRecurrence.objects.filter(id=recurrence_id, owner=request.user).first()
+            if not r:
+                return JsonResponse({"message": "不存在"}, status=404)
+            # 未完成的实例随模板删除（各留一条墓碑供增量同步）；已完成的保留为历史（外键置空）
+            now = timezone.now()
+            pending = Todo.objects.filter(recurrence=r, done=False)
+            deleted_ids = list(pending.values_list("id", flat=True))
+            pending.filter(id__in=deleted_ids).delete()
+            TodoTombstone.objects.filter(owner=request.user, deleted_at__lt=now - TOMBSTONE_RETENTION).delete()
+            TodoTombstone.objects.bulk_create(
+                [TodoTombstone(owner=request.user, todo_id=todo_id) for todo_id in deleted_ids]
+            )
+            # SET_NULL 不经过 save()，手动刷新 updated_at，客户端才能同步到 recurrence_id 的变化
+            Todo.objects.filter(recurrence=r).update(updated_at=now)
+            r.delete()
+        return JsonResponse({"message": "已删除"}, status=200)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TodoOccurrenceListView(View):
+    """
+    GET /api/todos/occurrences/?from=YYYY-MM-DD&to=YYYY-MM-DD
+
+    返回窗口内（含 to 当天）的重复待办实例；缺失的实例此时才落库，
+    因此 Todo 表只包含用户真正看过/完成过的区间
+    """
+    def get(self, request):
+        err = require_login(request)
+        if err: return err
+
+        start = _parse_date((request.GET.get("from") or "").strip())
+        end = _parse_date((request.GET.get("to") or "").strip())
+        if not start or not end:
+            return JsonResponse({"message": "from/to 参数非法"}, status=400)
+
+        end = end + timedelta(days=1)
+        if end <= start:
+            return JsonResponse({"message": "to 不能早于 from"}, status=400)
+        if end - start > MAX_OCCURRENCE_WINDOW:
+            return JsonResponse({"message": "时间范围过大"}, status=400)
+
+        templates = materialize_occurrences(request.user, start, end)
+        if not templates:
+            return JsonResponse({"data": []}, status=200)
+
+        qs = (
+            Todo.objects.filter(recurrence__in=templates, occurrence_at__gte=start, occurrence_at__lt=end)
+            .order_by("occurrence_at")
+            .values(*TODO_FIELDS)
+        )
+        return JsonResponse({"data": list(qs)}, status=200)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TodoReminderListView(View):
+    """
+    到期提醒队列：GET 拉取未读提醒；POST 批量标记已读（ids 为空则全部已读）
+    """
+    def get(self, request):
+        err = require_login(request)
+        if err: return err
+
+        qs = (
+            TodoReminder.objects.filter(owner=request.user, read_at__isnull=True)
+            .select_related("todo")
+            .order_by("-fired_at")[:100]
+        )
+        data = [
+            {
+                "id": r.id,
+                "todo_id": r.todo_id,
+                "title": r.todo.title,
+                "due_at": r.due_at,
+                "fired_at": r.fired_at,
+            }
+            for r in qs
+        ]
+        return JsonResponse({"data": data}, status=200)
+
+    def post(self, request):
+        err = require_login(request)
+        if err: return err
+
+        try:
+            data = json.loads(request.body or b"{}")
+        except json.JSONDecodeError:
+            return JsonResponse({"message": "JSON格式错误"}, status=400)
+
+        qs = TodoReminder.objects.filter(owner=request.user, read_at__isnull=True)
+        ids = data.get("ids")
+        if ids:
+            if not isinstance(ids, list):
+                return JsonResponse({"message": "ids 必须是数组"}, status=400)
+            qs = qs.filter(id__in=ids)
+
+        updated = qs.update(read_at=timezone.now())
+        return JsonResponse({"message": "已读", "updated": updated}, status=200)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class TodoCalendarFeedTokenView(View):
+    """
+    日历订阅地址：GET 获取（首次自动生成）；POST 重置令牌，旧地址立即失效
+    """
+    def _payload(self, request, feed):
+        url = request.build_absolute_uri(f"/api/todos/calendar.ics?token={feed.token}")
+        return {"token": feed.token, "url": url}
+
+    def get(self, request):
+        err = require_login(request)
+        if err: return err
+
+        feed, _ = TodoCalendarFeed.objects.get_or_create(owner=request.user)
+        return JsonResponse(self._payload(request, feed), status=200)
+
+    def post(self, request):
+        err = require_login(request)
+        if err: return err
+
+        feed, created = TodoCalendarFeed.objects.get_or_create(owner=request.user)
+        if not created:
+            feed.token = generate_feed_token()
+            feed.save(update_fields=["token"])
+        return JsonResponse(self._payload(request, feed), status=200)
+
+
+class TodoCalendarICSView(View):
+    """
+    GET /api/todos/calendar.ics?token=...
+
+    日历客户端会频繁轮询：先用一条查询拿到令牌对应用户及其最近一次 todo 变更时间，
+    生成 ETag/Last-Modified，未变化时直接 304；有变化才流式输出完整日历
+    """
+    def get(self, request):
+        token = (request.GET.get("token") or "").strip()
+        if not token:
+            return JsonResponse({"message": "未登录"}, status=401)
+
+        feed = (
+            TodoCalendarFeed.objects.filter(token=token)
+            .annotate(
+                last_todo=Subquery(
+                    Todo.objects.filter(owner_id=OuterRef("owner_id"))
+                    .order_by("-updated_at")
+                    .values("updated_at")[:1]
+                ),
+                last_deleted=Subquery(
+                    TodoTombstone.objects.filter(owner_id=OuterRef("owner_id"))
+                    .order_by("-deleted_at")
+                    .values("deleted_at")[:1]
+                ),
+            )
+            .first()
+        )
+        if not feed:
+            return JsonResponse({"message": "订阅地址无效"}, status=404)
+
+        last = max(x for x in (feed.created_at, feed.last_todo, feed.last_deleted) if x is not None)
+        etag = f'"{make_sync_token(last)}"'
+        last_modified = int(last.timestamp())
+
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        rows = (
+            Todo.objects.filter(owner_id=feed.owner_id)
+            .filter(Q(due_at__isnull=False) | Q(completed_at__isnull=False))
+            .order_by("id")
+            .values_list("id", "title", "done", "due_at", "completed_at", "updated_at")
+            .iterator(chunk_size=500)
+        )
+        body = iter_chunks(iter_calendar(rows, "我的待办", last))
+        resp = StreamingHttpResponse(body, content_type="text/calendar; charset=utf-8")
+        resp["ETag"] = etag
+        resp["Last-Modified"] = http_date(last_modified)
+        resp["Cache-Control"] = "private, max-age=300"
+        resp["Content-Disposition"] = 'inline; filename="todos.ics"'
+        return resp
@@ -0,0 +1,112 @@
+# users/authentication.py
+"""
+带缓存的 JWT 认证：
+
+- 令牌携带 ver（= User.token_version）；按 (user_id, ver) 缓存 User 对象，短 TTL，
+  命中时整个认证过程不查库
+- 改密码 / 停用账号时 token_version + 1：旧令牌的 ver 对不上，立即失效
+- 用户资料保存（MeAPIView.patch、后台修改等）由 users.signals 删除缓存
+- 只需要 user.id 的视图可设 auth_claims_only = True：不取 User，只验签 + 比对缓存的当前 token_version
+  （一次缓存读；缓存缺失时查一次库再写回，缓存被清掉也不会放行旧令牌）
+- 改密码 / 停用只能更新处理该请求的进程里的缓存（默认 LocMemCache 不跨进程），
+  所以缓存一律短 TTL：其他进程最多 TOKEN_VERSION_TTL / AUTH_USER_TTL 秒后回库拿到新版本
+- 刷新令牌同样比对 ver（SafeTokenRefreshView），改密码前的 refresh token 换不出新的 access token
+"""
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db.models import F
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+TOKEN_VERSION_CLAIM = "ver"
+AUTH_USER_TTL = 60
+TOKEN_VERSION_TTL = 30
+
+
+def user_cache_key(user_id, version) -> str:
+    return f"auth:user:{user_id}:v{version}"
+
+
+def _version_key(user_id) -> str:
+    return f"auth:ver:{user_id}"
+
+
+def current_token_version(user_id):
+    """用户当前的 token_version；用户不存在或已停用返回 None（此时任何令牌都不再有效）"""
+    key = _version_key(user_id)
+    version = cache.get(key)
+    if version is None:
+        version = (
+            get_user_model().objects.filter(pk=user_id, is_active=True)
+            .values_list("token_version", flat=True).first()
+        )
+        cache.set(key, -1 if version is None else version, TOKEN_VERSION_TTL)
+    return None if version is None or version < 0 else version
+
+
+def check_token_version(token):
+    """令牌的 ver 落后于用户当前版本（改过密码 / 被停用）时拒绝"""
+    current = current_token_version(token.get(api_settings.USER_ID_CLAIM))
+    if current is None or token.get(TOKEN_VERSION_CLAIM, 0) != current:
+        raise AuthenticationFailed("登录已失效，请重新登录", code="token_revoked")
+
+
+def invalidate_user_cache(user):
+    cache.delete(user_cache_key(user.pk, user.token_version))
+
+
+def forget_token_version(user_id):
+    """停用 / 删除账号：下次校验重新查库"""
+    cache.delete(_version_key(user_id))
+
+
+def revoke_tokens(user):
+    """让该用户已签发的所有令牌失效（改密码 / 停用）"""
+    user.__class__.objects.filter(pk=user.pk).update(token_version=F("token_version") + 1)
+    user.refresh_from_db(fields=["token_version"])
+    cache.set(_version_key(user.pk), user.token_version if user.is_active else -1, TOKEN_VERSION_TTL)
+    cache.delete(user_cache_key(user.pk, user.token_version - 1))
+
+
+class VersionedTokenRefreshSerializer(TokenRefreshSerializer):
+    def validate(self, attrs):
+        check_token_version(RefreshToken(attrs["refresh"]))
+        return super().validate(attrs)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def authenticate(self, request):
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+
+        view = (getattr(request, "parser_context", None) or {}).get("view")
+        if getattr(view, "auth_claims_only", False):
+            return self.get_claims_user(validated_token), validated_token
+        return self.get_user(validated_token), validated_token
+
+    def get_claims_user(self, validated_token):
+        check_token_version(validated_token)
+        return TokenUser(validated_token)
+
+    def get_user(self, validated_token):
+        user_id = validated_token.get(api_settings.USER_ID_CLAIM)
+        version = validated_token.get(TOKEN_VERSION_CLAIM, 0)
+
+        key = user_cache_key(user_id, version)
+        user = cache.get(key)
+        if user is None:
+            user = super().get_user(validated_token)
+            if user.token_version == version:
+                cache.set(key, user, AUTH_USER_TTL)
+        if user.token_version != version:
+            raise AuthenticationFailed("登录已失效，请重新登录", code="token_revoked")
+        return user
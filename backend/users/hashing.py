@@ -0,0 +1,67 @@
+# users/hashing.py
+"""
+批量密码哈希的进程池：
+
+- spawn 出的子进程是全新解释器，不继承 Web 进程的线程、锁与数据库连接（fork 一个多线程的
+  WSGI 进程并不安全）；子进程只加载 settings，不连数据库
+- 进程池在本进程内只建一次、之后复用，启动开销不落在每个请求上
+- 本模块不导入任何模型：子进程反序列化任务时会导入它，此时应用注册表尚未就绪
+"""
+import atexit
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import django
+from django.contrib.auth.hashers import make_password
+
+PARALLEL_HASH_MIN = 8         # 少于此数直接在当前进程里算
+
+_hash_pool = None
+_hash_pool_lock = threading.Lock()
+
+
+def _init_worker(settings_module):
+    # spawn 出的子进程是全新解释器：只需加载 settings（PASSWORD_HASHERS 等），不连数据库
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", settings_module)
+    django.setup()
+
+
+def _shutdown_hash_pool():
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is not None:
+            _hash_pool.shutdown(wait=False, cancel_futures=True)
+            _hash_pool = None
+
+
+def get_hash_pool(processes=None):
+    """进程内共享的哈希进程池：首次使用时创建（之后复用，大小以首次为准）"""
+    global _hash_pool
+    with _hash_pool_lock:
+        if _hash_pool is None:
+            _hash_pool = ProcessPoolExecutor(
+                processes or multiprocessing.cpu_count(),
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(os.environ.get("DJANGO_SETTINGS_MODULE", "backend.settings"),),
+            )
+            atexit.register(_shutdown_hash_pool)
+        return _hash_pool
+
+
+def hash_passwords(passwords, processes=None):
+    """按顺序返回哈希；None 生成不可用密码（需管理员重置后才能登录）"""
+    workers = min(processes or multiprocessing.cpu_count(), len(passwords))
+    if len(passwords) < PARALLEL_HASH_MIN or workers <= 1:
+        return [make_password(p) for p in passwords]
+    pool = get_hash_pool(processes)
+    chunksize = max(1, len(passwords) // (workers * 4))
+    try:
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+    except BrokenProcessPool:
+        # 子进程异常退出：丢弃进程池（下次重建），本批在当前进程里算完
+        _shutdown_hash_pool()
+        return [make_password(p) for p in passwords]
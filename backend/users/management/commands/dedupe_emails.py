@@ -0,0 +1,63 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from users.utils import normalize_email
+
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "校验/回填 User.email_normalized，并处理大小写不同的重复邮箱"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--apply", action="store_true", help="写入修正（默认只报告）")
+        parser.add_argument("--show", type=int, default=20, help="最多列出多少组重复邮箱")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+
+        # 每个规范化邮箱选一个持有者：启用的优先，其次最近登录，再其次 id 最小
+        current, groups = {}, {}
+        rows = User.objects.order_by("id").values_list("id", "email", "email_normalized", "last_login", "is_active")
+        for uid, email, normalized, last_login, is_active in rows.iterator(chunk_size=2000):
+            current[uid] = normalized
+            key = normalize_email(email)
+            if key:
+                groups.setdefault(key, []).append((uid, last_login, is_active))
+
+        desired = dict.fromkeys(current)
+        duplicates = []
+        for key, members in groups.items():
+            winner = min(
+                members,
+                key=lambda m: (not m[2], -(m[1].timestamp() if m[1] else float("-inf")), m[0]),
+            )
+            desired[winner[0]] = key
+            if len(members) > 1:
+                duplicates.append((key, winner[0], [m[0] for m in members if m[0] != winner[0]]))
+
+        changes = {uid: value for uid, value in desired.items() if current[uid] != value}
+
+        self.stdout.write(f"users={len(current)} duplicates={len(duplicates)} changes={len(changes)}")
+        for key, keep, others in duplicates[: options["show"]]:
+            self.stdout.write(f"  {key}: keep id={keep}, unindexed ids={others}")
+
+        if not options["apply"] or not changes:
+            return
+
+        with transaction.atomic():
+            # 先清空再写入，避免中途与唯一索引冲突
+            self._bulk_set(User, list(changes), None)
+            winners = [(uid, v) for uid, v in changes.items() if v]
+            for i in range(0, len(winners), BATCH_SIZE):
+                User.objects.bulk_update(
+                    [User(id=uid, email_normalized=v) for uid, v in winners[i: i + BATCH_SIZE]],
+                    ["email_normalized"],
+                )
+        self.stdout.write(self.style.SUCCESS(f"已更新 {len(changes)} 个用户"))
+
+    @staticmethod
+    def _bulk_set(User, ids, value):
+        for i in range(0, len(ids), BATCH_SIZE):
+            User.objects.filter(id__in=ids[i: i + BATCH_SIZE]).update(email_normalized=value)
@@ -0,0 +1,43 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import IntegrityError
+
+from users.provisioning import ProvisionError, parse_rows, provision_users
+
+
+class Command(BaseCommand):
+    help = "从 CSV / NDJSON 批量开通账号（可选同时加入团队）"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="输入文件，- 表示标准输入")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="缺省按内容判断")
+        parser.add_argument("--team", type=int, help="同时加入的团队 id")
+        parser.add_argument("--processes", type=int, help="密码哈希进程数（默认 CPU 核数）")
+        parser.add_argument("--dry-run", action="store_true", help="只校验、不写库")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        if path == "-":
+            data = sys.stdin.read()
+        else:
+            try:
+                with open(path, "rb") as f:
+                    data = f.read()
+            except OSError as e:
+                raise CommandError(f"无法读取 {path}: {e}")
+
+        try:
+            rows = parse_rows(data, options["format"])
+            result = provision_users(
+                rows, team_id=options["team"], processes=options["processes"], dry_run=options["dry_run"]
+            )
+        except ProvisionError as e:
+            raise CommandError(str(e))
+        except IntegrityError:
+            raise CommandError("用户名或邮箱被并发占用，整批已回滚，请重试")
+
+        for err in result["errors"]:
+            self.stderr.write(f"  第 {err['line']} 行 {err['email'] or '-'}: {err['message']}")
+        verb = "可创建" if options["dry_run"] else "已创建"
+        self.stdout.write(self.style.SUCCESS(f"{verb} {len(result['created'])} 个用户，跳过 {len(result['errors'])} 行"))
@@ -0,0 +1,50 @@
+# Generated by Django 6.0 on 2026-10-19 21:40
+
+from django.db import migrations, models
+
+
+def backfill(apps, schema_editor):
+    """
+    按小写邮箱回填；同一邮箱有多个账号时按与 `manage.py dedupe_emails` 相同的规则选一个保留：
+    启用的优先，其次最近登录，再其次 id 最小；其余留空（仍可用用户名登录），可用该命令查看与处理
+    """
+    User = apps.get_model("users", "User")
+    owners = {}
+    rows = User.objects.order_by("id").values_list("id", "email", "last_login", "is_active")
+    for uid, email, last_login, is_active in rows.iterator(chunk_size=2000):
+        key = (email or "").strip().lower()
+        if not key:
+            continue
+        rank = (not is_active, -(last_login.timestamp() if last_login else float("-inf")), uid)
+        if key not in owners or rank < owners[key][1]:
+            owners[key] = (uid, rank)
+
+    batch = []
+    for key, (uid, _) in owners.items():
+        batch.append(User(id=uid, email_normalized=key))
+        if len(batch) >= 1000:
+            User.objects.bulk_update(batch, ["email_normalized"])
+            batch = []
+    if batch:
+        User.objects.bulk_update(batch, ["email_normalized"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0007_user_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='email_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True),
+        ),
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='user',
+            name='email_normalized',
+            field=models.CharField(blank=True, editable=False, max_length=254, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.0 on 2026-10-20 10:05
+
+from django.db import migrations
+
+# 用户名 / 昵称的大小写不敏感前缀搜索：LOWER(col) LIKE 'x%' 需要 text_pattern_ops 表达式索引
+# （email_normalized 已是小写，唯一约束在 PostgreSQL 上自带 varchar_pattern_ops 的 _like 索引）
+# 其他数据库不建：SQLite 的 LIKE 本身不区分大小写，开发环境数据量也用不上
+LOWER_PREFIX_INDEXES = {
+    "user_username_lower_like_idx": "username",
+    "user_name_lower_like_idx": "name",
+}
+
+
+def create_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name, column in LOWER_PREFIX_INDEXES.items():
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS "{name}" ON "users_user" (LOWER("{column}") text_pattern_ops)'
+        )
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    for name in LOWER_PREFIX_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS "{name}"')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_user_email_normalized"),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes),
+    ]
@@ -1,5 +1,8 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.core.exceptions import ValidationError
+
+from .utils import normalize_email
 
 
 class User(AbstractUser):
@@ -54,9 +57,51 @@ class User(AbstractUser):
         verbose_name="封面图"
     )
 
+    # 规范化邮箱（小写、去空白）：唯一索引，登录/注册按它等值查找；空邮箱存 NULL
+    # save() 自动同步（已被其他账号占用时留空，见 sync_email_normalized）；queryset.update / bulk_create 需自行赋值
+    email_normalized = models.CharField(max_length=254, null=True, blank=True, unique=True, editable=False)
+
+    # 缩略图（由 users.tasks.generate_image_variants 写入）：{"source": 原图路径, "files": {"48": 路径, ...}}
+    avatar_variants = models.JSONField(default=dict, blank=True, editable=False)
+    cover_variants = models.JSONField(default=dict, blank=True, editable=False)
+
+    # 令牌版本：改密码 / 停用时 +1，签发时写入 JWT 的 ver，旧令牌随之失效
+    token_version = models.PositiveIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = "用户"
         verbose_name_plural = "用户"
+        # 前缀搜索（users.utils.user_prefix_q）用到的索引，PostgreSQL 上：
+        # - email_normalized：唯一约束自带 varchar_pattern_ops 的 *_like 索引
+        # - LOWER(username) / LOWER(name)：text_pattern_ops 表达式索引，由迁移 0009 创建
 
     def __str__(self):
         return self.username
+
+    def email_taken(self) -> bool:
+        """规范化后的邮箱是否已属于其他账号"""
+        key = normalize_email(self.email)
+        return bool(key) and User.objects.filter(email_normalized=key).exclude(pk=self.pk).exists()
+
+    def clean(self):
+        super().clean()
+        # 后台表单等走 full_clean 的入口：大小写不同的重复邮箱直接报错
+        if self.email_taken():
+            raise ValidationError({"email": "该邮箱已被其他账号使用"})
+
+    def sync_email_normalized(self):
+        """
+        邮箱变化时同步 email_normalized；已被其他账号占用（迁移留下的历史重复账号，
+        或绕过 clean() 改成了别人的邮箱）时留空：该账号只能用用户名登录，不会因唯一索引而保存失败
+        """
+        key = normalize_email(self.email) or None
+        if key == self.email_normalized:
+            return
+        self.email_normalized = None if key and self.email_taken() else key
+
+    def save(self, *args, **kwargs):
+        self.sync_email_normalized()
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "email" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "email_normalized"}
+        super().save(*args, **kwargs)
@@ -0,0 +1,248 @@
+# users/provisioning.py
+"""
+批量开通账号（管理端 POST /api/users/admin/users/bulk/ 与 manage.py provision_users 共用）：
+
+- 输入 CSV（表头 email,password,username,name,role）或 NDJSON（每行一个 JSON 对象）
+- 逐行校验；已存在的邮箱 / 用户名各用一条 IN 查询，批内重复直接报错；出错的行跳过并报告
+- 密码哈希（PBKDF2，单个数百毫秒）交给 users.hashing 的常驻进程池并行计算，不占用事务时间
+- 未指定用户名时按邮箱前缀分配（foo, foo2, foo3 ...，与注册接口一致）：
+  一条查询（前缀多时分批）取出所有前缀下已占用的名字，在内存里挑空位
+- 用户 bulk_create（不走 save()，email_normalized 手动赋值）；指定团队时同一事务内批量加入
+"""
+import csv
+import io
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import Q
+
+from teams.cache import invalidate_team_stats
+from teams.models import Team, TeamMember
+
+from .hashing import hash_passwords
+from .utils import PASSWORD_MIN_LENGTH, normalize_email
+
+FIELDS = ("email", "password", "username", "name", "role")
+# 管理端接口在请求内同步哈希：100 行 × 数百毫秒 ÷ 4 个进程，控制在十秒上下；更大批量走命令行（不限行数）
+BULK_MAX_ROWS = 100
+BULK_HASH_PROCESSES = 4       # Web 进程里的哈希进程池大小，不按 CPU 核数铺满
+CREATE_BATCH_SIZE = 500
+LOOKUP_BATCH_SIZE = 500
+USERNAME_PREFIX_BATCH = 200   # 分配用户名时单条查询最多带的前缀数
+
+
+class ProvisionError(Exception):
+    """整批无法处理（格式错误、团队不存在或已满等）"""
+
+
+def parse_rows(data, fmt=None):
+    """
+    返回 [(行号, {字段: 值}), ...]；fmt 为 "csv" / "ndjson"，缺省按首个非空字符判断
+    """
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    fmt = fmt or ("ndjson" if data.lstrip().startswith("{") else "csv")
+
+    rows = []
+    if fmt == "ndjson":
+        for line_no, line in enumerate(data.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                obj = json.loads(line)
+            except ValueError:
+                raise ProvisionError(f"第 {line_no} 行不是合法的 JSON")
+            if not isinstance(obj, dict):
+                raise ProvisionError(f"第 {line_no} 行应为 JSON 对象")
+            rows.append((line_no, obj))
+    elif fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        if not reader.fieldnames or "email" not in [f.strip().lower() for f in reader.fieldnames]:
+            raise ProvisionError("CSV 缺少 email 列")
+        for obj in reader:
+            rows.append((reader.line_num, {(k or "").strip().lower(): v for k, v in obj.items()}))
+    else:
+        raise ProvisionError(f"不支持的格式: {fmt}")
+    return rows
+
+
+def _chunks(items, size):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i: i + size]
+
+
+def _taken(field, values):
+    User = get_user_model()
+    taken = set()
+    for chunk in _chunks(values, LOOKUP_BATCH_SIZE):
+        taken.update(User.objects.filter(**{f"{field}__in": chunk}).values_list(field, flat=True))
+    return taken
+
+
+def _numbered(username, base) -> bool:
+    """username 是否为 base 或 base + 数字"""
+    return username.startswith(base) and (len(username) == len(base) or username[len(base):].isdigit())
+
+
+def allocate_usernames(bases, reserved=()):
+    """
+    为每个前缀分配不冲突的用户名（顺序与 bases 一致）；reserved 为同批已用掉的名字
+    所有前缀合并成一条 OR 查询（startswith 走用户名索引），取回的名字按「去掉末尾数字后的词根」分组，
+    每个前缀只在同词根的名字里挑，不必逐个比对
+    """
+    User = get_user_model()
+    distinct = list(dict.fromkeys(bases))
+    by_root = {}
+    for chunk in _chunks(distinct, USERNAME_PREFIX_BATCH):
+        cond = Q()
+        for base in chunk:
+            cond |= Q(username__startswith=base)
+        for name in User.objects.filter(cond).values_list("username", flat=True):
+            by_root.setdefault(name.rstrip("0123456789"), set()).add(name)
+
+    reserved = set(reserved)
+    taken_by_base = {}
+    result = []
+    for base in bases:
+        if base not in taken_by_base:
+            candidates = by_root.get(base.rstrip("0123456789"), ())
+            taken_by_base[base] = {name for name in candidates if _numbered(name, base)}
+        taken = taken_by_base[base]
+        username, i = base, 1
+        while username in taken or username in reserved:
+            i += 1
+            username = f"{base}{i}"
+        taken.add(username)
+        result.append(username)
+    return result
+
+
+def _clean(line_no, raw, username_validator):
+    """校验单行；返回 (清洗后的 dict, 错误信息)"""
+    if not isinstance(raw, dict):
+        return {"line": line_no, "email": ""}, "应为 JSON 对象"
+    raw = {k: ("" if v is None else str(v)).strip() for k, v in raw.items() if k in FIELDS}
+    email = normalize_email(raw.get("email"))
+    row = {
+        "line": line_no,
+        "email": email,
+        "password": raw.get("password") or None,
+        "username": raw.get("username", ""),
+        "name": raw.get("name", ""),
+        "role": (raw.get("role") or TeamMember.Role.MEMBER).lower(),
+    }
+    if not email:
+        return row, "邮箱不能为空"
+    try:
+        validate_email(email)
+    except ValidationError:
+        return row, "邮箱格式不正确"
+    if row["password"] is not None and len(row["password"]) < PASSWORD_MIN_LENGTH:
+        return row, f"密码至少 {PASSWORD_MIN_LENGTH} 位"
+    if row["username"]:
+        try:
+            username_validator(row["username"])
+        except ValidationError:
+            return row, "用户名格式不正确"
+    if row["role"] not in TeamMember.Role.values:
+        return row, f"角色应为 {'/'.join(TeamMember.Role.values)}"
+    return row, None
+
+
+def provision_users(rows, team_id=None, processes=None, dry_run=False):
+    """
+    rows 来自 parse_rows；返回 {"created": [{id, username, email}], "errors": [{line, email, message}]}
+    dry_run 只做校验与用户名分配，不哈希、不写库（返回的 id 为 None）
+    """
+    User = get_user_model()
+    username_validator = User.username_validator
+    errors, valid = [], []
+    seen_emails, seen_usernames = set(), set()
+
+    for line_no, raw in rows:
+        row, message = _clean(line_no, raw, username_validator)
+        if message is None and row["email"] in seen_emails:
+            message = "邮箱在本批中重复"
+        if message is None and row["username"] and row["username"] in seen_usernames:
+            message = "用户名在本批中重复"
+        if message:
+            errors.append({"line": line_no, "email": row["email"], "message": message})
+            continue
+        seen_emails.add(row["email"])
+        if row["username"]:
+            seen_usernames.add(row["username"])
+        valid.append(row)
+
+    existing_emails = _taken("email_normalized", seen_emails)
+    existing_usernames = _taken("username", seen_usernames)
+    rows_ok = []
+    for row in valid:
+        if row["email"] in existing_emails:
+            errors.append({"line": row["line"], "email": row["email"], "message": "邮箱已注册"})
+        elif row["username"] in existing_usernames:
+            errors.append({"line": row["line"], "email": row["email"], "message": "用户名已存在"})
+        else:
+            rows_ok.append(row)
+
+    auto = [row for row in rows_ok if not row["username"]]
+    explicit = {row["username"] for row in rows_ok if row["username"]}
+    for row, username in zip(auto, allocate_usernames([r["email"].split("@")[0] for r in auto], explicit)):
+        row["username"] = username
+
+    team = None
+    if team_id is not None:
+        team = Team.objects.filter(pk=team_id).first()
+        if team is None:
+            raise ProvisionError("团队不存在")
+
+    errors.sort(key=lambda e: e["line"])
+    if dry_run or not rows_ok:
+        return {
+            "created": [{"id": None, "username": r["username"], "email": r["email"]} for r in rows_ok],
+            "errors": errors,
+        }
+
+    hashes = hash_passwords([row["password"] for row in rows_ok], processes)
+    users = [
+        User(
+            username=row["username"],
+            email=row["email"],
+            email_normalized=row["email"],
+            name=row["name"],
+            password=hashed,
+        )
+        for row, hashed in zip(rows_ok, hashes)
+    ]
+
+    with transaction.atomic():
+        if team is not None and team.max_members is not None:
+            # 与邀请码加入同样先锁团队行，计数与插入之间不会被插队
+            Team.objects.select_for_update().filter(pk=team.pk).values_list("id", flat=True).first()
+            if TeamMember.objects.filter(team=team).count() + len(users) > team.max_members:
+                raise ProvisionError("超出团队人数上限")
+
+        User.objects.bulk_create(users, batch_size=CREATE_BATCH_SIZE)
+        if any(u.pk is None for u in users):
+            # 不支持 RETURNING 的数据库：按规范化邮箱回查主键
+            ids = {}
+            for chunk in _chunks([u.email_normalized for u in users], LOOKUP_BATCH_SIZE):
+                ids.update(User.objects.filter(email_normalized__in=chunk).values_list("email_normalized", "id"))
+            for u in users:
+                u.pk = ids[u.email_normalized]
+
+        if team is not None:
+            TeamMember.objects.bulk_create(
+                [TeamMember(team=team, user_id=u.pk, role=row["role"]) for u, row in zip(users, rows_ok)],
+                batch_size=CREATE_BATCH_SIZE,
+            )
+            # bulk_create 不触发 post_save，团队统计缓存手动失效（新用户不会有成员身份缓存）
+            transaction.on_commit(lambda: invalidate_team_stats(team.pk))
+
+    return {
+        "created": [{"id": u.pk, "username": u.username, "email": u.email} for u in users],
+        "errors": errors,
+    }
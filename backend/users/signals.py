@@ -0,0 +1,35 @@
+# users/signals.py
+from django.contrib.auth import get_user_model
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .authentication import forget_token_version, invalidate_user_cache, revoke_tokens
+
+User = get_user_model()
+
+
+@receiver(pre_save, sender=User)
+def user_pre_save(sender, instance, **kwargs):
+    # 记下是否由启用变为停用
+    instance._deactivated = False
+    if instance.pk and not instance.is_active:
+        was_active = User.objects.filter(pk=instance.pk).values_list("is_active", flat=True).first()
+        instance._deactivated = bool(was_active)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    # 资料修改（MeAPIView.patch / 后台编辑）：缓存的 User 对象作废
+    if created:
+        return
+    invalidate_user_cache(instance)
+    # 重新启用等情况：缓存的版本号作废，下次校验查库
+    forget_token_version(instance.pk)
+    if getattr(instance, "_deactivated", False):
+        revoke_tokens(instance)
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, **kwargs):
+    invalidate_user_cache(instance)
+    forget_token_version(instance.pk)
@@ -0,0 +1,62 @@
+# users/tasks.py
+import os
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from taskqueue.registry import task
+from .authentication import invalidate_user_cache
+from .utils import AVATAR_SIZES, COVER_SIZES
+
+WEBP_QUALITY = 82
+
+
+def _resize(img, field, size):
+    if field == "avatar":
+        return ImageOps.fit(img, (size, size), Image.Resampling.LANCZOS)
+    if img.width <= size:
+        return img.copy()
+    height = max(1, round(img.height * size / img.width))
+    return img.resize((size, height), Image.Resampling.LANCZOS)
+
+
+@task(max_attempts=3, timeout=120)
+def generate_image_variants(user_id, field):
+    """
+    为头像/封面生成 WebP 缩略图（上传请求只存原图，缩放放到 worker）
+    记录时按原图路径做比较再写入：生成期间用户又换了图，则丢弃本次结果
+    """
+    User = get_user_model()
+    user = User.objects.filter(pk=user_id).first()
+    f = getattr(user, field, None) if user else None
+    if not f:
+        return
+    source = f.name
+    sizes = AVATAR_SIZES if field == "avatar" else COVER_SIZES
+    storage = f.storage
+
+    with storage.open(source, "rb") as fh:
+        img = Image.open(fh)
+        img = ImageOps.exif_transpose(img)
+        img = img.convert("RGBA" if "A" in img.getbands() else "RGB")
+
+    stem = os.path.splitext(os.path.basename(source))[0]
+    folder = os.path.dirname(source)
+    files = {}
+    for size in sizes:
+        buf = BytesIO()
+        _resize(img, field, size).save(buf, "WEBP", quality=WEBP_QUALITY, method=4)
+        files[str(size)] = storage.save(f"{folder}/variants/{stem}_{size}.webp", ContentFile(buf.getvalue()))
+
+    variants_field = f"{field}_variants"
+    old_files = (getattr(user, variants_field) or {}).get("files") or {}
+    updated = User.objects.filter(pk=user_id, **{field: source}).update(
+        **{variants_field: {"source": source, "files": files}}
+    )
+    stale = old_files.values() if updated else files.values()
+    for name in stale:
+        storage.delete(name)
+    if updated:
+        invalidate_user_cache(user)
@@ -1,3 +1,304 @@
-from django.test import TestCase
+import shutil
+import tempfile
+import time
+from io import BytesIO, StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db.models import F
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.test import APIClient
+
+from posts.models import Post
+from teams.models import Team, TeamMember
+from .authentication import TOKEN_VERSION_TTL
+from .models import User
+from .provisioning import BULK_MAX_ROWS, ProvisionError, allocate_usernames, provision_users
+from .tasks import generate_image_variants
+from .utils import AVATAR_SIZES, build_avatar_url, pick_variant
+from .views import issue_tokens
+
+
+def bearer(tokens):
+    client = APIClient()
+    client.credentials(HTTP_AUTHORIZATION="Bearer " + tokens["access"])
+    return client
+
+
+class EmailNormalizationTests(TestCase):
+    def test_register_rejects_case_variant(self):
+        client = APIClient()
+        resp = client.post("/api/users/register/", {"email": " Foo@Example.com ", "password": "secret1"}, format="json")
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(User.objects.get().email_normalized, "foo@example.com")
+
+        resp = client.post("/api/users/register/", {"email": "FOO@example.COM", "password": "secret1"}, format="json")
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_login_is_case_insensitive(self):
+        User.objects.create_user(username="foo", email="foo@example.com", password="secret1")
+        resp = APIClient().post("/api/users/login/", {"email": "FOO@Example.com", "password": "secret1"}, format="json")
+        self.assertEqual(resp.status_code, 200)
+
+    def test_legacy_duplicate_can_still_be_saved(self):
+        User.objects.create_user(username="a", email="Dup@example.com")
+        b = User.objects.create_user(username="b", email="other@example.com")
+        # 迁移前就存在的大小写重复账号：规范化邮箱留空
+        User.objects.filter(pk=b.pk).update(email="dup@EXAMPLE.com", email_normalized=None)
+
+        b = User.objects.get(pk=b.pk)
+        b.name = "renamed"
+        b.save()
+        b.refresh_from_db()
+        self.assertEqual(b.name, "renamed")
+        self.assertIsNone(b.email_normalized)
+
+    def test_editing_to_taken_email_fails_validation_not_save(self):
+        User.objects.create_user(username="a", email="taken@example.com")
+        c = User.objects.create_user(username="c", email="c@example.com")
+        c.email = "TAKEN@example.com"
+        with self.assertRaises(ValidationError):
+            c.full_clean(exclude=["password"])
+        c.save()
+        self.assertIsNone(User.objects.get(pk=c.pk).email_normalized)
+
+    def test_update_fields_email_keeps_index_in_sync(self):
+        u = User.objects.create_user(username="a", email="a@example.com")
+        u.email = "New@Example.com"
+        u.save(update_fields=["email"])
+        self.assertEqual(User.objects.get(pk=u.pk).email_normalized, "new@example.com")
+
+    def test_dedupe_command_keeps_active_then_recent_login(self):
+        old = User.objects.create_user(username="old", email="x@example.com")
+        recent = User.objects.create_user(username="recent", email="y@example.com")
+        User.objects.filter(pk=recent.pk).update(
+            email="X@example.com", email_normalized=None, last_login=timezone.now()
+        )
+        call_command("dedupe_emails", "--apply", stdout=StringIO())
+        self.assertIsNone(User.objects.get(pk=old.pk).email_normalized)
+        self.assertEqual(User.objects.get(pk=recent.pk).email_normalized, "x@example.com")
+
+
+class TokenRevocationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="u", email="u@example.com", password="secret1")
+        self.admin = User.objects.create_user(username="admin", email="admin@example.com", is_staff=True)
+        self.post = Post.objects.create(author=self.user)
+        self.tokens = issue_tokens(self.user)
+
+    def reset_password(self):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        resp = client.post(f"/api/users/admin/users/{self.user.id}/password/", {"password": "newpass1"}, format="json")
+        self.assertEqual(resp.status_code, 200)
+
+    def like(self, client):
+        return client.post(f"/api/posts/{self.post.id}/like-toggle/")
+
+    def refresh(self, tokens):
+        return APIClient().post("/api/users/token/refresh/", {"refresh": tokens["refresh"]}, format="json")
+
+    def test_password_reset_revokes_access_tokens(self):
+        client = bearer(self.tokens)
+        self.assertEqual(client.get("/api/users/me/").status_code, 200)
+        self.reset_password()
+        self.assertEqual(client.get("/api/users/me/").status_code, 401)
+        self.assertEqual(self.like(client).status_code, 401)
+
+    def test_claims_only_view_rejects_revoked_token_after_cache_loss(self):
+        self.reset_password()
+        cache.clear()
+        self.assertEqual(self.like(bearer(self.tokens)).status_code, 401)
+
+    def test_refresh_rejects_pre_reset_token(self):
+        self.reset_password()
+        cache.clear()
+        self.assertEqual(self.refresh(self.tokens).status_code, 401)
+
+        fresh = issue_tokens(User.objects.get(pk=self.user.pk))
+        resp = self.refresh(fresh)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(self.like(bearer(resp.data)).status_code, 200)
+
+    def test_revocation_in_another_process_applies_within_ttl(self):
+        client = bearer(self.tokens)
+        self.assertEqual(self.like(client).status_code, 200)
+        # 另一个进程处理了改密码：库里的版本号变了，本进程缓存里还是旧值
+        User.objects.filter(pk=self.user.pk).update(token_version=F("token_version") + 1)
+
+        later = time.time() + TOKEN_VERSION_TTL + 1
+        with mock.patch("django.core.cache.backends.locmem.time.time", return_value=later):
+            self.assertEqual(self.like(client).status_code, 401)
+
+    def test_deactivation_revokes_and_reactivation_restores(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.like(bearer(self.tokens)).status_code, 401)
+
+        user = User.objects.get(pk=self.user.pk)
+        user.is_active = True
+        user.save()
+        self.assertEqual(self.like(bearer(issue_tokens(user))).status_code, 200)
+
+
+class ProvisioningTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", email="admin@example.com", is_staff=True)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def bulk(self, users, **extra):
+        return self.client.post("/api/users/admin/users/bulk/", {"users": users, **extra}, format="json")
+
+    def test_row_limit(self):
+        users = [{"email": f"u{i}@example.com"} for i in range(BULK_MAX_ROWS + 1)]
+        resp = self.bulk(users)
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(User.objects.count(), 1)
+
+    def test_non_object_entries_are_row_errors(self):
+        resp = self.bulk(["x@example.com", {"email": "a@example.com"}, None])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data["created_count"], 1)
+        self.assertEqual([(e["line"], e["message"]) for e in resp.data["errors"]], [(1, "应为 JSON 对象"), (3, "应为 JSON 对象")])
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        User.objects.create_user(username="taken", email="taken@example.com")
+        resp = self.bulk([
+            {"email": "ok@example.com", "password": "secret1", "name": "OK"},
+            {"email": "TAKEN@example.com"},
+            {"email": "not-an-email"},
+            {"email": "ok@EXAMPLE.com"},
+            {"email": "short@example.com", "password": "123"},
+            {"email": "dupname@example.com", "username": "taken"},
+        ])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data["created_count"], 1)
+        self.assertEqual([e["line"] for e in resp.data["errors"]], [2, 3, 4, 5, 6])
+
+        user = User.objects.get(email_normalized="ok@example.com")
+        self.assertEqual(user.name, "OK")
+        self.assertTrue(user.check_password("secret1"))
+
+    def test_dry_run_writes_nothing(self):
+        resp = self.bulk([{"email": "a@example.com"}], dry_run=True)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data["created_count"], 1)
+        self.assertFalse(User.objects.filter(email_normalized="a@example.com").exists())
+
+    def test_team_cap_rejects_whole_batch(self):
+        team = Team.objects.create(name="T", owner=self.admin, max_members=2)
+        TeamMember.objects.create(team=team, user=self.admin)
+        resp = self.bulk([{"email": "a@example.com"}, {"email": "b@example.com"}], team_id=team.id)
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(User.objects.filter(email_normalized__in=["a@example.com", "b@example.com"]).exists())
+
+        resp = self.bulk([{"email": "a@example.com", "role": "admin"}], team_id=team.id)
+        self.assertEqual(resp.status_code, 201)
+        member = TeamMember.objects.get(team=team, user__email_normalized="a@example.com")
+        self.assertEqual(member.role, TeamMember.Role.ADMIN)
+
+    def test_unknown_team(self):
+        with self.assertRaises(ProvisionError):
+            provision_users([(1, {"email": "a@example.com"})], team_id=999)
+
+    def test_allocate_usernames_skips_taken_names(self):
+        for name in ("foo", "foo2", "foobar", "bar"):
+            User.objects.create_user(username=name, email=f"{name}@example.com")
+        with self.assertNumQueries(1):
+            names = allocate_usernames(["foo", "foo", "bar", "new"], reserved={"bar2"})
+        self.assertEqual(names, ["foo3", "foo4", "bar3", "new"])
+
+    def test_command_imports_ndjson(self):
+        import tempfile
+
+        with tempfile.NamedTemporaryFile("w", suffix=".ndjson", delete=False) as f:
+            f.write('{"email": "n1@example.com", "password": "secret1"}\n{"email": "n2@example.com"}\n')
+        out = StringIO()
+        call_command("provision_users", f.name, stdout=out, stderr=StringIO())
+        self.assertIn("2", out.getvalue())
+        self.assertFalse(User.objects.get(email_normalized="n2@example.com").has_usable_password())
+
+
+class AdminUserListTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(username="admin", email="admin@example.com", is_staff=True)
+        for i in range(25):
+            User.objects.create_user(username=f"user{i}", email=f"Mail{i}@example.com", is_active=i % 5 != 0)
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def get(self, **params):
+        resp = self.client.get("/api/users/admin/users/", params)
+        self.assertEqual(resp.status_code, 200)
+        return resp.data
+
+    def test_keyset_pages_cover_all_users(self):
+        seen, cursor = [], None
+        while True:
+            data = self.get(page_size=10, **({"cursor": cursor} if cursor else {}))
+            seen += [u["id"] for u in data["results"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                break
+        self.assertEqual(len(seen), 26)
+        self.assertEqual(seen, sorted(seen, reverse=True))
+
+    def test_search_and_filters(self):
+        data = self.get(q="MAIL1", with_total=1)
+        self.assertEqual(data["total_estimate"], 11)  # mail1, mail10..mail19
+        self.assertEqual(len(self.get(is_active=0)["results"]), 5)
+        self.assertEqual([u["id"] for u in self.get(is_staff=1)["results"]], [self.admin.id])
+
+
+def png(name="a.png", size=(600, 400)):
+    buf = BytesIO()
+    Image.new("RGB", size, "red").save(buf, "PNG")
+    return SimpleUploadedFile(name, buf.getvalue(), content_type="image/png")
+
+
+class AvatarVariantTests(TestCase):
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media, MEDIA_URL="/media/")
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(username="u", email="u@example.com", avatar=png())
+
+    def test_pick_variant_chooses_smallest_large_enough(self):
+        variants = {"source": "a.png", "files": {"48": "a_48.webp", "128": "a_128.webp", "512": "a_512.webp"}}
+        self.assertEqual(pick_variant("a.png", variants, 40), "a_48.webp")
+        self.assertEqual(pick_variant("a.png", variants, 128), "a_128.webp")
+        self.assertEqual(pick_variant("a.png", variants, 200), "a_512.webp")
+        self.assertEqual(pick_variant("a.png", variants, 1024), "a_512.webp")
+        # 不指定尺寸、缩略图属于旧原图或尚未生成：用原图
+        self.assertEqual(pick_variant("a.png", variants, None), "a.png")
+        self.assertEqual(pick_variant("b.png", variants, 128), "b.png")
+        self.assertEqual(pick_variant("a.png", None, 128), "a.png")
+        self.assertEqual(pick_variant("a.png", {"source": "a.png", "files": {}}, 128), "a.png")
+
+    def test_generated_variants_are_served_until_avatar_changes(self):
+        original = build_avatar_url(None, self.user, 128)
+        self.assertTrue(original.endswith(".png"))
+
+        generate_image_variants(self.user.id, "avatar")
+        user = User.objects.get(pk=self.user.pk)
+        files = user.avatar_variants["files"]
+        self.assertEqual(sorted(files, key=int), [str(s) for s in AVATAR_SIZES])
+        self.assertEqual(build_avatar_url(None, user, 128), "/media/" + files["128"])
+        with user.avatar.storage.open(files["48"]) as fh:
+            self.assertEqual(Image.open(fh).size, (48, 48))
+
+        # 换了新头像、缩略图还没重新生成：退回新原图而不是旧缩略图
+        user.avatar = png("b.png")
+        user.save()
+        self.assertEqual(build_avatar_url(None, user, 128), user.avatar.url)
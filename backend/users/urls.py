@@ -5,6 +5,7 @@ from .views import (
     LogoutView,
     MeAPIView,
     AdminUserListView,
+    AdminUserBulkCreateView,
     AdminUserDetailView,
     AdminUserPasswordResetView,
     SafeTokenRefreshView,
@@ -17,6 +18,7 @@ urlpatterns = [
     path("logout/", LogoutView.as_view()),
     path("me/", MeAPIView.as_view()),
     path("admin/users/", AdminUserListView.as_view()),
+    path("admin/users/bulk/", AdminUserBulkCreateView.as_view()),
     path("admin/users/<int:user_id>/", AdminUserDetailView.as_view()),
     path("admin/users/<int:user_id>/password/", AdminUserPasswordResetView.as_view()),
     path("token/refresh/", SafeTokenRefreshView.as_view()),
@@ -1,8 +1,95 @@
-def build_avatar_url(request, user):
-    if not getattr(user, "avatar", None):
+# users/utils.py
+"""
+头像 / 封面 URL：
+
+- 上传后由后台任务（users.tasks.generate_image_variants）生成 WebP 缩略图，
+  记录在 User.avatar_variants / cover_variants：{"source": 原图路径, "files": {"48": 路径, ...}}
+- 列表类接口按显示尺寸取最接近的缩略图；缩略图尚未生成（或已过期）时退回原图
+- 绝对地址前缀（scheme://host）每个请求只算一次，缓存在 request 上
+"""
+from django.contrib.auth import get_user_model
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.db.models.lookups import StartsWith
+
+AVATAR_SIZES = (48, 128, 512)   # 正方形裁切
+COVER_SIZES = (640, 1280)       # 按宽度等比缩放
+AVATAR_LIST_SIZE = 128          # 帖子/评论/成员列表里的头像（40px 左右，兼顾 2x 屏）
+AVATAR_PROFILE_SIZE = 512
+COVER_PROFILE_SIZE = 1280
+PASSWORD_MIN_LENGTH = 6
+
+
+def normalize_email(email: str) -> str:
+    """登录/注册/唯一索引统一使用的邮箱形式"""
+    return (email or "").strip().lower()
+
+
+def user_prefix_q(q: str, prefix: str = "") -> Q:
+    """
+    用户搜索：规范化邮箱 / 用户名 / 昵称的前缀匹配（不区分大小写）；prefix 为关联路径，如 "user__"
+    PostgreSQL 上分别走 email_normalized 的 _like 索引与 LOWER(username) / LOWER(name)
+    的表达式索引（users 迁移 0009）
+    """
+    q = normalize_email(q)
+    return (
+        Q(**{f"{prefix}email_normalized__startswith": q})
+        | Q(StartsWith(Lower(f"{prefix}username"), q))
+        | Q(StartsWith(Lower(f"{prefix}name"), q))
+    )
+
+
+def url_prefix(request) -> str:
+    prefix = getattr(request, "_abs_url_prefix", None)
+    if prefix is None:
+        prefix = request.build_absolute_uri("/").rstrip("/")
+        request._abs_url_prefix = prefix
+    return prefix
+
+
+def absolute_url(request, url: str) -> str:
+    if request is None or not url.startswith("/"):
+        return url
+    return url_prefix(request) + url
+
+
+def pick_variant(name, variants, size):
+    """返回 size 对应的缩略图路径：取不小于 size 的最小一档，都比 size 小则取最大一档"""
+    if not size or not variants or variants.get("source") != name:
+        return name
+    files = variants.get("files") or {}
+    sizes = sorted(int(s) for s in files)
+    if not sizes:
+        return name
+    chosen = next((s for s in sizes if s >= size), sizes[-1])
+    return files[str(chosen)]
+
+
+def image_url(request, name, variants=None, size=None, field="avatar"):
+    if not name:
         return None
-    try:
-        url = user.avatar.url
-    except ValueError:
+    storage = get_user_model()._meta.get_field(field).storage
+    return absolute_url(request, storage.url(pick_variant(name, variants, size)))
+
+
+def build_avatar_url(request, user, size=AVATAR_LIST_SIZE):
+    f = getattr(user, "avatar", None)
+    if not f:
         return None
-    return request.build_absolute_uri(url) if request else url
+    return image_url(request, f.name, getattr(user, "avatar_variants", None), size, "avatar")
+
+
+def build_cover_url(request, user, size=COVER_PROFILE_SIZE):
+    f = getattr(user, "cover", None)
+    if not f:
+        return None
+    return image_url(request, f.name, getattr(user, "cover_variants", None), size, "cover")
+
+
+def avatar_urls(request, user):
+    """{"48": url, "128": url, "512": url}；缩略图未就绪时为空"""
+    f = getattr(user, "avatar", None)
+    variants = getattr(user, "avatar_variants", None) or {}
+    if not f or variants.get("source") != f.name:
+        return {}
+    return {s: image_url(request, n, field="avatar") for s, n in (variants.get("files") or {}).items()}
@@ -1,8 +1,10 @@
+import json
 from typing import Any
 
 from django.contrib.auth import authenticate, get_user_model
 from django.core.exceptions import ValidationError
 from django.core.validators import validate_email
+from django.db import IntegrityError, connection
 
 from rest_framework.views import APIView
 from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
@@ -12,40 +14,26 @@ from rest_framework import status
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.parsers import MultiPartParser, FormParser, JSONParser
+
+from .authentication import TOKEN_VERSION_CLAIM, VersionedTokenRefreshSerializer, revoke_tokens
+from .tasks import generate_image_variants
+from .provisioning import BULK_HASH_PROCESSES, BULK_MAX_ROWS, ProvisionError, parse_rows, provision_users
+from .utils import (
+    AVATAR_PROFILE_SIZE, PASSWORD_MIN_LENGTH,
+    avatar_urls, build_avatar_url, build_cover_url, normalize_email, user_prefix_q,
+)
+
 User = get_user_model()
-PASSWORD_MIN_LENGTH = 6
-ADMIN_PAGE_SIZE = 10
+ADMIN_PAGE_SIZE = 20
+ADMIN_MAX_PAGE_SIZE = 100
 
 
 def issue_tokens(user):
     refresh = RefreshToken.for_user(user)
+    refresh[TOKEN_VERSION_CLAIM] = user.token_version  # access token 会复制该声明
     return {"refresh": str(refresh), "access": str(refresh.access_token)}
 
 
-def normalize_email(email: str) -> str:
-    return (email or "").strip().lower()
-
-
-def build_avatar_url(request, user):
-    if not getattr(user, "avatar", None):
-        return None
-    try:
-        url = user.avatar.url
-    except ValueError:
-        return None
-    return request.build_absolute_uri(url) if request else url
-
-
-def build_cover_url(request, user):
-    if not getattr(user, "cover", None):
-        return None
-    try:
-        url = user.cover.url
-    except ValueError:
-        return None
-    return request.build_absolute_uri(url) if request else url
-
-
 def user_to_dict(request, user):
     return {
         "id": user.id,
@@ -57,7 +45,8 @@ def user_to_dict(request, user):
         "gender": getattr(user, "gender", "") or "",
         "contact": getattr(user, "contact", "") or "",
         "theme_color": getattr(user, "theme_color", "") or "",
-        "avatar_url": build_avatar_url(request, user),
+        "avatar_url": build_avatar_url(request, user, AVATAR_PROFILE_SIZE),
+        "avatar_urls": avatar_urls(request, user),
         "cover_url": build_cover_url(request, user),
         "date_joined": user.date_joined,
         "is_staff": bool(getattr(user, "is_staff", False)),
@@ -87,7 +76,7 @@ class RegisterView(APIView):
         except ValidationError:
             return Response({"message": "邮箱格式不正确"}, status=400)
 
-        if User.objects.filter(email__iexact=email).exists():
+        if User.objects.filter(email_normalized=email).exists():
             return Response({"message": "邮箱已注册"}, status=400)
 
         if not username:
@@ -98,7 +87,11 @@ class RegisterView(APIView):
                 i += 1
                 username = f"{base}{i}"
 
-        user = User.objects.create_user(username=username, email=email, password=password)
+        try:
+            user = User.objects.create_user(username=username, email=email, password=password)
+        except IntegrityError:
+            # 并发注册同一邮箱：由唯一索引兜底
+            return Response({"message": "邮箱已注册"}, status=400)
 
         if hasattr(user, "name"):
             user.name = name
@@ -126,7 +119,7 @@ class LoginView(APIView):
 
         user = None
         if email:
-            user = User.objects.filter(email__iexact=email).first()
+            user = User.objects.filter(email_normalized=email).first()
             if user:
                 user = authenticate(request, username=user.username, password=password)
         else:
@@ -181,14 +174,138 @@ class MeAPIView(APIView):
         if update_fields:
             u.save(update_fields=list(set(update_fields)))
 
+        # 缩略图在 worker 里生成；就绪前接口先返回原图地址
+        for f in ("avatar", "cover"):
+            if f in update_fields:
+                generate_image_variants.delay(u.id, f)
+
         return Response(user_to_dict(request, u))
 
+
+def _parse_bool(value):
+    value = (value or "").strip().lower()
+    if value in ("1", "true", "yes"):
+        return True
+    if value in ("0", "false", "no"):
+        return False
+    return None
+
+
+def estimate_count(qs) -> int:
+    """
+    行数估计：PostgreSQL 读规划器统计（无条件时直接取 pg_class.reltuples，
+    有条件时取 EXPLAIN 的估计行数），不做 COUNT(*) 全表扫描；其他数据库退回精确计数
+    """
+    if connection.vendor != "postgresql":
+        return qs.count()
+    with connection.cursor() as cursor:
+        if not qs.query.where:
+            cursor.execute("SELECT reltuples FROM pg_class WHERE oid = %s::regclass", [qs.model._meta.db_table])
+            row = cursor.fetchone()
+            if row and row[0] >= 0:  # 从未 ANALYZE 过的表为 -1
+                return int(row[0])
+        sql, params = qs.values("pk").query.sql_with_params()
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
 class AdminUserListView(APIView):
     permission_classes = [IsAdminUser]
 
     def get(self, request):
-        qs = User.objects.all().order_by("-id")[:ADMIN_PAGE_SIZE]
-        return Response({"results": [user_to_dict(request, u) for u in qs]})
+        """
+        GET /api/users/admin/users/?q=&is_staff=1&is_active=0&cursor=<id>&page_size=20&with_total=1
+
+        按 -id 做键集分页（cursor 为上一页最后一个 id）；
+        q 为不区分大小写的前缀搜索：规范化邮箱 / 用户名 / 昵称，各自走前缀索引（见 User.Meta）；
+        with_total=1 时附带 total_estimate（来自表统计的估计值，不是精确计数）
+        """
+        params = request.query_params
+        try:
+            page_size = int(params.get("page_size") or ADMIN_PAGE_SIZE)
+            cursor = int(params["cursor"]) if params.get("cursor") else None
+        except ValueError:
+            return Response({"message": "分页参数非法"}, status=400)
+        page_size = max(1, min(page_size, ADMIN_MAX_PAGE_SIZE))
+
+        qs = User.objects.all()
+        q = (params.get("q") or "").strip()
+        if q:
+            qs = qs.filter(user_prefix_q(q))
+        for field in ("is_staff", "is_active"):
+            value = _parse_bool(params.get(field))
+            if value is not None:
+                qs = qs.filter(**{field: value})
+
+        data = {}
+        if _parse_bool(params.get("with_total")):
+            data["total_estimate"] = estimate_count(qs)
+
+        page_qs = qs.filter(id__lt=cursor) if cursor is not None else qs
+        users = list(page_qs.order_by("-id")[: page_size + 1])
+        has_more = len(users) > page_size
+        users = users[:page_size]
+
+        data.update({
+            "results": [user_to_dict(request, u) for u in users],
+            "next_cursor": str(users[-1].id) if has_more else None,
+            "has_more": has_more,
+        })
+        return Response(data)
+
+
+class AdminUserBulkCreateView(APIView):
+    """
+    POST /api/users/admin/users/bulk/
+      multipart: file=<CSV/NDJSON 文件>，可选 format / team_id / dry_run
+      或 JSON: {"users": [{"email": ..., "password": ..., "username": ..., "name": ..., "role": ...}],
+                "team_id": 1, "dry_run": false}
+
+    有问题的行跳过并在 errors 中报告，其余照常创建；dry_run 只校验不写库
+    """
+    permission_classes = [IsAdminUser]
+    parser_classes = [JSONParser, MultiPartParser, FormParser]
+
+    def post(self, request):
+        data = request.data or {}
+        try:
+            if "file" in request.FILES:
+                rows = parse_rows(request.FILES["file"].read(), (data.get("format") or "").strip() or None)
+            else:
+                users = data.get("users")
+                if not isinstance(users, list):
+                    return Response({"message": "请上传文件或提供 users 列表"}, status=400)
+                rows = list(enumerate(users, start=1))  # 非对象的条目由 provision_users 按行报错
+        except ProvisionError as e:
+            return Response({"message": str(e)}, status=400)
+
+        if not rows:
+            return Response({"message": "没有可导入的数据"}, status=400)
+        if len(rows) > BULK_MAX_ROWS:
+            return Response({"message": f"单次最多 {BULK_MAX_ROWS} 行，更多请使用 manage.py provision_users"}, status=400)
+
+        team_id = data.get("team_id") or None
+        dry_run = str(data.get("dry_run") or "").lower() in ("1", "true", "yes")
+        try:
+            result = provision_users(
+                rows, team_id=int(team_id) if team_id else None, processes=BULK_HASH_PROCESSES, dry_run=dry_run
+            )
+        except (TypeError, ValueError):
+            return Response({"message": "team_id 非法"}, status=400)
+        except ProvisionError as e:
+            return Response({"message": str(e)}, status=400)
+        except IntegrityError:
+            # 分配用户名后、写入前被其他注册抢占：整批已回滚，重试即可
+            return Response({"message": "用户名或邮箱被并发占用，请重试"}, status=409)
+
+        created = len(result["created"])
+        return Response(
+            {"dry_run": dry_run, "created_count": created, "error_count": len(result["errors"]), **result},
+            status=201 if created and not dry_run else 200,
+        )
 
 
 class AdminUserDetailView(APIView):
@@ -216,8 +333,12 @@ class AdminUserPasswordResetView(APIView):
 
         u.set_password(new_password)
         u.save(update_fields=["password"])
+        # 旧密码下签发的令牌一律失效
+        revoke_tokens(u)
         return Response({"message": "密码已重置"})
 
 
 class SafeTokenRefreshView(TokenRefreshView):
     permission_classes = [AllowAny]
+    # 改密码 / 停用前签发的 refresh token 不能再换新的 access token
+    serializer_class = VersionedTokenRefreshSerializer
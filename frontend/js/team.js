@@ -11,6 +11,8 @@
   const TeamModule = {
     currentTeamId: null,
     _eventsBound: false,
+    _stream: null,
+    _streamTimer: null,
 
     init() {
       this.bindEvents();
@@ -136,7 +138,8 @@
       if (!container) return;
 
       try {
-        const teams = await API.apiFetch("/api/teams/");
+        const res = await API.apiFetch("/api/teams/?page_size=200");
+        const teams = Array.isArray(res) ? res : res?.results;
 
         if (!Array.isArray(teams) || teams.length === 0) {
           container.innerHTML =
@@ -208,6 +211,60 @@
 
       // 团队帖子流仍加载（不删功能）
       this.loadTeamPosts(teamId);
+      this.openTeamStream(teamId);
+    },
+
+    // 2.1 实时推送（SSE）：有新帖子时刷新帖子流；断线后换新票据重连
+    // 浏览器不支持 EventSource、服务端未以 ASGI 运行（url 为空）或领票失败时退回定时轮询
+    async openTeamStream(teamId) {
+      this.closeTeamStream();
+      if (typeof EventSource === "undefined") {
+        this.pollTeamPosts(teamId);
+        return;
+      }
+
+      try {
+        const res = await API.apiFetch(`/api/teams/${teamId}/events/ticket/`);
+        if (this.currentTeamId !== teamId) return;
+        if (!res?.url) {
+          this.pollTeamPosts(teamId, res?.poll_interval);
+          return;
+        }
+
+        const es = new EventSource(res.url);
+        es.addEventListener("team_post", () => this.loadTeamPosts(teamId));
+        es.onerror = () => {
+          // 票据只在建连时有效，浏览器自动重连会被拒：关闭后稍等重新领票
+          this.closeTeamStream();
+          this._streamTimer = setTimeout(() => {
+            if (this.currentTeamId === teamId) {
+              this.loadTeamPosts(teamId);
+              this.openTeamStream(teamId);
+            }
+          }, 5000);
+        };
+        this._stream = es;
+      } catch (err) {
+        console.error("团队实时推送连接失败:", err);
+        if (this.currentTeamId === teamId) this.pollTeamPosts(teamId);
+      }
+    },
+
+    pollTeamPosts(teamId, intervalSec = 30) {
+      clearInterval(this._pollTimer);
+      this._pollTimer = setInterval(() => {
+        if (this.currentTeamId === teamId) this.loadTeamPosts(teamId);
+        else this.closeTeamStream();
+      }, intervalSec * 1000);
+    },
+
+    closeTeamStream() {
+      clearTimeout(this._streamTimer);
+      this._streamTimer = null;
+      clearInterval(this._pollTimer);
+      this._pollTimer = null;
+      this._stream?.close();
+      this._stream = null;
     },
 
     // 3. 创建团队
@@ -284,7 +341,9 @@
       if (!container) return;
 
       try {
-        const posts = await API.apiFetch(`/api/teams/${teamId}/posts/`);
+        // 接口为游标分页：{ results, next_cursor, latest, has_more }，这里只展示最新一页
+        const res = await API.apiFetch(`/api/teams/${teamId}/posts/`);
+        const posts = res?.results || [];
 
         if (!Array.isArray(posts) || posts.length === 0) {
           container.innerHTML =